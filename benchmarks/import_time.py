@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""
+Startup and import-time benchmark for mapplot.
+
+Times a few commands that should return without loading the plotting
+stack, then lists the slowest imports of each module under
+`python -X importtime`.
+
+Usage:
+    python benchmarks/import_time.py [--repeat N] [--top N]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+COMMANDS = {
+    'mapplot --version': [sys.executable, '-m', 'mapplot', '--version'],
+    'mapplot --help': [sys.executable, '-m', 'mapplot', '--help'],
+    'import mapplot.core': [sys.executable, '-c', 'import mapplot.core'],
+    'import mapplot.plotting': [sys.executable, '-c', 'import mapplot.plotting'],
+    'import mapplot.plotting + astropy': [
+        sys.executable, '-c', 'import mapplot.plotting, astropy.coordinates'],
+}
+
+IMPORTTIME_MODULES = ['mapplot.core', 'mapplot.plotting', 'mapplot.data_io']
+
+
+def time_command(argv, repeat):
+    """Median wall time of a command over repeat runs, in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(argv, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def import_times(module):
+    """
+    Cumulative import time of every module loaded by importing module.
+
+    Returns:
+    - list of (cumulative_us, name), slowest first
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark mapplot startup and import times')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per command (default: 5)')
+    parser.add_argument('--top', type=int, default=8, help='Slowest imports listed per module (default: 8)')
+    args = parser.parse_args()
+
+    print(f"{'command':<40} {'median':>10}")
+    for name, argv in COMMANDS.items():
+        print(f"{name:<40} {time_command(argv, args.repeat) * 1000:>8.0f} ms")
+
+    for module in IMPORTTIME_MODULES:
+        rows = import_times(module)
+        print(f"\npython -X importtime -c 'import {module}' (cumulative)")
+        for cumulative, name in rows[:args.top]:
+            print(f"  {cumulative / 1000:>8.1f} ms  {name}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,368 @@
+#!/usr/bin/env python
+"""
+Pipeline benchmarks for mapplot.
+
+Times ingest (read_data), coordinate transforms, solar-relative
+coordinates, BSC5 loading, static sky and earth renders and the mean cost
+of an animation frame. Inputs are the bundled neos_22.00.txt and
+mjd_ra_dec_near_22.txt files, scaled up to each benchmark's sizes by
+tiling their rows with a small deterministic jitter, or with --inputs
+synth, 'mapplot synth' sky and tracks data of those sizes. The input files
+are written once to the work directory and reused.
+
+Results are written as JSON. Given --baseline, each result is compared
+with the baseline's median and the run fails (exit status 1) when one is
+slower by more than --tolerance.
+
+Usage:
+    python benchmarks/run.py [--max-points N] [--only NAME ...] [--inputs synth] [-o results.json]
+    python benchmarks/run.py --baseline baseline.json [--tolerance 0.25]
+"""
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(REPO, 'data')
+
+# The sources scaled up to N points
+POSITIONS = 'neos_22.00.txt'         # RA Dec
+TRACKS = 'mjd_ra_dec_near_22.txt'    # MJD RA Dec
+
+# Frames rendered by the animation benchmark
+ANIMATION_FRAMES = 20
+
+
+def scale_up(source, n_points, workdir):
+    """
+    Tile the rows of a bundled data file to n_points rows.
+
+    Coordinates get up to 0.5 degrees of jitter so that repeated rows are
+    not identical; MJDs are kept. The file is written once per size.
+
+    Returns:
+    - path of the scaled file
+    """
+    path = os.path.join(workdir, f"{os.path.splitext(source)[0]}_{n_points}.txt")
+    if os.path.exists(path):
+        return path
+
+    rows = np.loadtxt(os.path.join(DATA_DIR, source), ndmin=2)
+    rng = np.random.default_rng(n_points)
+    scaled = rows[np.arange(n_points) % len(rows)].copy()
+    ra, dec = scaled.shape[1] - 2, scaled.shape[1] - 1
+    scaled[:, ra] = (scaled[:, ra] + rng.uniform(-0.5, 0.5, n_points)) % 360
+    scaled[:, dec] = np.clip(scaled[:, dec] + rng.uniform(-0.5, 0.5, n_points), -90, 90)
+
+    # Write under a temporary name so an interrupted run leaves no partial file
+    np.savetxt(path + '.part', scaled, fmt='%.5f')
+    os.replace(path + '.part', path)
+    return path
+
+
+def input_path(source, n_points, workdir, inputs='scaled'):
+    """
+    The input file of n_points rows standing in for source: source scaled
+    up, or synthetic data of the same columns (inputs='synth').
+    """
+    if inputs == 'scaled':
+        return scale_up(source, n_points, workdir)
+
+    from mapplot.synth import synthesize
+
+    kind = 'tracks' if source == TRACKS else 'sky'
+    path = os.path.join(workdir, f"synth_{kind}_{n_points}.txt")
+    if not os.path.exists(path):
+        synthesize(kind, n_points, path)
+    return path
+
+
+def _quiet():
+    """Silence mapplot's progress messages while a benchmark runs."""
+    stack = contextlib.ExitStack()
+    stack.enter_context(contextlib.redirect_stdout(io.StringIO()))
+    stack.enter_context(contextlib.redirect_stderr(io.StringIO()))
+    return stack
+
+
+def _render(argv):
+    from mapplot.cli import parse_args
+    from mapplot.core import run_mapplot
+
+    args = parse_args(argv)
+    return lambda: run_mapplot(args)
+
+
+def bench_read_data(path, workdir):
+    from mapplot.data_io import load_data
+
+    return lambda: load_data(path)
+
+
+def bench_read_data_mjd(path, workdir):
+    from mapplot.data_io import load_data
+
+    return lambda: load_data(path, read_mjd=True)
+
+
+def bench_transform_astropy(path, workdir):
+    from mapplot.coordinates import transform_coordinates
+    from mapplot.data_io import load_data
+
+    _, ra, dec, _, _, _ = load_data(path)
+    return lambda: transform_coordinates(ra, dec, 'equatorial', 'galactic')
+
+
+def bench_transform_matrix(path, workdir):
+    from mapplot.coordinates import transform_coordinates
+    from mapplot.data_io import load_data
+
+    _, ra, dec, _, _, _ = load_data(path)
+    return lambda: transform_coordinates(ra, dec, 'equatorial', 'galactic', engine='matrix')
+
+
+def bench_solar_relative(path, workdir):
+    from mapplot.coordinates import compute_solar_relative_coords
+    from mapplot.data_io import load_data
+
+    mjd, ra, dec, _, _, _ = load_data(path, read_mjd=True)
+    return lambda: compute_solar_relative_coords(mjd, ra, dec, 'equatorial')
+
+
+def bench_bsc5(path, workdir):
+    from mapplot import catalog
+
+    def run():
+        # Parse the file every time, as a fresh process would
+        catalog._CATALOG_CACHE.clear()
+        catalog.get_bright_stars(6.5)
+    return run
+
+
+def bench_render_sky(path, workdir):
+    return _render([path, '-p', 'mollweide', '-g', '--cbar', '--catalog',
+                    '-o', os.path.join(workdir, 'sky.png')])
+
+
+def bench_render_earth(path, workdir):
+    # Without coastlines: their first use downloads Natural Earth data
+    return _render(['--earth', '--no-coastlines', '-p', 'robinson', '-g', path,
+                    '-o', os.path.join(workdir, 'earth.png')])
+
+
+def bench_animation_frame(path, workdir):
+    """Mean wall time per frame (update, draw and encode) of a GIF animation."""
+    mjd = np.loadtxt(path, usecols=0)
+    start, stop = float(mjd.min()), float(mjd.max())
+    fps = 5
+    report = os.path.join(workdir, 'animation.profile.json')
+    render = _render(['--animate', path, '--fps', str(fps), '--start-time', str(start),
+                      '--stop-time', str(stop),
+                      '--time-per-day', str(ANIMATION_FRAMES / ((stop - start) * fps)),
+                      '--figsize', '8', '5', '--dpi', '60',
+                      '--profile', '--profile-json', report,
+                      '-o', os.path.join(workdir, 'animation.gif')])
+
+    def run():
+        render()
+        with open(report) as f:
+            return json.load(f)['frames']['mean']
+    return run
+
+
+# name -> (setup function, input source, sizes in points; None for fixed-size inputs)
+BENCHMARKS = {
+    'read_data': (bench_read_data, POSITIONS, [10**4, 10**5, 10**6, 10**7]),
+    'read_data_mjd': (bench_read_data_mjd, TRACKS, [10**4, 10**5, 10**6, 10**7]),
+    'transform_astropy': (bench_transform_astropy, POSITIONS, [10**4, 10**5, 10**6, 10**7]),
+    'transform_matrix': (bench_transform_matrix, POSITIONS, [10**4, 10**5, 10**6, 10**7]),
+    'solar_relative': (bench_solar_relative, TRACKS, [10**4, 10**5, 10**6, 10**7]),
+    'bsc5': (bench_bsc5, None, [None]),
+    'render_sky': (bench_render_sky, POSITIONS, [10**4, 10**5, 10**6]),
+    'render_earth': (bench_render_earth, POSITIONS, [10**4, 10**5, 10**6]),
+    'animation_frame': (bench_animation_frame, TRACKS, [10**4, 10**5]),
+}
+
+
+def run_benchmark(name, n_points, workdir, repeat=3, inputs='scaled'):
+    """
+    Time one benchmark at one size.
+
+    The setup (making the input, reading it for the transforms) is not
+    timed. One untimed run warms up imports and caches, then repeat runs
+    are timed. A run that returns a number reports that many seconds
+    itself (the animation's mean frame time).
+
+    Returns:
+    - dict with name, points, inputs, median, min and runs (seconds)
+    """
+    setup, source, _ = BENCHMARKS[name]
+    with _quiet():
+        path = None if source is None else input_path(source, n_points, workdir, inputs)
+        run = setup(path, workdir)
+        run()
+        runs = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            measured = run()
+            elapsed = time.perf_counter() - start
+            runs.append(measured if isinstance(measured, float) else elapsed)
+    return {'name': name, 'points': n_points, 'inputs': inputs, 'median': round(statistics.median(runs), 6),
+            'min': round(min(runs), 6), 'runs': [round(value, 6) for value in runs]}
+
+
+def result_key(result):
+    """
+    'read_data@100000' ('read_data@100000/synth' on synthetic inputs), or
+    just the name for fixed-size benchmarks.
+    """
+    if result['points'] is None:
+        return result['name']
+    suffix = '/synth' if result.get('inputs') == 'synth' else ''
+    return f"{result['name']}@{result['points']}{suffix}"
+
+
+def environment():
+    """Versions and machine details stored with the results."""
+    import matplotlib
+    import astropy
+
+    from mapplot import __version__
+
+    return {
+        'mapplot': __version__,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'astropy': astropy.__version__,
+        'matplotlib': matplotlib.__version__,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'date': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare results with a baseline's, by median.
+
+    Returns:
+    - list of (key, baseline median, median, ratio, status) where status is
+      'slower' above 1 + tolerance times the baseline, 'faster' below
+      1 / (1 + tolerance) times it, 'new' without a baseline entry and
+      'ok' otherwise
+    """
+    previous = {result_key(result): result for result in baseline['results']}
+    rows = []
+    for result in results:
+        key = result_key(result)
+        if key not in previous:
+            rows.append((key, None, result['median'], None, 'new'))
+            continue
+        ratio = result['median'] / previous[key]['median']
+        if ratio > 1 + tolerance:
+            status = 'slower'
+        elif ratio < 1 / (1 + tolerance):
+            status = 'faster'
+        else:
+            status = 'ok'
+        rows.append((key, previous[key]['median'], result['median'], ratio, status))
+    return rows
+
+
+def _seconds(value):
+    if value is None:
+        return '-'
+    return f"{value * 1000:.1f} ms" if value < 1 else f"{value:.2f} s"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the mapplot pipeline')
+    parser.add_argument('--only', nargs='+', metavar='NAME', choices=sorted(BENCHMARKS),
+                        help='Run only these benchmarks (default: all)')
+    parser.add_argument('--max-points', type=float, default=1e5,
+                        help='Skip sizes above this many points (default: 1e5; '
+                             'the sizes go up to 1e7)')
+    parser.add_argument('--inputs', choices=['scaled', 'synth'], default='scaled',
+                        help='Bundled data files scaled up (default), or "mapplot synth" data')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per size (default: 3)')
+    parser.add_argument('--workdir',
+                        help='Directory for the scaled data files and rendered images '
+                             '(default: a "mapplot-benchmarks" directory in the system temp directory)')
+    parser.add_argument('-o', '--output', default='benchmark-results.json',
+                        help='JSON file to write the results to (default: benchmark-results.json)')
+    parser.add_argument('--baseline', metavar='FILE',
+                        help='Results JSON of an earlier run to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed slowdown against the baseline, as a fraction (default: 0.25)')
+    parser.add_argument('--list', action='store_true', help='List the benchmarks and sizes and exit')
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, (_, _, sizes) in BENCHMARKS.items():
+            print(f"{name:<20} {', '.join('-' if n is None else f'{n:.0e}' for n in sizes)}")
+        return 0
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    workdir = args.workdir or os.path.join(tempfile.gettempdir(), 'mapplot-benchmarks')
+    os.makedirs(workdir, exist_ok=True)
+
+    results = []
+    print(f"{'benchmark':<32} {'median':>10} {'min':>10} {'ns/point':>10}")
+    for name in args.only or BENCHMARKS:
+        for n_points in BENCHMARKS[name][2]:
+            if n_points is not None and n_points > args.max_points:
+                continue
+            result = run_benchmark(name, n_points, workdir, repeat=args.repeat,
+                                   inputs=args.inputs)
+            results.append(result)
+            per_point = f"{result['median'] / n_points * 1e9:,.0f}" if n_points else ''
+            print(f"{result_key(result):<32} {_seconds(result['median']):>10} "
+                  f"{_seconds(result['min']):>10} {per_point:>10}", flush=True)
+
+    with open(args.output, 'w') as f:
+        json.dump({'environment': environment(), 'results': results}, f, indent=2)
+        f.write('\n')
+    print(f"\nResults written to {args.output}")
+
+    if baseline is None:
+        return 0
+
+    current = environment()
+    for key in ('machine', 'cpu_count', 'python'):
+        if baseline['environment'].get(key) != current[key]:
+            print(f"Warning: baseline {key} is {baseline['environment'].get(key)}, "
+                  f"this run's is {current[key]}", file=sys.stderr)
+
+    rows = compare(results, baseline, args.tolerance)
+    print(f"\n{'benchmark':<32} {'baseline':>10} {'now':>10} {'ratio':>7}")
+    for key, before, now, ratio, status in rows:
+        ratio = '' if ratio is None else f"{ratio:.2f}x"
+        flag = '' if status == 'ok' else f"  {status}"
+        print(f"{key:<32} {_seconds(before):>10} {_seconds(now):>10} {ratio:>7}{flag}")
+
+    slower = [row[0] for row in rows if row[4] == 'slower']
+    if slower:
+        print(f"\n{len(slower)} benchmark(s) slower than the baseline by more than "
+              f"{args.tolerance:.0%}: {', '.join(slower)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,3 +3,5 @@ mapplot - Command-line tool for plotting geographic and celestial data
 """
 
 __version__ = "2.1.0"
+
+from mapplot.renderer import MapRenderer, MapplotError, RenderOptions  # noqa: E402,F401
@@ -0,0 +1,156 @@
+"""Density rasters aggregated chunk by chunk from streamed inputs."""
+
+import sys
+
+import numpy as np
+
+from mapplot.coordinates import transform_to_plot_frame
+from mapplot.data_io import input_frame, iter_data_chunks
+from mapplot.parallel import shared_pool
+from mapplot.profiling import stage, timed_iter
+
+
+class DensityGrid:
+    """
+    Fixed-size longitude/latitude raster of counts and value statistics.
+
+    Points are added in batches, so a stream of any length can be binned
+    while only one batch and the grid are held in memory. Value sums,
+    minima and maxima are only kept when track_values is set.
+    """
+
+    def __init__(self, n_lon=360, n_lat=180, lon_min=-180.0, track_values=False):
+        self.n_lon = int(n_lon)
+        self.n_lat = int(n_lat)
+        self.lon_min = float(lon_min)
+        self.lon_edges = np.linspace(self.lon_min, self.lon_min + 360.0, self.n_lon + 1)
+        self.lat_edges = np.linspace(-90.0, 90.0, self.n_lat + 1)
+        self.counts = np.zeros((self.n_lat, self.n_lon), dtype=np.int64)
+        self.n_rows = 0
+
+        self.track_values = track_values
+        if track_values:
+            shape = self.counts.shape
+            self.value_counts = np.zeros(shape, dtype=np.int64)
+            self.sums = np.zeros(shape)
+            self.mins = np.full(shape, np.inf)
+            self.maxs = np.full(shape, -np.inf)
+
+    def cell_index(self, lon, lat):
+        """Flat cell index (row-major, latitude rows) of each point."""
+        lon = np.mod(np.asarray(lon, dtype=float) - self.lon_min, 360.0)
+        ix = np.minimum((lon * (self.n_lon / 360.0)).astype(np.int64), self.n_lon - 1)
+        iy = np.clip(((np.asarray(lat, dtype=float) + 90.0) * (self.n_lat / 180.0)).astype(np.int64),
+                     0, self.n_lat - 1)
+        return iy * self.n_lon + ix
+
+    def add(self, lon, lat, values=None):
+        """
+        Bin a batch of points (degrees) into the grid.
+
+        values holds one number per point for the mean/min/max statistics;
+        non-finite values are counted but left out of the statistics.
+        """
+        cells = self.cell_index(lon, lat)
+        size = self.counts.size
+        self.counts += np.bincount(cells, minlength=size).reshape(self.counts.shape)
+        self.n_rows += len(cells)
+
+        if not self.track_values or values is None:
+            return
+
+        values = np.asarray(values, dtype=float)
+        finite = np.isfinite(values)
+        cells, values = cells[finite], values[finite]
+        if len(cells) == 0:
+            return
+
+        self.value_counts += np.bincount(cells, minlength=size).reshape(self.counts.shape)
+        self.sums += np.bincount(cells, weights=values, minlength=size).reshape(self.counts.shape)
+
+        # Per-cell extremes of this batch: sort by cell and reduce each run
+        order = np.argsort(cells, kind='stable')
+        cells, values = cells[order], values[order]
+        occupied, starts = np.unique(cells, return_index=True)
+        mins, maxs = self.mins.reshape(-1), self.maxs.reshape(-1)
+        mins[occupied] = np.minimum(mins[occupied], np.minimum.reduceat(values, starts))
+        maxs[occupied] = np.maximum(maxs[occupied], np.maximum.reduceat(values, starts))
+
+    def merge(self, other):
+        """Combine another grid with the same shape into this one."""
+        if other.counts.shape != self.counts.shape or other.lon_min != self.lon_min:
+            raise ValueError("Cannot merge density grids with different shapes")
+        self.counts += other.counts
+        self.n_rows += other.n_rows
+        if self.track_values and other.track_values:
+            self.value_counts += other.value_counts
+            self.sums += other.sums
+            np.minimum(self.mins, other.mins, out=self.mins)
+            np.maximum(self.maxs, other.maxs, out=self.maxs)
+
+    def statistic(self, stat='count'):
+        """
+        Per-cell statistic as a masked array (cells without data are masked).
+
+        Parameters:
+        - stat: 'count', 'mean', 'min' or 'max'
+        """
+        if stat == 'count':
+            return np.ma.masked_equal(self.counts, 0)
+        if not self.track_values:
+            raise ValueError(f"'{stat}' needs a grid created with track_values=True")
+
+        empty = self.value_counts == 0
+        if stat == 'mean':
+            with np.errstate(invalid='ignore', divide='ignore'):
+                result = self.sums / self.value_counts
+        elif stat == 'min':
+            result = self.mins
+        elif stat == 'max':
+            result = self.maxs
+        else:
+            raise ValueError(f"Unknown density statistic: {stat}")
+        return np.ma.masked_array(result, mask=empty)
+
+
+def build_density_grid(args, chunk_rows=None):
+    """
+    Stream every input file in chunks and bin the plot-frame positions.
+
+    Each chunk is read, transformed into the plot frame and added to the
+    grid before the next chunk is read, so peak memory depends only on the
+    chunk size and the grid size. Progress is printed after every chunk.
+    With --workers > 1, chunks larger than --chunk-size are transformed on
+    one pool of processes shared by all chunks and files.
+
+    Returns:
+    - DensityGrid
+    """
+    chunk_rows = chunk_rows or args.chunk_rows
+    track_values = args.density_stat != 'count'
+    grid = DensityGrid(*args.density_bins, track_values=track_values)
+
+    # One pool for the transforms of all chunks (--workers), not one per chunk
+    with shared_pool(args.workers):
+        for filename in args.files:
+            file_rows = 0
+            for mjd, coord1, coord2, _, colors, _ in timed_iter('read_data', iter_data_chunks(
+                    filename, chunk_rows=chunk_rows, ignore_extra=not track_values,
+                    has_mjd=args.solar_relative, column_map=args.columns, hdu=args.hdu)):
+                if args.solar_relative and mjd is None:
+                    print("Error: --solar-relative requires MJD as first column", file=sys.stderr)
+                    sys.exit(1)
+                if track_values and colors is None and len(coord1):
+                    print(f"Error: --density-stat {args.density_stat} needs a color (value) "
+                          f"column in {filename}", file=sys.stderr)
+                    sys.exit(1)
+
+                lon, lat = transform_to_plot_frame(args, mjd, coord1, coord2,
+                                                   input_coord=input_frame(filename, args))
+                with stage('bin'):
+                    grid.add(lon, lat, colors)
+
+                file_rows += len(coord1)
+                print(f"  {filename}: {file_rows:,} rows processed", file=sys.stderr)
+
+    return grid
@@ -1,17 +1,32 @@
 """Animation engine for time-series visualization."""
 
 import sys
-from collections import defaultdict
 
 import numpy as np
-import matplotlib.colors as mcolors
 import cartopy.crs as ccrs
 from matplotlib.animation import FuncAnimation, FFMpegWriter, PillowWriter
 from matplotlib.ticker import FuncFormatter
 
 from mapplot.constants import MARKERS
 from mapplot.config import get_data_colors
-from mapplot.coordinates import get_sun_position, mjd_to_year, get_current_mjd, transform_coordinates
+from mapplot.coordinates import (get_sun_position, mjd_to_year, get_current_mjd,
+                                  sun_longitude, transform_coordinates, wrap_longitude)
+from mapplot.profiling import timed
+
+
+def corotated_longitudes(ecl_lon, mjd, args):
+    """
+    Plot longitudes of ecliptic longitudes ecl_lon in the frame co-rotating
+    with the Sun at time mjd (--corotate).
+
+    The Sun's longitude is taken in the same equinox (--equinox) as ecl_lon,
+    so at each record's own epoch this is its static --solar-relative
+    longitude.
+    """
+    lons = wrap_longitude(ecl_lon - sun_longitude(mjd, args.equinox) - args.solar_center)
+    if args.projection in ['mollweide', 'hammer', 'aitoff']:
+        lons = np.where(lons > 180, lons - 360, lons)
+    return lons
 
 
 def create_animation(args, ax, fig, all_data, palette_name, observatories=None, obs_dates=None, ax_timeline=None):
@@ -19,7 +34,8 @@ def create_animation(args, ax, fig, all_data, palette_name, observatories=None,
     Create animation using FuncAnimation.
 
     Parameters:
-    - observatories: list of observatory dicts with code, lon, lat, name
+    - all_data: AnimationData sorted by MJD
+    - observatories: ObservatoryTable
     - obs_dates: dict mapping code -> {start_mjd, end_mjd}
     - ax_timeline: optional secondary axis for timeline plot
     """
@@ -27,8 +43,8 @@ def create_animation(args, ax, fig, all_data, palette_name, observatories=None,
     marker = MARKERS.get(args.marker, args.marker)
 
     # Calculate time-based animation parameters
-    data_mjd_start = all_data[0]['mjd']
-    data_mjd_end = all_data[-1]['mjd']
+    data_mjd_start = all_data.mjd[0]
+    data_mjd_end = all_data.mjd[-1]
 
     # Use specified start time or earliest data point
     if args.start_time is not None:
@@ -137,8 +153,17 @@ def create_animation(args, ax, fig, all_data, palette_name, observatories=None,
     sun_trail = []
     max_sun_trail = 8
 
-    # Pre-compute MJD lookup table for fast binary search
-    mjd_values = np.array([record['mjd'] for record in all_data])
+    # Observatories with operating dates, and their dates, as arrays
+    animated_obs = None
+    if observatories is not None and len(observatories) and obs_dates and args.animate_observatories:
+        animated_obs = observatories.take(observatories.select(obs_dates))
+        codes = np.char.upper(animated_obs.codes).tolist()
+        obs_start = np.array([obs_dates[code]['start_mjd'] for code in codes], dtype=float)
+        obs_end = np.array([obs_dates[code]['end_mjd'] for code in codes], dtype=float)
+
+    # MJD lookup table for fast binary search
+    mjd_values = all_data.mjd
+    n_files = len(args.files) if args.files else 0
 
     def init_frame():
         """Initialize animation."""
@@ -201,13 +226,11 @@ def create_animation(args, ax, fig, all_data, palette_name, observatories=None,
         if show_all:
             start_idx = 0
             end_idx = len(all_data)
-            visible_data = all_data[start_idx:end_idx]
         else:
             if frame_num == 0 and args.show_before_start:
                 start_time_idx = np.searchsorted(mjd_values, mjd_start, side='left')
                 start_idx = 0
                 end_idx = max(current_idx + 1, start_time_idx)
-                visible_data = all_data[start_idx:end_idx]
             else:
                 if args.trail_days:
                     cutoff_mjd = current_mjd - args.trail_days
@@ -218,42 +241,48 @@ def create_animation(args, ax, fig, all_data, palette_name, observatories=None,
                     start_idx = 0
 
                 end_idx = current_idx + 1
-                visible_data = all_data[start_idx:end_idx]
 
-        if not visible_data:
+        if end_idx <= start_idx:
             return []
 
+        visible = slice(start_idx, end_idx)
+        visible_lons = all_data.lon[visible]
+
+        # Re-project into the frame co-rotating with the Sun at this frame's time
+        if args.corotate:
+            visible_lons = corotated_longitudes(all_data.ecl_lon[visible], current_mjd, args)
+
         # Clear previous scatter plots
         for artist in scatter_artists.values():
             artist.remove()
         scatter_artists.clear()
 
-        # Group by file for separate scatter plots
-        by_file = defaultdict(list)
-        for record in visible_data:
-            by_file[record['file_index']].append(record)
+        # Group by file (in order of first appearance) for separate scatter plots
+        visible_files = all_data.file_index[visible]
+        file_ids, first_seen = np.unique(visible_files, return_index=True)
 
         artists = []
 
         # Plot each file's points
-        for file_idx, records in by_file.items():
-            lons = np.array([r['lon'] for r in records])
-            lats = np.array([r['lat'] for r in records])
-            sizes = np.array([r['size'] for r in records])
-            colors = [r['color'] for r in records]
-
-            if args.trail_fade and len(records) > 1:
-                alphas = np.linspace(0.2, 1.0, len(records))
+        for file_idx in file_ids[np.argsort(first_seen)]:
+            in_file = visible_files == file_idx
+            lons = visible_lons[in_file]
+            lats = all_data.lat[visible][in_file]
+            sizes = all_data.size[visible][in_file]
+            colors = all_data.color[visible][in_file]
+
+            if args.trail_fade and len(lons) > 1:
+                alphas = np.linspace(0.2, 1.0, len(lons))
             else:
-                alphas = np.full(len(records), 0.7)
+                alphas = np.full(len(lons), 0.7)
+
+            colors_with_alpha = colors.copy()
+            colors_with_alpha[:, 3] = alphas
 
             if args.highlight_current and not show_all and current_idx < len(all_data):
-                current_record = all_data[current_idx]
-                if file_idx == current_record['file_index']:
+                if file_idx == all_data.file_index[current_idx]:
                     if len(lons) > 1:
-                        colors_with_alpha = [(mcolors.to_rgb(c) + (alpha,))
-                                            for c, alpha in zip(colors[:-1], alphas[:-1])]
-                        sc = ax.scatter(lons[:-1], lats[:-1], s=sizes[:-1], c=colors_with_alpha,
+                        sc = ax.scatter(lons[:-1], lats[:-1], s=sizes[:-1], c=colors_with_alpha[:-1],
                                        marker=marker, edgecolors='none',
                                        transform=ccrs.PlateCarree(), zorder=3)
                         scatter_artists[f'file_{file_idx}_trail'] = sc
@@ -266,16 +295,12 @@ def create_animation(args, ax, fig, all_data, palette_name, observatories=None,
                     scatter_artists[f'file_{file_idx}_current'] = sc_current
                     artists.append(sc_current)
                 else:
-                    colors_with_alpha = [(mcolors.to_rgb(c) + (alpha,))
-                                        for c, alpha in zip(colors, alphas)]
                     sc = ax.scatter(lons, lats, s=sizes, c=colors_with_alpha,
                                    marker=marker, edgecolors='none',
                                    transform=ccrs.PlateCarree(), zorder=3)
                     scatter_artists[f'file_{file_idx}'] = sc
                     artists.append(sc)
             else:
-                colors_with_alpha = [(mcolors.to_rgb(c) + (alpha,))
-                                    for c, alpha in zip(colors, alphas)]
                 sc = ax.scatter(lons, lats, s=sizes, c=colors_with_alpha,
                                marker=marker, edgecolors='none',
                                transform=ccrs.PlateCarree(), zorder=3)
@@ -283,31 +308,19 @@ def create_animation(args, ax, fig, all_data, palette_name, observatories=None,
                 artists.append(sc)
 
         # Plot observatories if animated
-        if observatories and obs_dates and args.animate_observatories:
+        if animated_obs is not None:
             grace_period_start = mjd_end - 365.25
             fade_duration_days = 3.0 / (24.0 * 3600.0) * (1000.0 / interval)
             fade_cutoff = mjd_start + fade_duration_days
 
-            active_obs = []
-            for obs in observatories:
-                code = obs['code'].upper()
-                if code in obs_dates:
-                    dates = obs_dates[code]
-                    obs_start = dates['start_mjd']
-                    obs_end = dates['end_mjd']
-
-                    if obs_start > current_mjd:
-                        continue
-                    if obs_end < mjd_start and current_mjd > fade_cutoff:
-                        continue
-                    if obs_end >= current_mjd or obs_end >= grace_period_start:
-                        active_obs.append(obs)
-
-            if active_obs:
-                obs_lons = [obs['lon'] for obs in active_obs]
-                obs_lats = [obs['lat'] for obs in active_obs]
-
-                obs_scatter = ax.scatter(obs_lons, obs_lats, s=50, c='red',
+            active = obs_start <= current_mjd
+            if current_mjd > fade_cutoff:
+                active &= obs_end >= mjd_start
+            active &= (obs_end >= current_mjd) | (obs_end >= grace_period_start)
+            active_obs = animated_obs.take(np.flatnonzero(active))
+
+            if len(active_obs):
+                obs_scatter = ax.scatter(active_obs.lon, active_obs.lat, s=50, c='red',
                                         marker='^', edgecolors='darkred',
                                         linewidths=1, alpha=0.8,
                                         transform=ccrs.PlateCarree(), zorder=5)
@@ -315,14 +328,14 @@ def create_animation(args, ax, fig, all_data, palette_name, observatories=None,
                 artists.append(obs_scatter)
 
                 if len(active_obs) <= 30:
-                    for obs in active_obs:
-                        obs_label = ax.text(obs['lon'], obs['lat'], f" {obs['code']}",
+                    for code, lon, lat in zip(active_obs.codes, active_obs.lon, active_obs.lat):
+                        obs_label = ax.text(lon, lat, f" {code}",
                                            fontsize=6, ha='left', va='center',
                                            transform=ccrs.PlateCarree(), zorder=6,
                                            bbox=dict(boxstyle='round,pad=0.2',
                                                    facecolor='white', alpha=0.7,
                                                    edgecolor='none'))
-                        scatter_artists[f"obs_label_{obs['code']}"] = obs_label
+                        scatter_artists[f"obs_label_{code}"] = obs_label
                         artists.append(obs_label)
 
             if obs_count_text:
@@ -342,7 +355,11 @@ def create_animation(args, ax, fig, all_data, palette_name, observatories=None,
         if show_sun_frame and not args.earth:
             sun_lon, sun_lat = get_sun_position(current_mjd)
 
-            if args.plot_coord == 'ecliptic':
+            if args.solar_relative:
+                # The Sun sits at zero elongation in the solar-relative frame
+                plot_sun_lon = float(wrap_longitude(-args.solar_center))
+                plot_sun_lat = 0.0
+            elif args.plot_coord == 'ecliptic':
                 plot_sun_lon, plot_sun_lat = sun_lon, sun_lat
             else:
                 plot_sun_lon, plot_sun_lat = transform_coordinates(
@@ -408,20 +425,16 @@ def create_animation(args, ax, fig, all_data, palette_name, observatories=None,
 
             window_start_idx = np.searchsorted(mjd_values, cutoff_mjd, side='left')
             window_end_idx = current_idx + 1
-            window_data = all_data[window_start_idx:window_end_idx]
-
-            file_counts = defaultdict(int)
-            for record in window_data:
-                file_counts[record['file_index']] += 1
-
-            total_count = len(window_data)
+            file_counts = np.bincount(all_data.file_index[window_start_idx:window_end_idx],
+                                      minlength=n_files)
+            total_count = int(file_counts.sum())
 
             window_info = f'({full_window_days:.0f} day window)'
             stats_lines = [f'Objects: {total_count} {window_info}']
 
             if len(args.labels) > 1:
                 for i, label in enumerate(args.labels):
-                    count = file_counts.get(i, 0)
+                    count = file_counts[i] if i < len(file_counts) else 0
                     if total_count > 0:
                         fraction = count / total_count
                         percentage = int(round(fraction * 100))
@@ -442,17 +455,14 @@ def create_animation(args, ax, fig, all_data, palette_name, observatories=None,
             if stats_text:
                 stats_text.remove()
 
-            file_counts = defaultdict(int)
-            for record in all_data:
-                file_counts[record['file_index']] += 1
-
+            file_counts = np.bincount(all_data.file_index, minlength=n_files)
             total_count = len(all_data)
 
             stats_lines = [f'Total: {total_count}']
 
             if len(args.labels) > 1:
                 for i, label in enumerate(args.labels):
-                    count = file_counts.get(i, 0)
+                    count = file_counts[i] if i < len(file_counts) else 0
                     if total_count > 0:
                         fraction = count / total_count
                         percentage = int(round(fraction * 100))
@@ -476,13 +486,10 @@ def create_animation(args, ax, fig, all_data, palette_name, observatories=None,
 
             window_start_idx = np.searchsorted(mjd_values, cutoff_mjd, side='left')
             window_end_idx = current_idx + 1
-            window_data = all_data[window_start_idx:window_end_idx]
-
-            file_counts = defaultdict(int)
-            for record in window_data:
-                file_counts[record['file_index']] += 1
+            file_counts = np.bincount(all_data.file_index[window_start_idx:window_end_idx],
+                                      minlength=n_files)
 
-            timeline_data.append((current_mjd, dict(file_counts)))
+            timeline_data.append((current_mjd, dict(enumerate(file_counts.tolist()))))
 
             if not timeline_started and len(timeline_data) > 0:
                 first_mjd = timeline_data[0][0]
@@ -492,7 +499,6 @@ def create_animation(args, ax, fig, all_data, palette_name, observatories=None,
             if timeline_started or is_keyframe:
                 mjds = [d[0] for d in timeline_data]
 
-                n_files = len(args.files) if args.files else 0
                 file_data = []
                 for file_idx in range(n_files):
                     counts = [d[1].get(file_idx, 0) for d in timeline_data]
@@ -522,7 +528,7 @@ def create_animation(args, ax, fig, all_data, palette_name, observatories=None,
 
     # Create animation
     print(f"Creating animation: {total_frames} frames at {1000/interval:.1f} fps", file=sys.stderr)
-    anim = FuncAnimation(fig, update_frame, frames=total_frames,
+    anim = FuncAnimation(fig, timed('update_frame', update_frame), frames=total_frames,
                         init_func=init_frame, blit=False, interval=interval,
                         repeat=True)
 
@@ -0,0 +1,207 @@
+"""Batch rendering from a manifest (mapplot batch)."""
+
+import json
+import os
+import shlex
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from mapplot.config import YAML_AVAILABLE
+
+if YAML_AVAILABLE:
+    import yaml
+
+# Options that decide the map background; jobs that also share inputs go to the same worker
+BACKGROUND_OPTIONS = ['earth', 'projection', 'plot_coord', 'catalog', 'max_mag', 'ecliptic',
+                      'galactic_plane', 'celestial_equator', 'observatories', 'obs_codes', 'extent']
+
+
+def options_to_argv(options):
+    """
+    Turn a mapping of CLI options into an argument list.
+
+    Keys are option names without dashes ('grid_spacing' or 'grid-spacing'
+    for --grid-spacing; one-letter keys such as 'o' become -o). True adds a
+    flag, False and None leave the option out, and lists give one value per
+    item. 'files' holds the input files.
+    """
+    options = dict(options)
+    files = options.pop('files', None) or []
+    argv = [files] if isinstance(files, str) else list(files)
+
+    for key, value in options.items():
+        if value is None or value is False:
+            continue
+        flag = f"-{key}" if len(key) == 1 else f"--{key.replace('_', '-')}"
+        if value is True:
+            argv.append(flag)
+        elif isinstance(value, (list, tuple)):
+            argv.extend([flag] + [str(item) for item in value])
+        else:
+            argv.extend([flag, str(value)])
+    return [str(arg) for arg in argv]
+
+
+def load_manifest(path):
+    """
+    Read a batch manifest (YAML, or JSON for .json files).
+
+    The manifest has a 'jobs' list and optional 'defaults' applied to every
+    job. A job is a mapping of options (see options_to_argv) with an
+    optional 'name', a mapping with 'args' holding a command line (string
+    or list), or just the command line.
+
+    Returns:
+    - list of (name, argv)
+    """
+    with open(path) as f:
+        if path.lower().endswith('.json'):
+            manifest = json.load(f)
+        elif YAML_AVAILABLE:
+            manifest = yaml.safe_load(f)
+        else:
+            raise ValueError("YAML manifests need PyYAML (pip install pyyaml); "
+                             "or write the manifest as .json")
+
+    if not isinstance(manifest, dict) or not isinstance(manifest.get('jobs'), list):
+        raise ValueError(f"{path}: manifest needs a 'jobs' list")
+
+    defaults = options_to_argv(manifest.get('defaults') or {})
+    jobs = []
+    for i, entry in enumerate(manifest['jobs']):
+        name = f"job{i + 1}"
+        if isinstance(entry, dict):
+            entry = dict(entry)
+            name = str(entry.pop('name', name))
+            if 'args' in entry:
+                entry = entry['args']
+            else:
+                jobs.append((name, defaults + options_to_argv(entry)))
+                continue
+        argv = shlex.split(entry) if isinstance(entry, str) else [str(arg) for arg in entry]
+        jobs.append((name, defaults + argv))
+    return jobs
+
+
+def group_key(args, cwd):
+    """Jobs with the same inputs and background share a worker and its caches."""
+    inputs = tuple(os.path.normpath(os.path.join(cwd, f)) for f in args.files)
+    background = tuple(repr(getattr(args, name, None)) for name in BACKGROUND_OPTIONS)
+    return inputs, background
+
+
+def split_groups(groups, workers):
+    """
+    Split groups of jobs into about `workers` batches, the unit of work sent
+    to the pool.
+
+    A group larger than its share of the jobs (total / workers) is split
+    into even, contiguous batches, so that many jobs on the same inputs
+    still run on all the workers; each worker then warms its caches for the
+    group once. Smaller groups stay whole.
+
+    Parameters:
+    - groups: lists of job indices, largest first
+    - workers: number of worker processes
+
+    Returns:
+    - list of (group number, job indices), largest batches first
+    """
+    total = sum(len(indices) for indices in groups)
+    share = max(1, -(-total // max(workers, 1)))
+    batches = []
+    for group, indices in enumerate(groups):
+        parts = -(-len(indices) // share)
+        for part in range(parts):
+            batch = indices[part * len(indices) // parts:(part + 1) * len(indices) // parts]
+            batches.append((group, batch))
+    return sorted(batches, key=lambda batch: len(batch[1]), reverse=True)
+
+
+def run_job_group(argv_list, cwd):
+    """
+    Render a batch of jobs of one group one after another in this worker process.
+
+    Parsed inputs are shared between the jobs through read_cache(); the
+    catalog and Natural Earth geometries stay loaded in the process.
+
+    Returns:
+    - list of render_job results, with the worker pid added
+    """
+    from mapplot.data_io import read_cache
+    from mapplot.server import render_job
+
+    results = []
+    with read_cache():
+        for argv in argv_list:
+            result = render_job(argv, cwd)
+            result['pid'] = os.getpid()
+            results.append(result)
+    return results
+
+
+def run_batch(args):
+    """Entry point for 'mapplot batch'."""
+    from mapplot.cli import parse_args
+    from mapplot.server import warm_worker
+
+    if args.workers < 1:
+        raise ValueError("--workers must be at least 1")
+
+    start = time.perf_counter()
+    cwd = os.path.dirname(os.path.abspath(args.manifest))
+    jobs = load_manifest(args.manifest)
+
+    summary = [{'name': name, 'argv': argv} for name, argv in jobs]
+    groups = {}
+    for index, (name, argv) in enumerate(jobs):
+        try:
+            job_args = parse_args(argv)
+        except SystemExit:
+            summary[index].update(status=2, seconds=0.0, error='invalid arguments')
+            print(f"  {name}: invalid arguments: {shlex.join(argv)}", file=sys.stderr)
+            continue
+        summary[index]['output'] = job_args.output
+        groups.setdefault(group_key(job_args, cwd), []).append(index)
+
+    # Largest groups and batches first, so long runs start early
+    ordered = sorted(groups.values(), key=len, reverse=True)
+    batches = split_groups(ordered, args.workers)
+    workers = min(args.workers, max(len(batches), 1))
+    print(f"Rendering {sum(map(len, ordered))} job(s) in {len(ordered)} group(s) "
+          f"as {len(batches)} batch(es) with {workers} worker(s)", file=sys.stderr)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=warm_worker) as pool:
+        futures = {pool.submit(run_job_group, [jobs[i][1] for i in indices], cwd): (g, indices)
+                   for g, indices in batches}
+        for future in as_completed(futures):
+            group, indices = futures[future]
+            for index, result in zip(indices, future.result()):
+                summary[index].update(group=group, status=result['status'],
+                                      seconds=result['seconds'], pid=result['pid'])
+                if result['status'] != 0:
+                    summary[index]['error'] = (result['stderr'].strip().splitlines() or [''])[-1]
+                state = 'ok' if result['status'] == 0 else f"failed ({result['status']})"
+                print(f"  {summary[index]['name']}: {state} in {result['seconds']:.2f} s",
+                      file=sys.stderr)
+
+    report = {
+        'manifest': os.path.abspath(args.manifest),
+        'workers': workers,
+        'wall_seconds': round(time.perf_counter() - start, 3),
+        'jobs': summary,
+    }
+    text = json.dumps(report, indent=2)
+    if args.summary:
+        with open(args.summary, 'w') as f:
+            f.write(text + '\n')
+        print(f"Summary written to {args.summary}", file=sys.stderr)
+    else:
+        print(text)
+
+    failed = [job['name'] for job in summary if job.get('status') != 0]
+    print(f"Finished {len(summary) - len(failed)} of {len(summary)} job(s) in "
+          f"{report['wall_seconds']:.1f} s", file=sys.stderr)
+    if failed:
+        sys.exit(1)
@@ -3,6 +3,12 @@
 import os
 import sys
 
+from mapplot.streams import COMPRESSION_EXTENSIONS, open_text
+
+# Parsed catalog files: (path, mtime) -> list of (name, ra_deg, dec_deg, v_mag).
+# Lets a long-running process (mapplot serve) parse BSC5 once.
+_CATALOG_CACHE = {}
+
 
 def get_bright_stars(max_magnitude=6.0):
     """
@@ -19,32 +25,17 @@ def get_bright_stars(max_magnitude=6.0):
         os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data', 'bsc5_data.txt'),
     ]
 
-    for path in search_paths:
+    # Compressed copies (bsc5_data.txt.gz, ...) are found too
+    candidates = [path + ext for path in search_paths for ext in [''] + list(COMPRESSION_EXTENSIONS)]
+    for path in candidates:
         if os.path.exists(path):
             catalog_file = path
             break
 
     # Load from file if found
     if catalog_file:
-        catalog = []
         try:
-            with open(catalog_file, 'r') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line or line.startswith('#'):
-                        continue
-                    parts = line.split()
-                    if len(parts) >= 5:
-                        try:
-                            name = parts[1]
-                            ra_hours = float(parts[2])
-                            dec_deg = float(parts[3])
-                            v_mag = float(parts[4])
-                            if v_mag <= max_magnitude:
-                                ra_deg = ra_hours * 15.0
-                                catalog.append((name, ra_deg, dec_deg, v_mag))
-                        except (ValueError, IndexError):
-                            continue
+            catalog = [star for star in _read_catalog_file(catalog_file) if star[3] <= max_magnitude]
             if catalog:
                 print(f"Loaded {len(catalog)} stars from BSC5 (mag <= {max_magnitude})", file=sys.stderr)
                 return catalog
@@ -74,3 +65,30 @@ def get_bright_stars(max_magnitude=6.0):
             catalog.append((name, ra_deg, dec, mag))
 
     return catalog
+
+
+def _read_catalog_file(catalog_file):
+    """Parse every star of a BSC5 text file (cached until the file changes)."""
+    key = (os.path.abspath(catalog_file), os.path.getmtime(catalog_file))
+    if key in _CATALOG_CACHE:
+        return _CATALOG_CACHE[key]
+
+    stars = []
+    with open_text(catalog_file) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            parts = line.split()
+            if len(parts) >= 5:
+                try:
+                    name = parts[1]
+                    ra_hours = float(parts[2])
+                    dec_deg = float(parts[3])
+                    v_mag = float(parts[4])
+                    stars.append((name, ra_hours * 15.0, dec_deg, v_mag))
+                except (ValueError, IndexError):
+                    continue
+
+    _CATALOG_CACHE[key] = stars
+    return stars
@@ -1,13 +1,16 @@
 """Command-line argument parser."""
 
 import argparse
+import os
 
 from mapplot import __version__
-from mapplot.constants import TERRESTRIAL_PROJECTIONS, MARKERS
+from mapplot.constants import TERRESTRIAL_PROJECTIONS, MARKERS, DEFAULT_CHUNK_SIZE, DEFAULT_CHUNK_ROWS
 from mapplot.config import COLOR_PALETTES
+from mapplot.columns import parse_column_map
 
 
-def parse_args():
+def build_parser():
+    """Argument parser for plotting ('mapplot [options] files')."""
     parser = argparse.ArgumentParser(
         description='Plot geographic or celestial data with various projections',
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -54,6 +57,42 @@ Examples:
   # Ignore extra columns (use only lon/lat)
   mapplot --ignore-extra data_with_many_columns.txt
 
+  # FITS binary tables, with named columns mapped to roles
+  mapplot --solar-relative --columns mjd=MJD_OBS,ra=RA_DEG,dec=DEC_DEG survey.fits
+
+  # Stream from a pipeline into a density raster (never held in memory)
+  propagate_orbits | mapplot --density --cbar - -o density.png
+
+  # Out-of-core: mean magnitude per cell of a file larger than RAM
+  mapplot --density --density-stat mean --columns ra=1,dec=2,color=5 huge.txt.gz -o mean_h.png
+
+  # Keep a nightly detections plot up to date as the survey appends to the file
+  mapplot --follow --follow-interval 60 --solar-relative tonight.txt -o tonight.png
+
+  # Render through a warm daemon started with "mapplot serve"
+  mapplot --client --catalog -p mollweide -o stars.png
+
+  # Render every job of a manifest on a pool of workers (see mapplot batch --help)
+  mapplot batch scripts/demo_sky_batch.yaml --summary sandbox/demo_times.json
+
+  # Synthetic data for load testing (see mapplot synth --help)
+  mapplot synth tracks -n 1e6 -o tracks_1M.txt
+
+  # Download or refresh the MPC observatory list (see mapplot data --help)
+  mapplot data update
+
+  # Where does the time go? Stage timings, frame percentiles and peak RSS
+  mapplot --animate --profile tracks.txt -o tracks.mp4   # also writes tracks.mp4.profile.json
+
+  # Which stage holds the memory? Flag stages allocating over 500 MB at their peak
+  mapplot --animate --profile-memory --memory-budget 500 tracks.txt -o tracks.mp4
+
+  # Robust color scale: clip the colormap to the 1st-99th percentile of the color column
+  mapplot --columns ra=1,dec=2,color=5 --cmap-percentiles 1 99 --cbar a.txt b.txt -o p.png
+
+  # Wide text/CSV files: parse only the named or numbered columns
+  mapplot --animate --columns mjd=0,ra=3,dec=4,size=H orbits.txt -o orbits.mp4
+
 Tip: Close the plot window to exit cleanly, or use -o FILE to save without displaying.
 Default grid spacing is now 30 deg. Sky mode is the default; use --earth for terrestrial maps.
 
@@ -70,6 +109,7 @@ Data format:
   Terrestrial: lon lat [size] [color_value]
   Celestial: coord1 coord2 [size] [color_value]
   Solar-relative: MJD RA Dec [size] [color_value]
+  Columnar binary (.mapc): see 'mapplot convert --help'
         """
     )
 
@@ -95,6 +135,19 @@ Data format:
     parser.add_argument('--grid-coord',
                         choices=['equatorial', 'ecliptic', 'galactic'],
                         help='Grid coordinate system (default: same as --plot-coord)')
+    parser.add_argument('--transform-engine', default='astropy',
+                        choices=['astropy', 'matrix'],
+                        help='Coordinate transform engine: astropy (exact) or matrix '
+                             '(fast rotation matrices, default: astropy)')
+
+    # Performance
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f'Transform input data in blocks of this many points '
+                             f'(default: {DEFAULT_CHUNK_SIZE}, 0=disable)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of processes: with several input files, files are parsed and '
+                             'transformed concurrently; with one, its transform is chunked '
+                             'across processes (default: 1)')
 
     # Sky map overlays
     parser.add_argument('--ecliptic', action='store_true',
@@ -114,6 +167,11 @@ Data format:
                         help='Use solar-relative ecliptic longitude (input: MJD RA Dec)')
     parser.add_argument('--solar-center', type=float, default=180.0,
                         help='Center plot at this solar elongation in degrees (default: 180 for opposition)')
+    parser.add_argument('--equinox', default='J2000', choices=['J2000', 'date'],
+                        help='Ecliptic equinox for solar-relative mode: J2000 (default) or '
+                             'date (true ecliptic of each observation, epoch-binned)')
+    parser.add_argument('--epoch-bin-days', type=float, default=1.0,
+                        help='Epoch bin width in days for --equinox date (default: 1.0)')
 
     # Map projection and display
     parser.add_argument('-p', '--projection', default='plate-carree',
@@ -178,6 +236,58 @@ Data format:
                         help='Colormap for color column (default: viridis)')
     parser.add_argument('--cbar', action='store_true',
                         help='Show colorbar when using color column')
+    parser.add_argument('--cmap-percentiles', nargs=2, type=float, metavar=('LO', 'HI'),
+                        help='Scale the colormap between these percentiles of the color values '
+                             '(e.g. 1 99) instead of their min and max; computed with a quantile '
+                             'sketch during ingest, shared across all files')
+
+    # Density raster
+    parser.add_argument('--density', action='store_true',
+                        help='Plot a count raster instead of markers; inputs are streamed '
+                             'in chunks and binned on the fly')
+    parser.add_argument('--density-bins', type=int, nargs=2, default=[360, 180],
+                        metavar=('NLON', 'NLAT'),
+                        help='Density grid size in longitude and latitude (default: 360 180)')
+    parser.add_argument('--density-log', action='store_true',
+                        help='Logarithmic color scale for --density')
+    parser.add_argument('--density-stat', choices=['count', 'mean', 'min', 'max'], default='count',
+                        help='Per-cell statistic for --density: count of points, or mean/min/max '
+                             'of the color column (default: count)')
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS,
+                        help=f'Rows read, transformed and binned per chunk in --density mode '
+                             f'(default: {DEFAULT_CHUNK_ROWS})')
+
+    # Live tail
+    parser.add_argument('--follow', action='store_true',
+                        help='Keep running and watch the input files for appended rows; only new '
+                             'rows are parsed and added to the plot, and the -o image is rewritten '
+                             'atomically (static plots, uncompressed text inputs)')
+    parser.add_argument('--follow-interval', type=float, default=10.0, metavar='SECONDS',
+                        help='Seconds between checks for new rows with --follow (default: 10)')
+
+    # Render server
+    parser.add_argument('--client', action='store_true',
+                        help='Send this render to a running "mapplot serve" daemon; renders '
+                             'locally when no daemon is reachable or no -o is given')
+    parser.add_argument('--server', metavar='ADDRESS',
+                        help='Daemon address for --client: a Unix socket path or '
+                             'http://127.0.0.1:PORT (default: $MAPPLOT_SERVER, else the '
+                             'socket in the cache directory)')
+
+    # Profiling
+    parser.add_argument('--profile', action='store_true',
+                        help='Time each pipeline stage (wall and CPU, plus per-frame times for '
+                             'animations), print a summary table and write a JSON report')
+    parser.add_argument('--profile-json', metavar='FILE',
+                        help='Where --profile writes its JSON report '
+                             '(default: OUTPUT.profile.json, or mapplot-profile.json)')
+    parser.add_argument('--profile-memory', action='store_true',
+                        help='With --profile, also trace memory per stage (tracemalloc peak and '
+                             'retained allocations, bytes per input point, RSS); slows the '
+                             'render down. Implies --profile')
+    parser.add_argument('--memory-budget', type=float, metavar='MB',
+                        help='Warn about stages that allocate more than MB megabytes at their '
+                             'peak. Implies --profile-memory')
 
     # Background and colors
     parser.add_argument('--bgcolor', default='white',
@@ -208,6 +318,12 @@ Data format:
                         help='Use third column from data files as point labels')
     parser.add_argument('--ignore-extra', action='store_true',
                         help='Ignore all columns beyond first two (lon/lat or coord1/coord2)')
+    parser.add_argument('--columns', type=_column_map, metavar='ROLE=COL,...',
+                        help='Map columns to roles: mjd, ra/lon/coord1, dec/lat/coord2, '
+                             'size, color, label. COL is a header name or 0-based index '
+                             '(e.g. mjd=0,ra=3,dec=4,size=H); only mapped columns are parsed')
+    parser.add_argument('--hdu',
+                        help='FITS HDU index or extension name (default: first table)')
 
     # Animation options
     parser.add_argument('--animate', action='store_true',
@@ -238,14 +354,29 @@ Data format:
                         help='Legend location (default: upper right, fixed position)')
     parser.add_argument('--downsample', type=int, default=100000,
                         help='Auto-downsample if points exceed this (default: 100000, 0=disable)')
+    parser.add_argument('--downsample-mode', default='time',
+                        choices=['time', 'file', 'sky', 'stride'],
+                        help='Downsampling strategy: time (equal share per time bin, default), '
+                             'file (equal share per file), sky (equal share per equal-area sky cell), '
+                             'stride (every Nth point)')
+    parser.add_argument('--downsample-bins', type=int, default=1000,
+                        help='Number of time bins or sky cells for --downsample-mode time/sky (default: 1000)')
+    parser.add_argument('--downsample-seed', type=int, default=0,
+                        help='Random seed for downsampling (default: 0)')
     parser.add_argument('--start-time', type=float,
                         help='Animation start time (MJD). If not specified, uses earliest data point.')
     parser.add_argument('--stop-time', type=float,
                         help='Animation stop time (MJD). If not specified, uses current time.')
     parser.add_argument('--show-before-start', action='store_true',
                         help='Show all data points before start-time in first frame (otherwise starts empty)')
+    parser.add_argument('--time-index', action='store_true',
+                        help='Read only the --start-time/--stop-time window from MJD-sorted files, '
+                             'using a sidecar index (FILE.mjdidx.npz, built on first use)')
     parser.add_argument('--show-sun', action='store_true',
                         help='Show sun position moving along ecliptic during animation (sky mode only)')
+    parser.add_argument('--corotate', action='store_true',
+                        help='Solar-relative animation: re-project visible points into the frame '
+                             'co-rotating with the Sun at each frame\'s time')
     parser.add_argument('--stats-cycles', type=int, default=3,
                         help='Number of trail-day cycles to average for statistics (default: 3, range: 1-15)')
     parser.add_argument('--show-timeline', action='store_true',
@@ -265,4 +396,211 @@ Data format:
     parser.add_argument('--keyframe-delay', type=float, default=2.0,
                         help='Seconds to wait before showing keyframe (default: 2.0)')
 
-    return parser.parse_args()
+    return parser
+
+
+def parse_args(argv=None):
+    return build_parser().parse_args(argv)
+
+
+def _column_map(spec):
+    """argparse type for --columns."""
+    try:
+        return parse_column_map(spec)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def parse_convert_args(argv=None):
+    """Parse arguments for the 'mapplot convert' subcommand."""
+    from mapplot.columnar import FRAMES
+
+    parser = argparse.ArgumentParser(
+        prog='mapplot convert',
+        description='Convert a text or FITS table to the columnar binary format (.mapc)',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  mapplot convert --mjd tracks.txt tracks.mapc
+  mapplot convert --labels-from-file objects.txt objects.mapc
+  mapplot convert --frame galactic survey.fits survey.mapc
+  mapplot convert --columns mjd=MJD_OBS,ra=RA_DEG,dec=DEC_DEG --hdu 2 survey.fits survey.mapc
+        """
+    )
+    parser.add_argument('input', help='Input text or FITS file')
+    parser.add_argument('output', help='Output columnar file (.mapc)')
+    parser.add_argument('--mjd', action='store_true',
+                        help='Text input has MJD as first column')
+    parser.add_argument('--labels-from-file', action='store_true',
+                        help='Text input has a label column after the coordinates')
+    parser.add_argument('--frame', choices=FRAMES, default='equatorial',
+                        help='Coordinate system of the input (default: equatorial)')
+    parser.add_argument('--columns', type=_column_map, metavar='ROLE=NAME,...',
+                        help='Map input columns to roles (as for mapplot --columns)')
+    parser.add_argument('--hdu',
+                        help='FITS HDU index or extension name (default: first table)')
+
+    return parser.parse_args(argv)
+
+
+def parse_serve_args(argv=None):
+    """Parse arguments for the 'mapplot serve' subcommand."""
+    parser = argparse.ArgumentParser(
+        prog='mapplot serve',
+        description='Run a render daemon that keeps the plotting stack, catalogs and map '
+                    'backgrounds loaded; send jobs with "mapplot --client ..."',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  mapplot serve --workers 4
+  mapplot serve --socket /run/mapplot.sock
+  mapplot serve --port 8765
+  curl -s -X POST localhost:8765/render -d '{"argv": ["--catalog", "-o", "/tmp/a.png"]}' \\
+       -H "Authorization: Bearer $(cat ~/.cache/mapplot/serve-8765.token)"
+        """
+    )
+    parser.add_argument('--socket', metavar='PATH',
+                        help='Unix socket to listen on (default: serve.sock in the cache directory)')
+    parser.add_argument('--port', type=int,
+                        help='Listen for HTTP on 127.0.0.1:PORT instead of a Unix socket; '
+                             'clients must send the token written to the cache directory')
+    parser.add_argument('--workers', type=int, default=2,
+                        help='Render processes, i.e. jobs rendered at once (default: 2)')
+
+    return parser.parse_args(argv)
+
+
+def parse_batch_args(argv=None):
+    """Parse arguments for the 'mapplot batch' subcommand."""
+    parser = argparse.ArgumentParser(
+        prog='mapplot batch',
+        description='Render every job of a manifest across a pool of warm worker processes',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Manifest (YAML; relative paths are relative to the manifest):
+  defaults:
+    projection: mollweide
+    gridlines: true
+  jobs:
+    - name: stars
+      catalog: true
+      output: stars.png
+    - name: survey
+      files: [survey.txt]
+      solar_relative: true
+      output: survey.png
+    - args: --catalog --ecliptic -o ecliptic.png
+
+Examples:
+  mapplot batch nightly.yaml --workers 4 --summary nightly_times.json
+        """
+    )
+    parser.add_argument('manifest', help='Batch manifest (.yaml, or .json)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Worker processes (default: number of CPUs)')
+    parser.add_argument('--summary', metavar='FILE',
+                        help='Write the JSON summary of per-job wall times here (default: stdout)')
+
+    return parser.parse_args(argv)
+
+
+def _row_count(value):
+    """argparse type for row counts, accepting 1000000 or 1e6."""
+    try:
+        count = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid row count: {value!r}")
+    if count < 1 or count != int(count):
+        raise argparse.ArgumentTypeError(f"row count must be a positive integer: {value!r}")
+    return int(count)
+
+
+def parse_synth_args(argv=None):
+    """Parse arguments for the 'mapplot synth' subcommand."""
+    from mapplot.synth import KINDS
+
+    parser = argparse.ArgumentParser(
+        prog='mapplot synth',
+        description='Generate reproducible synthetic datasets of any size for load testing',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Kinds:
+  tracks    MJD RA Dec detections, sorted by MJD, in tracklets concentrated
+            toward opposition and the ecliptic (plot with --animate or --solar-relative)
+  sky       RA Dec of the same detections
+  labeled   RA Dec and object designation (plot with --labels-from-file)
+  earth     lon lat points, mostly in clusters (plot with --earth)
+  obsdates  observatory code, start and end MJD (for --obs-dates-file)
+
+The output format follows the file name: .mapc (columnar), .fits, or text
+(.txt, compressed for .gz, .bz2, .xz, .zst). The same kind, row count, seed
+and options give the same data in every format.
+
+Examples:
+  mapplot synth tracks -n 1e6 -o tracks_1M.txt
+  mapplot synth tracks -n 1e7 --extra -o tracks_10M.mapc
+  mapplot synth earth -n 2e5 --extra --seed 7 -o stations.txt.gz
+  mapplot synth obsdates -n 300 -o obs_dates.txt
+        """
+    )
+    parser.add_argument('kind', choices=KINDS, help='Kind of data to generate')
+    parser.add_argument('-n', '--rows', type=_row_count, required=True,
+                        help='Number of rows, e.g. 1000000 or 1e6')
+    parser.add_argument('-o', '--output', required=True, help='Output file')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    parser.add_argument('--extra', action='store_true',
+                        help='Add size and color columns (tracks, sky, earth)')
+    parser.add_argument('--start-mjd', type=float, default=60000.0,
+                        help='Start of the survey (default: 60000)')
+    parser.add_argument('--days', type=float, default=365.0,
+                        help='Length of the survey in days (default: 365)')
+    parser.add_argument('--per-object', type=int, default=4,
+                        help='Detections per object (default: 4)')
+
+    return parser.parse_args(argv)
+
+
+def parse_data_args(argv=None):
+    """Parse arguments for the 'mapplot data' subcommand."""
+    from mapplot.datastore import DATASETS
+
+    parser = argparse.ArgumentParser(
+        prog='mapplot data',
+        description='Download, refresh and inspect reference data kept in the user data directory',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Datasets:
+""" + ''.join(f"  {name:<20}{dataset['description']}\n" for name, dataset in DATASETS.items()) + """
+Data is stored at the 'paths' entry of the dataset in the config file
+(default ~/.local/share/mapplot/), or in $MAPPLOT_DATA_DIR. 'update' does
+nothing while the stored copy is younger than the maximum age; after that
+it asks the server whether the file changed (ETag, If-Modified-Since) and
+downloads it only if it did. Plotting always uses the stored copy as is.
+
+Examples:
+  mapplot data update
+  mapplot data update --force
+  mapplot data status
+  # Refresh daily from cron
+  0 6 * * * mapplot data update --max-age 1
+        """
+    )
+    parser.add_argument('action', choices=['update', 'status'],
+                        help='update: refresh stale data; status: show what is stored')
+    parser.add_argument('names', nargs='*', metavar='NAME',
+                        help='Datasets (default: all)')
+    parser.add_argument('--max-age', type=float, metavar='DAYS',
+                        help='Revalidate data older than this (default: data.max_age_days '
+                             'in the config file, 7)')
+    parser.add_argument('--force', action='store_true',
+                        help='Revalidate with the server even if the stored copy is fresh')
+    parser.add_argument('--url', help='Download from this URL instead of the default source')
+    parser.add_argument('--timeout', type=float, default=30.0,
+                        help='Network timeout in seconds (default: 30)')
+    parser.add_argument('--config', help='Configuration file (default: ~/.mapplotrc)')
+
+    args = parser.parse_args(argv)
+    for name in args.names:
+        if name not in DATASETS:
+            parser.error(f"unknown dataset: {name} (choose from {', '.join(DATASETS)})")
+    return args
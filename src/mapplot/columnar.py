@@ -0,0 +1,245 @@
+"""Native columnar binary data format, read with np.memmap.
+
+Layout:
+    8 bytes   magic b'MAPPLOTC'
+    8 bytes   header length (little-endian uint64)
+    N bytes   JSON header
+    padding   to a 64-byte boundary
+    columns   each column's raw data, starting on a 64-byte boundary
+
+The header records the row count, the frame system tag, each column's dtype
+and byte offset (relative to the start of the column data), and the label
+dictionary. Label strings are stored once in the dictionary; the label
+column holds int32 codes (-1 for no label).
+"""
+
+import json
+import os
+import struct
+import sys
+
+import numpy as np
+
+MAGIC = b'MAPPLOTC'
+FORMAT_VERSION = 1
+EXTENSION = '.mapc'
+
+# Column roles and their on-disk dtypes
+COLUMN_DTYPES = {
+    'mjd': '<f8',
+    'coord1': '<f8',
+    'coord2': '<f8',
+    'size': '<f4',
+    'color': '<f8',
+    'label': '<i4',
+}
+
+# Frame system tags
+FRAMES = ['equatorial', 'ecliptic', 'galactic', 'earth']
+
+_ALIGN = 64
+
+
+def _aligned(n):
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def is_columnar(filename):
+    """True if filename is a mapplot columnar file (checked by magic bytes)."""
+    if not isinstance(filename, str) or not os.path.isfile(filename):
+        return False
+    try:
+        with open(filename, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def read_header(filename):
+    """Read the JSON header of a columnar file; adds 'data_start' (absolute byte offset)."""
+    with open(filename, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{filename} is not a mapplot columnar file")
+        (header_len,) = struct.unpack('<Q', f.read(8))
+        header = json.loads(f.read(header_len).decode('utf-8'))
+
+    if header.get('version', 0) > FORMAT_VERSION:
+        raise ValueError(f"{filename}: unsupported columnar format version {header['version']}")
+
+    header['data_start'] = _aligned(len(MAGIC) + 8 + header_len)
+    return header
+
+
+def read_columnar(filename):
+    """
+    Open a columnar file without copying its data.
+
+    Returns:
+    - columns: dict of role -> read-only np.memmap (only roles present in the file)
+    - header: header dict (n_rows, frame, labels, sorted_by_mjd, ...)
+    """
+    header = read_header(filename)
+    n_rows = header['n_rows']
+
+    columns = {}
+    for name, info in header['columns'].items():
+        if n_rows == 0:
+            columns[name] = np.empty(0, dtype=info['dtype'])
+            continue
+        columns[name] = np.memmap(filename, dtype=info['dtype'], mode='r',
+                                  offset=header['data_start'] + info['offset'],
+                                  shape=(n_rows,))
+    return columns, header
+
+
+def decode_labels(codes, dictionary):
+    """Turn label codes back into a list of strings ('' for no label)."""
+    lookup = np.asarray(list(dictionary) + [''], dtype=object)
+    return lookup[np.where(codes < 0, len(dictionary), codes)].tolist()
+
+
+def write_columnar(filename, columns, frame='equatorial'):
+    """
+    Write arrays to a columnar file.
+
+    Parameters:
+    - filename: output path
+    - columns: dict of role -> array, from the roles in COLUMN_DTYPES;
+               coord1 and coord2 are required, 'label' may be a list of strings
+    - frame: frame system tag ('equatorial', 'ecliptic', 'galactic' or 'earth')
+    """
+    if frame not in FRAMES:
+        raise ValueError(f"Unknown frame: {frame}")
+    if 'coord1' not in columns or 'coord2' not in columns:
+        raise ValueError("Columnar files need coord1 and coord2 columns")
+
+    n_rows = len(columns['coord1'])
+    arrays = {}
+    dictionary = []
+
+    for name, values in columns.items():
+        if values is None:
+            continue
+        if name not in COLUMN_DTYPES:
+            raise ValueError(f"Unknown column role: {name}")
+        if name == 'label':
+            labels = np.asarray([lbl if lbl else '' for lbl in values], dtype=str)
+            dictionary, codes = np.unique(labels, return_inverse=True)
+            dictionary = dictionary.tolist()
+            if '' in dictionary:
+                empty = dictionary.index('')
+                dictionary.pop(empty)
+                codes = np.where(codes == empty, -1, np.where(codes > empty, codes - 1, codes))
+            values = codes
+        values = np.asarray(values, dtype=COLUMN_DTYPES[name])
+        if len(values) != n_rows:
+            raise ValueError(f"Column {name} has {len(values)} rows, expected {n_rows}")
+        arrays[name] = values
+
+    offset = 0
+    column_info = {}
+    for name, values in arrays.items():
+        column_info[name] = {'dtype': COLUMN_DTYPES[name], 'offset': offset}
+        offset = _aligned(offset + values.nbytes)
+
+    mjd = arrays.get('mjd')
+    header = {
+        'version': FORMAT_VERSION,
+        'n_rows': n_rows,
+        'frame': frame,
+        'sorted_by_mjd': bool(mjd is not None and (n_rows < 2 or np.all(mjd[1:] >= mjd[:-1]))),
+        'columns': column_info,
+        'labels': dictionary,
+    }
+    header_bytes = json.dumps(header).encode('utf-8')
+    data_start = _aligned(len(MAGIC) + 8 + len(header_bytes))
+
+    tmp_path = f'{filename}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(header_bytes)))
+        f.write(header_bytes)
+        for name, values in arrays.items():
+            f.seek(data_start + column_info[name]['offset'])
+            values.tofile(f)
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, filename)
+
+
+def read_columnar_data(filename, ignore_extra=False, labels_from_file=False, has_mjd=False,
+                       time_window=None):
+    """
+    Read a columnar file in the read_data return layout.
+
+    Returns:
+    - mjd, coord1, coord2, sizes, colors, labels (arrays are memmap views)
+    """
+    columns, header = read_columnar(filename)
+
+    if has_mjd and 'mjd' not in columns:
+        raise ValueError(f"{filename} has no MJD column")
+
+    rows = slice(None)
+    if time_window is not None and 'mjd' in columns:
+        mjd_min, mjd_max = time_window
+        mjd = columns['mjd']
+        if header.get('sorted_by_mjd'):
+            # Sorted files: slice the memmap, no copy
+            start = 0 if mjd_min is None else int(np.searchsorted(mjd, mjd_min, side='left'))
+            stop = len(mjd) if mjd_max is None else int(np.searchsorted(mjd, mjd_max, side='right'))
+            rows = slice(start, stop)
+        else:
+            rows = np.ones(len(mjd), dtype=bool)
+            if mjd_min is not None:
+                rows &= mjd >= mjd_min
+            if mjd_max is not None:
+                rows &= mjd <= mjd_max
+
+    def column(name):
+        return columns[name][rows] if name in columns else None
+
+    mjd = column('mjd') if has_mjd else None
+    coord1 = column('coord1')
+    coord2 = column('coord2')
+
+    if ignore_extra or labels_from_file:
+        sizes = None
+        colors = None
+    else:
+        sizes = column('size')
+        colors = column('color')
+
+    labels = None
+    if labels_from_file:
+        codes = column('label')
+        if codes is None:
+            labels = [''] * len(coord1)
+        else:
+            labels = decode_labels(codes, header['labels'])
+
+    return mjd, coord1, coord2, sizes, colors, labels
+
+
+def run_convert(args):
+    """Convert a text or FITS input file to the columnar format ('mapplot convert')."""
+    from mapplot.data_io import read_data
+    from mapplot.fitstable import is_fits, read_fits_columns
+
+    if is_fits(args.input):
+        columns = read_fits_columns(args.input, column_map=args.columns, hdu=args.hdu)
+    else:
+        mjd, coord1, coord2, sizes, colors, labels = read_data(
+            args.input,
+            labels_from_file=args.labels_from_file,
+            read_mjd=args.mjd,
+            column_map=args.columns
+        )
+        columns = {'mjd': mjd, 'coord1': coord1, 'coord2': coord2,
+                   'size': sizes, 'color': colors, 'label': labels}
+
+    write_columnar(args.output, columns, frame=args.frame)
+
+    present = [name for name, values in columns.items() if values is not None]
+    print(f"Converted {args.input} -> {args.output} "
+          f"({len(columns['coord1'])} rows, columns: {', '.join(present)}, frame: {args.frame})",
+          file=sys.stderr)
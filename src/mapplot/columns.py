@@ -0,0 +1,85 @@
+"""Column roles and name-to-role mapping for table inputs."""
+
+# Data roles understood by read_data
+ROLES = ['mjd', 'coord1', 'coord2', 'size', 'color', 'label']
+
+# Accepted spellings for each role in --columns
+ROLE_ALIASES = {
+    'mjd': 'mjd', 'time': 'mjd',
+    'coord1': 'coord1', 'lon': 'coord1', 'ra': 'coord1', 'l': 'coord1',
+    'coord2': 'coord2', 'lat': 'coord2', 'dec': 'coord2', 'b': 'coord2',
+    'size': 'size',
+    'color': 'color', 'colour': 'color',
+    'label': 'label', 'name': 'label',
+}
+
+# Column names recognised for each role when no mapping is given (lower case)
+DEFAULT_COLUMN_NAMES = {
+    'mjd': ['mjd', 'mjd_obs', 'time'],
+    'coord1': ['ra', 'lon', 'glon', 'elon', 'l', 'coord1'],
+    'coord2': ['dec', 'lat', 'glat', 'elat', 'b', 'coord2'],
+    'size': ['size'],
+    'color': ['color', 'colour'],
+    'label': ['label', 'name', 'id'],
+}
+
+
+def parse_column_map(spec):
+    """
+    Parse a --columns mapping such as 'mjd=MJD,ra=RA_DEG,dec=DEC_DEG' or 'mjd=0,ra=3'.
+
+    Parameters:
+    - spec: comma-separated ROLE=COLUMN pairs (COLUMN is a name or 0-based index)
+
+    Returns:
+    - dict of role -> column name or index string
+    """
+    column_map = {}
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        role, sep, column = item.partition('=')
+        role = ROLE_ALIASES.get(role.strip().lower())
+        if not sep or role is None or not column.strip():
+            raise ValueError(f"Invalid column mapping '{item}' "
+                             f"(expected ROLE=COLUMN with ROLE one of {', '.join(sorted(ROLE_ALIASES))})")
+        column_map[role] = column.strip()
+    return column_map
+
+
+def resolve_columns(names, column_map=None):
+    """
+    Match table column names to roles.
+
+    Parameters:
+    - names: column names available in the table
+    - column_map: explicit role -> column name or index mapping (from
+                  --columns); roles not listed are matched by DEFAULT_COLUMN_NAMES
+
+    Returns:
+    - dict of role -> column name, for the roles found
+    """
+    by_lower = {name.lower(): name for name in names}
+    column_map = column_map or {}
+    resolved = {}
+
+    for role in ROLES:
+        if role in column_map:
+            name = column_map[role]
+            if name in names:
+                resolved[role] = name
+            elif name.lower() in by_lower:
+                resolved[role] = by_lower[name.lower()]
+            elif name.isdigit() and int(name) < len(names):
+                resolved[role] = names[int(name)]
+            else:
+                raise ValueError(f"Column '{name}' for {role} not found "
+                                 f"(available: {', '.join(names)})")
+            continue
+        for candidate in DEFAULT_COLUMN_NAMES[role]:
+            if candidate in by_lower:
+                resolved[role] = by_lower[candidate]
+                break
+
+    return resolved
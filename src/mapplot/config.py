@@ -57,10 +57,14 @@ DEFAULT_CONFIG = {
     'celestial': {
         'max_mag': 6.0,
     },
+    'data': {
+        'max_age_days': 7,
+    },
     'paths': {
         'config': '~/.mapplotrc',
         'bsc5_data': '~/.local/share/mapplot/bsc5_data.txt',
         'mpc_observatories': '~/.local/share/mapplot/mpc_observatories.txt',
+        'cache': '~/.cache/mapplot',
     }
 }
 
@@ -101,6 +105,18 @@ def load_config(config_path=None):
     return config
 
 
+def get_cache_dir():
+    """
+    Directory for on-disk caches (created if needed).
+
+    The MAPPLOT_CACHE_DIR environment variable overrides the default.
+    """
+    cache_dir = os.environ.get('MAPPLOT_CACHE_DIR') or DEFAULT_CONFIG['paths']['cache']
+    cache_dir = os.path.expanduser(cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
 def get_data_colors(palette_name='tableau10', count=8):
     """
     Get a list of colors from a named palette.
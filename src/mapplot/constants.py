@@ -1,29 +1,45 @@
 """Constants used across mapplot modules."""
 
-import cartopy.crs as ccrs
+# Imported by the CLI before any plotting, so this module must stay free of
+# heavy imports (numpy, matplotlib, cartopy, astropy).
+
+# Default number of points per block for chunked transforms
+DEFAULT_CHUNK_SIZE = 1000000
+
+# Default number of text rows parsed per chunk when streaming inputs
+DEFAULT_CHUNK_ROWS = 1000000
+
+
+def _crs(name):
+    """Factory for a cartopy projection class, importing cartopy only when called."""
+    def make():
+        import cartopy.crs as ccrs
+        return getattr(ccrs, name)()
+    return make
+
 
 # Define available projections
 TERRESTRIAL_PROJECTIONS = {
-    'plate-carree': lambda: ccrs.PlateCarree(),
-    'mercator': lambda: ccrs.Mercator(),
-    'miller': lambda: ccrs.Miller(),
-    'mollweide': lambda: ccrs.Mollweide(),
-    'robinson': lambda: ccrs.Robinson(),
-    'hammer': lambda: ccrs.Hammer(),
-    'aitoff': lambda: ccrs.Aitoff(),
-    'lambert-conformal': lambda: ccrs.LambertConformal(),
-    'lambert-azimuthal': lambda: ccrs.LambertAzimuthalEqualArea(),
-    'albers': lambda: ccrs.AlbersEqualArea(),
-    'orthographic': lambda: ccrs.Orthographic(),
-    'stereographic': lambda: ccrs.Stereographic(),
-    'gnomonic': lambda: ccrs.Gnomonic(),
-    'north-polar-stereo': lambda: ccrs.NorthPolarStereo(),
-    'south-polar-stereo': lambda: ccrs.SouthPolarStereo(),
-    'azimuthal-equidistant': lambda: ccrs.AzimuthalEquidistant(),
-    'sinusoidal': lambda: ccrs.Sinusoidal(),
-    'equal-earth': lambda: ccrs.EqualEarth(),
-    'eckert4': lambda: ccrs.EckertIV(),
-    'eckert6': lambda: ccrs.EckertVI(),
+    'plate-carree': _crs('PlateCarree'),
+    'mercator': _crs('Mercator'),
+    'miller': _crs('Miller'),
+    'mollweide': _crs('Mollweide'),
+    'robinson': _crs('Robinson'),
+    'hammer': _crs('Hammer'),
+    'aitoff': _crs('Aitoff'),
+    'lambert-conformal': _crs('LambertConformal'),
+    'lambert-azimuthal': _crs('LambertAzimuthalEqualArea'),
+    'albers': _crs('AlbersEqualArea'),
+    'orthographic': _crs('Orthographic'),
+    'stereographic': _crs('Stereographic'),
+    'gnomonic': _crs('Gnomonic'),
+    'north-polar-stereo': _crs('NorthPolarStereo'),
+    'south-polar-stereo': _crs('SouthPolarStereo'),
+    'azimuthal-equidistant': _crs('AzimuthalEquidistant'),
+    'sinusoidal': _crs('Sinusoidal'),
+    'equal-earth': _crs('EqualEarth'),
+    'eckert4': _crs('EckertIV'),
+    'eckert6': _crs('EckertVI'),
 }
 
 # Define available markers
@@ -1,21 +1,65 @@
 """Coordinate transformations, sun position, MJD utilities, solar-relative coords."""
 
+import os
 import sys
 from datetime import datetime, timezone
+from functools import lru_cache
 
 import numpy as np
-from astropy.coordinates import SkyCoord, GeocentricTrueEcliptic
-from astropy import units as u
-from astropy.time import Time
-from astropy.coordinates import get_sun
 
+from mapplot.profiling import stage
+
+# astropy is imported inside the functions that use it: earth mode and the
+# matrix engine never load it.
+
+
+# Available coordinate transform engines
+TRANSFORM_ENGINES = ['astropy', 'matrix']
+
+# J2000.0 epoch (MJD 51544.5 = 2000 Jan 1.5 TT)
+MJD_J2000 = 51544.5
+
+# Equinox choices for solar-relative ecliptic coordinates
+EQUINOXES = ['J2000', 'date']
+
+# In-memory copy of the on-disk epoch matrix cache: bin_days -> (bins, matrices)
+_EPOCH_MATRIX_CACHE = {}
+
+
+def transform_coordinates(lon, lat, from_system, to_system, engine='astropy',
+                          chunk_size=None, workers=1):
+    """
+    Transform coordinates between different systems.
+
+    Parameters:
+    - lon, lat: input coordinates (degrees, arrays)
+    - from_system, to_system: 'equatorial', 'ecliptic' or 'galactic'
+    - engine: 'astropy' (full SkyCoord transform) or 'matrix'
+              (fixed rotation matrices, much faster, no aberration)
+    - chunk_size: if set, transform in blocks of this many points
+    - workers: number of processes to use for chunked transforms
+
+    Returns:
+    - lon_out, lat_out (degrees)
+    """
+    if chunk_size and (len(lon) > chunk_size or workers > 1):
+        from mapplot.parallel import run_chunked
+        return run_chunked(transform_coordinates, (lon, lat), chunk_size, workers,
+                           kwargs={'from_system': from_system, 'to_system': to_system,
+                                   'engine': engine})
+
+    if engine == 'matrix':
+        return transform_coordinates_matrix(lon, lat, from_system, to_system)
+    elif engine != 'astropy':
+        raise ValueError(f"Unknown transform engine: {engine}")
 
-def transform_coordinates(lon, lat, from_system, to_system):
-    """Transform coordinates between different systems."""
     # Handle wrapping for RA (0-360)
     if from_system == 'equatorial':
         lon = lon % 360
 
+    from astropy import units as u
+    from astropy.coordinates import SkyCoord, GeocentricTrueEcliptic
+
     # Create coordinate object based on input system
     if from_system == 'equatorial':
         coords = SkyCoord(ra=lon*u.degree, dec=lat*u.degree, frame='icrs')
@@ -41,6 +85,177 @@ def transform_coordinates(lon, lat, from_system, to_system):
         raise ValueError(f"Unknown coordinate system: {to_system}")
 
 
+def lonlat_to_unit(lon, lat):
+    """Convert longitude/latitude (degrees) to unit vectors, shape (N, 3)."""
+    lon_rad = np.radians(lon)
+    lat_rad = np.radians(lat)
+    cos_lat = np.cos(lat_rad)
+    return np.stack([cos_lat * np.cos(lon_rad),
+                     cos_lat * np.sin(lon_rad),
+                     np.sin(lat_rad)], axis=-1)
+
+
+def unit_to_lonlat(xyz):
+    """Convert unit vectors, shape (N, 3), to longitude (0-360) and latitude in degrees."""
+    x, y, z = xyz[..., 0], xyz[..., 1], xyz[..., 2]
+    lon = np.degrees(np.arctan2(y, x)) % 360.0
+    lat = np.degrees(np.arctan2(z, np.hypot(x, y)))
+    return lon, lat
+
+
+def ecliptic_rotation_matrix(mjd_tt=MJD_J2000):
+    """
+    Rotation matrix from ICRS to the true ecliptic and equinox of date.
+
+    Follows the IAU 2006/2000A precession-nutation model used by astropy's
+    GeocentricTrueEcliptic frame (without the GCRS aberration step).
+
+    Parameters:
+    - mjd_tt: equinox as MJD (TT); scalar or array
+
+    Returns:
+    - matrix of shape (3, 3), or (N, 3, 3) for array input
+    """
+    import erfa
+
+    jd1 = 2400000.5
+    jd2 = np.asarray(mjd_tt, dtype=float)
+    gamb, phib, psib, epsa = erfa.pfw06(jd1, jd2)
+    dpsi, deps = erfa.nut06a(jd1, jd2)
+    rnpb = erfa.fw2m(gamb, phib, psib + dpsi, epsa + deps)
+    obl = erfa.obl06(jd1, jd2) + deps
+
+    # Rotation about the x axis by the true obliquity
+    cos_obl = np.cos(obl)
+    sin_obl = np.sin(obl)
+    rot_x = np.zeros(np.shape(obl) + (3, 3))
+    rot_x[..., 0, 0] = 1.0
+    rot_x[..., 1, 1] = cos_obl
+    rot_x[..., 1, 2] = sin_obl
+    rot_x[..., 2, 1] = -sin_obl
+    rot_x[..., 2, 2] = cos_obl
+    return rot_x @ rnpb
+
+
+@lru_cache(maxsize=None)
+def _icrs_to_frame_matrix(system):
+    """Rotation matrix from ICRS to the given coordinate system (cached)."""
+    if system == 'equatorial':
+        return np.eye(3)
+    elif system == 'ecliptic':
+        return ecliptic_rotation_matrix(MJD_J2000)
+    elif system == 'galactic':
+        # Transform the ICRS basis vectors; galactic is a pure rotation of ICRS
+        from astropy.coordinates import SkyCoord
+        basis = SkyCoord(x=[1.0, 0.0, 0.0], y=[0.0, 1.0, 0.0], z=[0.0, 0.0, 1.0],
+                         representation_type='cartesian', frame='icrs')
+        return np.array(basis.galactic.cartesian.xyz.value)
+    else:
+        raise ValueError(f"Unknown coordinate system: {system}")
+
+
+def transform_coordinates_matrix(lon, lat, from_system, to_system):
+    """
+    Transform coordinates between systems using fixed rotation matrices.
+
+    Much faster than the astropy engine for large arrays. The ecliptic is the
+    true ecliptic of J2000; aberration (< 21 arcsec) is not applied.
+    """
+    matrix = _icrs_to_frame_matrix(to_system) @ _icrs_to_frame_matrix(from_system).T
+    xyz = lonlat_to_unit(lon, lat) @ matrix.T
+    return unit_to_lonlat(xyz)
+
+
+def _epoch_cache_file(bin_days):
+    """Path of the on-disk rotation matrix cache for a given bin width."""
+    from mapplot.config import get_cache_dir
+    return os.path.join(get_cache_dir(), f'ecliptic_of_date_{bin_days:g}d.npz')
+
+
+def _load_epoch_cache(bin_days):
+    """Return cached (bins, matrices) for bin_days, reading from disk on first use."""
+    if bin_days not in _EPOCH_MATRIX_CACHE:
+        bins = np.empty(0, dtype=np.int64)
+        matrices = np.empty((0, 3, 3))
+        try:
+            with np.load(_epoch_cache_file(bin_days)) as cached:
+                bins, matrices = cached['bins'], cached['matrices']
+        except (OSError, KeyError, ValueError):
+            pass
+        _EPOCH_MATRIX_CACHE[bin_days] = (bins, matrices)
+    return _EPOCH_MATRIX_CACHE[bin_days]
+
+
+def _save_epoch_cache(bin_days, bins, matrices):
+    """Store (bins, matrices) in memory and atomically on disk (best effort)."""
+    _EPOCH_MATRIX_CACHE[bin_days] = (bins, matrices)
+    try:
+        path = _epoch_cache_file(bin_days)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, bins=bins, matrices=matrices)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Warning: Could not write epoch matrix cache: {e}", file=sys.stderr)
+
+
+def ecliptic_of_date_matrices(bins, bin_days=1.0):
+    """
+    Rotation matrices from ICRS to the true ecliptic of date for epoch bins.
+
+    Each bin covers [bin * bin_days, (bin + 1) * bin_days) in MJD and uses the
+    equinox at its midpoint. Matrices are memoized on disk in the mapplot
+    cache directory, so each bin is only computed once.
+
+    Parameters:
+    - bins: integer bin indices (array)
+    - bin_days: width of each epoch bin in days
+
+    Returns:
+    - matrices of shape (len(bins), 3, 3)
+    """
+    bins = np.asarray(bins, dtype=np.int64)
+    cached_bins, cached_matrices = _load_epoch_cache(bin_days)
+
+    missing = np.setdiff1d(bins, cached_bins)
+    if len(missing) > 0:
+        new_matrices = ecliptic_rotation_matrix((missing + 0.5) * bin_days)
+        all_bins = np.concatenate([cached_bins, missing])
+        all_matrices = np.concatenate([cached_matrices, new_matrices])
+        order = np.argsort(all_bins)
+        cached_bins, cached_matrices = all_bins[order], all_matrices[order]
+        _save_epoch_cache(bin_days, cached_bins, cached_matrices)
+
+    return cached_matrices[np.searchsorted(cached_bins, bins)]
+
+
+def transform_to_ecliptic_of_date(lon, lat, mjd, from_system, bin_days=1.0):
+    """
+    Transform coordinates to the true ecliptic and equinox of each observation.
+
+    Observations are grouped into epoch bins of bin_days; one cached
+    precession-nutation matrix per bin is applied to the unit vectors in bulk.
+    Precession over a one-day bin is ~0.14 arcsec.
+
+    Parameters:
+    - lon, lat: input coordinates (degrees)
+    - mjd: observation times (MJD), same length as lon/lat
+    - from_system: input coordinate system
+    - bin_days: width of the epoch bins in days
+
+    Returns:
+    - ecl_lon (0-360), ecl_lat in degrees
+    """
+    xyz = lonlat_to_unit(lon, lat) @ _icrs_to_frame_matrix(from_system)
+
+    bins = np.floor(np.asarray(mjd, dtype=float) / bin_days).astype(np.int64)
+    unique_bins, inverse = np.unique(bins, return_inverse=True)
+    matrices = ecliptic_of_date_matrices(unique_bins, bin_days)
+
+    xyz = np.einsum('nij,nj->ni', matrices[inverse], xyz)
+    return unit_to_lonlat(xyz)
+
+
 def get_sun_position_precise(mjd):
     """
     Get the Sun's ecliptic longitude at a given Modified Julian Date.
@@ -52,6 +267,9 @@ def get_sun_position_precise(mjd):
     Returns:
     - sun_lon: Sun's ecliptic longitude in degrees (float or array)
     """
+    from astropy.coordinates import GeocentricTrueEcliptic, get_sun
+    from astropy.time import Time
+
     time = Time(mjd, format='mjd')
     sun = get_sun(time)
     sun_ecl = sun.transform_to(GeocentricTrueEcliptic)
@@ -88,6 +306,30 @@ def get_sun_position_fast(mjd):
     return L, 0.0
 
 
+def get_sun_longitude_of_date(mjd):
+    """
+    The Sun's apparent ecliptic longitude in the true ecliptic and equinox of date.
+
+    Low-precision formula of the Astronomical Almanac: mean longitude plus
+    the equation of centre, with aberration included. Agrees with astropy
+    (get_sun in GeocentricTrueEcliptic of date) to ~0.01 deg from 1980 to
+    2050, where the mean longitude alone is off by up to ~1.9 deg.
+
+    Parameters:
+    - mjd: Modified Julian Date (float or array)
+
+    Returns:
+    - longitude in degrees, 0-360
+    """
+    d = np.asarray(mjd, dtype=float) - 51544.5
+
+    # Mean longitude and mean anomaly (degrees)
+    L = 280.460 + 0.9856474 * d
+    g = np.radians(357.528 + 0.9856003 * d)
+
+    return (L + 1.915 * np.sin(g) + 0.020 * np.sin(2 * g)) % 360.0
+
+
 def get_sun_position(mjd, precise=False):
     """
     Get the Sun's ecliptic position at a given MJD.
@@ -107,6 +349,26 @@ def get_sun_position(mjd, precise=False):
         return get_sun_position_fast(mjd)
 
 
+def sun_longitude(mjd, equinox='J2000'):
+    """
+    The Sun's ecliptic longitude in the frame of ecliptic longitudes computed
+    with the given equinox: the mean longitude for 'J2000', the apparent
+    longitude of date (see get_sun_longitude_of_date) for 'date'.
+
+    Parameters:
+    - mjd: Modified Julian Date (float or array)
+    - equinox: 'J2000' or 'date'
+
+    Returns:
+    - longitude in degrees, 0-360
+    """
+    if equinox == 'date':
+        return get_sun_longitude_of_date(mjd)
+    if equinox == 'J2000':
+        return get_sun_position_fast(mjd)[0]
+    raise ValueError(f"Unknown equinox: {equinox}")
+
+
 def mjd_to_year(mjd):
     """
     Convert Modified Julian Date to decimal calendar year.
@@ -133,7 +395,55 @@ def get_current_mjd():
     return mjd
 
 
-def compute_solar_relative_coords(mjd, ra, dec, input_coord, solar_center=180.0):
+def wrap_longitude(lon):
+    """Wrap longitudes (degrees) into the range -180 to 180."""
+    lon = np.where(lon > 180, lon - 360, lon)
+    lon = np.where(lon < -180, lon + 360, lon)
+    return lon
+
+
+def compute_solar_elongation(mjd, ra, dec, input_coord, engine='astropy',
+                             chunk_size=None, workers=1, equinox='J2000',
+                             epoch_bin_days=1.0):
+    """
+    Compute ecliptic coordinates and solar elongation for each observation.
+
+    Parameters are as for compute_solar_relative_coords.
+
+    Returns:
+    - ecl_lon: Ecliptic longitude (degrees, 0-360)
+    - ecl_lat: Ecliptic latitude (degrees)
+    - elongation: Ecliptic longitude relative to the Sun at each MJD (degrees, -180 to 180)
+    """
+    if chunk_size and (len(ra) > chunk_size or workers > 1):
+        from mapplot.parallel import run_chunked
+        return run_chunked(compute_solar_elongation, (mjd, ra, dec), chunk_size, workers,
+                           kwargs={'input_coord': input_coord, 'engine': engine,
+                                   'equinox': equinox, 'epoch_bin_days': epoch_bin_days},
+                           n_out=3)
+
+    # Convert input coordinates to ecliptic
+    if equinox == 'date':
+        ecl_lon, ecl_lat = transform_to_ecliptic_of_date(ra, dec, mjd, input_coord,
+                                                         bin_days=epoch_bin_days)
+    elif equinox == 'J2000':
+        ecl_lon, ecl_lat = transform_coordinates(ra, dec, input_coord, 'ecliptic', engine=engine)
+    else:
+        raise ValueError(f"Unknown equinox: {equinox}")
+
+    # Get Sun's ecliptic longitude at the given time(s); in the ecliptic of
+    # date, with the equation of centre, so the elongation is right at every epoch
+    sun_lon = sun_longitude(mjd, equinox)
+
+    # Calculate relative longitude (elongation from Sun)
+    elongation = wrap_longitude(ecl_lon - sun_lon)
+
+    return ecl_lon, ecl_lat, elongation
+
+
+def compute_solar_relative_coords(mjd, ra, dec, input_coord, solar_center=180.0,
+                                  engine='astropy', chunk_size=None, workers=1,
+                                  equinox='J2000', epoch_bin_days=1.0):
     """
     Convert coordinates to solar-relative ecliptic coordinates.
 
@@ -143,29 +453,60 @@ def compute_solar_relative_coords(mjd, ra, dec, input_coord, solar_center=180.0)
     - dec: Declination or coord2 (degrees)
     - input_coord: Input coordinate system ('equatorial', 'ecliptic', 'galactic')
     - solar_center: Solar elongation to place at center of plot (degrees, default 180 for opposition)
+    - engine: coordinate transform engine ('astropy' or 'matrix')
+    - chunk_size: if set, process in blocks of this many points
+    - workers: number of processes to use for chunked processing
+    - equinox: 'J2000' for the fixed J2000 ecliptic, or 'date' for the true
+               ecliptic and equinox of each observation (epoch-binned)
+    - epoch_bin_days: epoch bin width in days for equinox='date'
 
     Returns:
     - rel_lon: Solar-relative ecliptic longitude (degrees)
     - ecl_lat: Ecliptic latitude (degrees)
     """
-    # Convert input coordinates to ecliptic
-    ecl_lon, ecl_lat = transform_coordinates(ra, dec, input_coord, 'ecliptic')
+    _, ecl_lat, elongation = compute_solar_elongation(
+        mjd, ra, dec, input_coord, engine=engine, chunk_size=chunk_size,
+        workers=workers, equinox=equinox, epoch_bin_days=epoch_bin_days
+    )
 
-    # Get Sun's ecliptic longitude at the given time(s)
-    sun_lon, _ = get_sun_position_fast(mjd)
+    # Adjust for centering and wrap to -180 to 180 for plotting
+    plot_lon = wrap_longitude(elongation - solar_center)
 
-    # Calculate relative longitude (elongation from Sun)
-    rel_lon = ecl_lon - sun_lon
+    return plot_lon, ecl_lat
 
-    # Wrap to -180 to 180
-    rel_lon = np.where(rel_lon > 180, rel_lon - 360, rel_lon)
-    rel_lon = np.where(rel_lon < -180, rel_lon + 360, rel_lon)
 
-    # Adjust for centering
-    plot_lon = rel_lon - solar_center
+def transform_to_plot_frame(args, mjd, coord1, coord2, input_coord=None):
+    """
+    Transform input coordinates into the plot frame selected by args.
 
-    # Wrap to -180 to 180 for plotting
-    plot_lon = np.where(plot_lon > 180, plot_lon - 360, plot_lon)
-    plot_lon = np.where(plot_lon < -180, plot_lon + 360, plot_lon)
+    Applies the solar-relative conversion (--solar-relative) or the
+    --input-coord/--plot-coord transform, then wraps longitudes for
+    projections centered on 0. input_coord overrides --input-coord (used
+    for files that record their own frame).
 
-    return plot_lon, ecl_lat
+    Returns:
+    - lon, lat: plot coordinates (degrees)
+    """
+    if input_coord is None:
+        input_coord = args.input_coord
+
+    with stage('transform') as record:
+        record['points'] += len(coord1)
+        if args.solar_relative:
+            coord1, coord2 = compute_solar_relative_coords(
+                mjd, coord1, coord2, input_coord, args.solar_center,
+                engine=args.transform_engine, chunk_size=args.chunk_size,
+                workers=args.workers, equinox=args.equinox,
+                epoch_bin_days=args.epoch_bin_days
+            )
+        elif not args.earth and input_coord != args.plot_coord:
+            coord1, coord2 = transform_coordinates(
+                coord1, coord2, input_coord, args.plot_coord,
+                engine=args.transform_engine, chunk_size=args.chunk_size,
+                workers=args.workers
+            )
+
+    if args.projection in ['mollweide', 'hammer', 'aitoff']:
+        coord1 = np.where(coord1 > 180, coord1 - 360, coord1)
+
+    return coord1, coord2
@@ -1,35 +1,54 @@
 """Main orchestration: run_mapplot and main entry point."""
 
+import importlib.util
 import os
 import sys
 
-import numpy as np
-import matplotlib.pyplot as plt
-import cartopy.crs as ccrs
-from matplotlib.gridspec import GridSpec
-from matplotlib.animation import FFMpegWriter, PillowWriter
-
-from mapplot.cli import parse_args
+from mapplot.cli import (parse_args, parse_batch_args, parse_convert_args, parse_serve_args,
+                         parse_synth_args, parse_data_args)
 from mapplot.config import load_config, get_data_colors
-from mapplot.constants import TERRESTRIAL_PROJECTIONS, MARKERS
-from mapplot.coordinates import transform_coordinates, compute_solar_relative_coords
-from mapplot.data_io import read_data, prepare_animation_data
-from mapplot.plotting import (plot_sky_map, plot_terrestrial_map,
-                              plot_cardinal_directions, plot_custom_gridlines)
-from mapplot.animation import create_animation
-from mapplot.observatories import load_mpc_observatories, load_observatory_dates
-
-# Check for astropy availability
-try:
-    from astropy.coordinates import SkyCoord
-    ASTROPY_AVAILABLE = True
-except ImportError:
-    ASTROPY_AVAILABLE = False
+from mapplot.constants import MARKERS
+
+# numpy, matplotlib, cartopy and astropy are imported on the code paths that
+# need them, so --help, --version and argument errors return immediately.
+# Finding the astropy package does not import it.
+ASTROPY_AVAILABLE = importlib.util.find_spec('astropy') is not None
 
 
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == 'convert':
+        from mapplot.columnar import run_convert
+        run_subcommand(run_convert, parse_convert_args(sys.argv[2:]))
+        return
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'batch':
+        from mapplot.batch import run_batch
+        run_subcommand(run_batch, parse_batch_args(sys.argv[2:]))
+        return
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        from mapplot.server import run_server
+        run_subcommand(run_server, parse_serve_args(sys.argv[2:]))
+        return
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'synth':
+        from mapplot.synth import run_synth
+        run_subcommand(run_synth, parse_synth_args(sys.argv[2:]))
+        return
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'data':
+        from mapplot.datastore import run_data
+        run_subcommand(run_data, parse_data_args(sys.argv[2:]))
+        return
+
     args = parse_args()
 
+    if args.client:
+        from mapplot.server import run_client
+        status = run_client(sys.argv[1:], args)
+        if status is not None:
+            sys.exit(status)
+
     try:
         run_mapplot(args)
     except KeyboardInterrupt:
@@ -41,8 +60,28 @@ def main():
         sys.exit(1)
 
 
+def run_subcommand(func, args):
+    """Run a subcommand, reporting errors the same way as the plotting path."""
+    try:
+        func(args)
+    except KeyboardInterrupt:
+        print("\n\nInterrupted by user (Ctrl-C).", file=sys.stderr)
+        sys.exit(0)
+    except Exception as e:
+        print(f"\nError: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
 def run_mapplot(args):
-    """Main plotting logic."""
+    """Main plotting logic; timed stage by stage with --profile."""
+    from mapplot.profiling import profiled
+
+    with profiled(args):
+        _render(args)
+
+
+def _render(args):
+    """Validate the options, then draw and save (or show) the map or animation."""
 
     # Load configuration file
     config = load_config(args.config if hasattr(args, 'config') else None)
@@ -66,44 +105,27 @@ def run_mapplot(args):
         print("Error: Must specify input files, --catalog, or --observatories", file=sys.stderr)
         sys.exit(1)
 
-    # Validate solar-relative mode options
-    if args.solar_relative:
-        if args.earth:
-            print("Error: --solar-relative is not compatible with --earth mode", file=sys.stderr)
-            sys.exit(1)
-
-        if args.galactic_plane:
-            print("Error: --galactic-plane is not compatible with --solar-relative", file=sys.stderr)
-            print("       (Galactic plane coordinates don't align with solar-relative frame)", file=sys.stderr)
-            sys.exit(1)
-
-        if args.celestial_equator:
-            print("Error: --celestial-equator is not compatible with --solar-relative", file=sys.stderr)
-            print("       (Celestial equator doesn't align with solar-relative frame)", file=sys.stderr)
-            sys.exit(1)
-
-        if args.milky_way:
-            print("Error: --milky-way is not compatible with --solar-relative", file=sys.stderr)
-            print("       (Milky Way density is in galactic coordinates)", file=sys.stderr)
-            sys.exit(1)
+    if args.solar_relative and not args.files:
+        print("Error: --solar-relative requires input files with MJD, RA, Dec", file=sys.stderr)
+        sys.exit(1)
 
-        if args.poles:
-            print("Error: --poles is not compatible with --solar-relative", file=sys.stderr)
-            print("       (Coordinate poles are not meaningful in solar-relative frame)", file=sys.stderr)
-            sys.exit(1)
+    # Option combinations shared with MapRenderer
+    from mapplot.renderer import MapplotError, validate_options
+    try:
+        validate_options(args)
+    except MapplotError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
 
-        if args.grid_coord:
-            print("Error: --grid-coord is not compatible with --solar-relative", file=sys.stderr)
-            print("       (Solar-relative uses its own coordinate system)", file=sys.stderr)
+    if args.follow:
+        if args.animate:
+            print("Error: --follow is not compatible with --animate", file=sys.stderr)
             sys.exit(1)
-
-        if args.plot_coord != 'equatorial':
-            print("Error: --plot-coord is not compatible with --solar-relative", file=sys.stderr)
-            print("       (Solar-relative uses its own coordinate system)", file=sys.stderr)
+        if not args.output or not args.files:
+            print("Error: --follow needs input files and an output file (-o)", file=sys.stderr)
             sys.exit(1)
-
-        if not args.files:
-            print("Error: --solar-relative requires input files with MJD, RA, Dec", file=sys.stderr)
+        if args.follow_interval <= 0:
+            print("Error: --follow-interval must be positive", file=sys.stderr)
             sys.exit(1)
 
     # Validate animation mode options
@@ -136,117 +158,49 @@ def run_mapplot(args):
         if args.show_before_start and args.start_time is None:
             print("Warning: --show-before-start has no effect without --start-time", file=sys.stderr)
 
-    # Get marker symbol
-    marker = MARKERS.get(args.marker, args.marker)
-
-    # Create figure and axis/axes
-    fig = plt.figure(figsize=args.figsize, dpi=args.dpi)
-    fig.patch.set_facecolor(args.bgcolor)
-
-    # Check if timeline plot is requested
-    if args.show_timeline and args.trail_days:
-        main_height = 1.0 - args.timeline_height
-        timeline_height = args.timeline_height
-
-        gs = GridSpec(2, 1, figure=fig, height_ratios=[main_height, timeline_height],
-                     hspace=0.15)
-
-        projection = TERRESTRIAL_PROJECTIONS[args.projection]()
-        ax = fig.add_subplot(gs[0], projection=projection)
-
-        ax_timeline = fig.add_subplot(gs[1])
-        ax_timeline.set_facecolor('white')
-        ax_timeline.grid(True, alpha=0.3)
-        ax_timeline.set_ylabel(args.timeline_ylabel, fontsize=10)
-
-        if args.timeline_xlabel_years:
-            ax_timeline.set_xlabel('Year', fontsize=10)
-        else:
-            ax_timeline.set_xlabel('MJD', fontsize=10)
-
-    else:
-        projection = TERRESTRIAL_PROJECTIONS[args.projection]()
-        ax = plt.axes(projection=projection)
-        ax_timeline = None
+        if args.downsample_bins < 1:
+            print("Error: --downsample-bins must be at least 1", file=sys.stderr)
+            sys.exit(1)
 
-    # Set background color
-    if args.facecolor:
-        ax.set_facecolor(args.facecolor)
-    else:
-        ax.set_facecolor(args.bgcolor)
+    if args.corotate and not (args.animate and args.solar_relative):
+        print("Error: --corotate requires --animate and --solar-relative", file=sys.stderr)
+        sys.exit(1)
 
-    # Set extent if specified
-    if args.extent:
-        ax.set_extent(args.extent, crs=ccrs.PlateCarree())
-    else:
-        ax.set_global()
+    from mapplot.profiling import frame_callback, stage, timed_draws
 
-    # For sky mode, flip horizontal axis (astronomical convention)
-    if not args.earth:
-        ax.invert_xaxis()
+    with stage('imports'):
+        import matplotlib.pyplot as plt
 
-    # Configure gridlines
-    if args.gridlines:
-        grid_coord = args.grid_coord if args.grid_coord else args.plot_coord
+        from mapplot.plotting import (create_map_axes, dataset_styles, finish_static_map,
+                                      plot_cardinal_directions, plot_datasets, plot_density_grid,
+                                      plot_sky_map, plot_terrestrial_map)
 
-        if not args.earth and grid_coord != args.plot_coord:
-            if args.grid_spacing:
-                plot_custom_gridlines(ax, grid_coord, args.plot_coord, args.grid_spacing, args)
-            else:
-                plot_custom_gridlines(ax, grid_coord, args.plot_coord, (30, 30), args)
-        else:
-            if args.grid_spacing:
-                gl = ax.gridlines(draw_labels=False, linewidth=1.0,
-                                color=args.grid_color,
-                                alpha=args.grid_alpha,
-                                linestyle=args.grid_style,
-                                xlocs=np.arange(-180, 181, args.grid_spacing[0]),
-                                ylocs=np.arange(-90, 91, args.grid_spacing[1]))
-            else:
-                spacing_lon = 30
-                spacing_lat = 30
-
-                gl = ax.gridlines(draw_labels=False, linewidth=1.0,
-                                color=args.grid_color,
-                                alpha=args.grid_alpha,
-                                linestyle=args.grid_style,
-                                xlocs=np.arange(-180, 181, spacing_lon),
-                                ylocs=np.arange(-90, 91, spacing_lat))
-
-            if args.grid_labels and args.projection in ['plate-carree', 'mercator']:
-                try:
-                    from cartopy.mpl.ticker import LongitudeFormatter, LatitudeFormatter
-
-                    gl.xformatter = LongitudeFormatter()
-                    gl.yformatter = LatitudeFormatter()
-
-                    gl.top_labels = False
-                    gl.right_labels = False
-                    gl.bottom_labels = True
-                    gl.left_labels = True
-
-                    gl.xlabel_style = {'size': 10}
-                    gl.ylabel_style = {'size': 10}
-
-                except (ImportError, AttributeError) as e:
-                    print(f"Warning: Grid labels not available ({e})", file=sys.stderr)
-            elif args.grid_labels and args.projection not in ['plate-carree', 'mercator']:
-                print(f"Warning: --grid-labels only works with plate-carree and mercator projections",
-                      file=sys.stderr)
-                print(f"         Current projection: {args.projection}", file=sys.stderr)
+    # Create figure and axis/axes
+    with stage('setup'):
+        fig = plt.figure(figsize=args.figsize, dpi=args.dpi)
+        fig.patch.set_facecolor(args.bgcolor)
+        ax, ax_timeline = create_map_axes(fig, args)
 
     # ANIMATION MODE
     if args.animate:
+        from matplotlib.animation import FFMpegWriter, PillowWriter
+
+        from mapplot.animation import create_animation
+        from mapplot.data_io import prepare_animation_data
+        from mapplot.observatories import load_observatory_dates, load_observatory_table
+
         print("Preparing animation data...", file=sys.stderr)
 
-        all_data = prepare_animation_data(args, palette_name)
+        with stage('prepare_data') as record:
+            all_data = prepare_animation_data(args, palette_name)
+            record['points'] += len(all_data)
 
         if len(all_data) == 0:
             print("Error: No data to animate", file=sys.stderr)
             sys.exit(1)
 
         print(f"Animating {len(all_data)} data points", file=sys.stderr)
-        print(f"Time range: MJD {all_data[0]['mjd']:.2f} to {all_data[-1]['mjd']:.2f}", file=sys.stderr)
+        print(f"Time range: MJD {all_data.mjd[0]:.2f} to {all_data.mjd[-1]:.2f}", file=sys.stderr)
 
         # Load observatories if animating them
         observatories = None
@@ -256,23 +210,24 @@ def run_mapplot(args):
                 print("Error: --animate-observatories requires --obs-dates-file", file=sys.stderr)
                 sys.exit(1)
 
-            observatories = load_mpc_observatories(args.obs_file)
+            observatories = load_observatory_table(args.obs_file, config)
             obs_dates = load_observatory_dates(args.obs_dates_file)
 
-            if not observatories:
+            if not len(observatories):
                 print("Warning: No observatories loaded", file=sys.stderr)
             if not obs_dates:
                 print("Warning: No observatory dates loaded", file=sys.stderr)
 
-            if observatories and obs_dates:
-                print(f"Will animate {len([c for c in obs_dates.keys() if any(o['code'].upper() == c for o in observatories)])} observatories",
+            if len(observatories) and obs_dates:
+                print(f"Will animate {len(observatories.rows(obs_dates)[0])} observatories",
                       file=sys.stderr)
 
         # Plot background
-        if args.earth:
-            plot_terrestrial_map(ax, args)
-        else:
-            plot_sky_map(ax, args)
+        with stage('background'):
+            if args.earth:
+                plot_terrestrial_map(ax, args, config)
+            else:
+                plot_sky_map(ax, args)
 
         # Add legend if requested
         if args.legend and args.labels:
@@ -337,8 +292,9 @@ def run_mapplot(args):
             plot_cardinal_directions(ax, args)
 
         # Create and save animation
-        anim = create_animation(args, ax, fig, all_data, palette_name,
-                               observatories, obs_dates, ax_timeline)
+        with stage('create_animation'):
+            anim = create_animation(args, ax, fig, all_data, palette_name,
+                                    observatories, obs_dates, ax_timeline)
 
         output_ext = os.path.splitext(args.output)[1].lower()
 
@@ -347,11 +303,12 @@ def run_mapplot(args):
         try:
             if output_ext == '.gif':
                 writer = PillowWriter(fps=args.fps)
-                anim.save(args.output, writer=writer)
             else:
                 extra_args = ['-vcodec', 'libx264', '-crf', '23', '-preset', 'medium', '-pix_fmt', 'yuv420p']
                 writer = FFMpegWriter(fps=args.fps, extra_args=extra_args)
-                anim.save(args.output, writer=writer)
+            # With --profile: per-frame wall times, and draws timed apart from updates and encoding
+            with stage('save'), timed_draws(fig):
+                anim.save(args.output, writer=writer, progress_callback=frame_callback())
         except FileNotFoundError as e:
             if 'ffmpeg' in str(e).lower():
                 print("\nError: ffmpeg not found!", file=sys.stderr)
@@ -372,111 +329,75 @@ def run_mapplot(args):
         return
 
     # STATIC MODE
-    if args.earth:
-        plot_terrestrial_map(ax, args)
-    else:
-        plot_sky_map(ax, args)
-
-    # Default colors if not specified
-    if args.files:
-        if args.color is None:
-            args.color = get_data_colors(palette_name, len(args.files))
-        elif len(args.color) < len(args.files):
-            args.color.extend(['black'] * (len(args.files) - len(args.color)))
-
-        if args.legend and args.labels is None:
-            args.labels = [f'Dataset {i+1}' for i in range(len(args.files))]
+    with stage('background'):
+        if args.earth:
+            plot_terrestrial_map(ax, args, config)
+        else:
+            plot_sky_map(ax, args)
 
-    # Track if we have a colormap for colorbar
-    has_colormap = False
+    # Colorbar source: the density mesh, or the last scatter with a color column
     scatter_obj = None
+    cbar_label = 'Color Value'
+
+    from matplotlib.colors import Normalize
+
+    from mapplot.aggregate import build_density_grid
+    from mapplot.data_io import color_limits, ingest_files, ingest_static_file
+    from mapplot.follow import (follow_density, follow_scatter, initial_density_grid, open_tails,
+                                read_initial, save_figure_atomic)
+
+    # With --follow the inputs are read through tails that later pick up appended rows
+    tails = open_tails(args) if args.follow else None
+    scatters = []
+    norm = None
+
+    if args.files and args.density:
+        # Stream the inputs chunk by chunk into a count raster
+        with stage('ingest') as record:
+            grid = initial_density_grid(tails, args) if tails else build_density_grid(args)
+            record['points'] += grid.n_rows
+        print(f"Binned {grid.n_rows:,} points into a {grid.n_lon}x{grid.n_lat} grid",
+              file=sys.stderr)
+        with stage('plot_data'):
+            scatter_obj = plot_density_grid(ax, grid, args)
+        cbar_label = 'Count' if args.density_stat == 'count' else f'{args.density_stat.capitalize()} value'
 
     # Plot data from each file
-    if args.files:
-        for i, filename in enumerate(args.files):
-            mjd, coord1, coord2, sizes, colors, labels = read_data(
-                filename,
-                ignore_extra=args.ignore_extra,
-                labels_from_file=args.labels_from_file,
-                solar_relative=args.solar_relative
-            )
-
-            if args.solar_relative:
-                if mjd is None:
-                    print("Error: --solar-relative requires MJD as first column", file=sys.stderr)
-                    sys.exit(1)
-
-                coord1, coord2 = compute_solar_relative_coords(
-                    mjd, coord1, coord2, args.input_coord, args.solar_center
-                )
-            else:
-                if not args.earth and args.input_coord != args.plot_coord:
-                    coord1, coord2 = transform_coordinates(
-                        coord1, coord2, args.input_coord, args.plot_coord
-                    )
-
-            if args.projection in ['mollweide', 'hammer', 'aitoff']:
-                coord1 = np.where(coord1 > 180, coord1 - 360, coord1)
-
-            if sizes is not None:
-                s = sizes * args.size
-            else:
-                s = args.size
-
-            if colors is not None:
-                c = colors
-                cmap = args.cmap
-                has_colormap = True
-            else:
-                c = args.color[i]
-                cmap = None
-
-            label = args.labels[i] if args.labels and i < len(args.labels) else None
-
-            scatter = ax.scatter(coord1, coord2, s=s, c=c, marker=marker,
-                               alpha=args.alpha, transform=ccrs.PlateCarree(),
-                               edgecolors=args.edgecolor, linewidths=args.edgewidth,
-                               cmap=cmap, label=label, zorder=2)
-
-            if labels and args.labels_from_file:
-                for j, (x, y, lbl) in enumerate(zip(coord1, coord2, labels)):
-                    if lbl:
-                        ax.text(x, y, lbl, fontsize=8, ha='left', va='bottom',
-                               transform=ccrs.PlateCarree(), zorder=3)
-
-            if has_colormap:
-                scatter_obj = scatter
-
-    # Add colorbar if requested
-    if args.cbar and has_colormap and scatter_obj is not None:
-        plt.colorbar(scatter_obj, ax=ax, orientation='horizontal',
-                    pad=0.05, shrink=0.8, label='Color Value')
-
-    # Add cardinal direction markers
-    if args.cardinal:
-        plot_cardinal_directions(ax, args)
-
-    # Add legend
-    if args.legend or (not args.earth and (args.catalog or args.ecliptic or args.galactic_plane)):
-        handler_map = {}
-        if hasattr(ax, '_gc_legend_handler'):
-            handler_map.update(ax._gc_legend_handler)
-
-        legend = ax.legend(loc='best', framealpha=0.9, facecolor='white',
-                 edgecolor='gray', frameon=True, borderpad=0.5,
-                 handler_map=handler_map if handler_map else None)
-        legend.set_zorder(100)
-
-    # Add title
-    if args.title:
-        ax.set_title(args.title, fontsize=14, fontweight='bold', pad=20)
-
-    plt.tight_layout(pad=1.5)
+    elif args.files:
+        # Parse and transform all files (in parallel with --workers), then plot in file order
+        with stage('ingest') as record:
+            ingested = read_initial(tails) if tails else ingest_files(ingest_static_file, args)
+            record['points'] += sum(len(result[1]) for result in ingested)
+
+        # With --cmap-percentiles all files share limits from their merged color sketches
+        limits = color_limits([result[-1] for result in ingested], args)
+        if limits:
+            norm = Normalize(vmin=limits[0], vmax=limits[1])
+        elif tails and args.cmap_percentiles is not None:
+            # No color values yet; follow_scatter sets the limits once they arrive
+            norm = Normalize()
+
+        colors, labels = dataset_styles(args, len(args.files), palette_name)
+        with stage('plot_data'):
+            scatters, scatter_obj = plot_datasets(ax, ingested, args, colors, labels, norm)
+
+    # Colorbar, cardinal markers, legend and title
+    with stage('layout'):
+        colorbar = finish_static_map(fig, ax, args, scatter_obj, cbar_label)
 
     # Save or show
-    if args.output:
-        plt.savefig(args.output, dpi=args.dpi, bbox_inches='tight',
-                   facecolor=fig.get_facecolor())
+    if args.follow:
+        with stage('savefig'), timed_draws(fig):
+            save_figure_atomic(fig, args)
+        print(f"Saved to {args.output}")
+        if args.density:
+            follow_density(args, fig, tails, grid, scatter_obj)
+        else:
+            follow_scatter(args, fig, ax, tails, scatters, norm, colorbar, cbar_label)
+    elif args.output:
+        with stage('savefig'), timed_draws(fig):
+            fig.savefig(args.output, dpi=args.dpi, bbox_inches='tight',
+                        facecolor=fig.get_facecolor())
         print(f"Saved to {args.output}")
     else:
         print("\nDisplaying plot... (Close the plot window to exit)")
@@ -1,13 +1,342 @@
 """Data file reading and animation data preparation."""
 
+import contextlib
+import copy
+import itertools
+import os
 import sys
+from dataclasses import dataclass, fields
 
 import numpy as np
 
+from mapplot.columnar import is_columnar, read_columnar_data, read_header
+from mapplot.columns import resolve_columns
 from mapplot.config import get_data_colors
+from mapplot.constants import DEFAULT_CHUNK_ROWS
+from mapplot.coordinates import compute_solar_elongation, transform_to_plot_frame, wrap_longitude
+from mapplot.fitstable import is_fits, read_fits_columns
+from mapplot.parallel import ordered_map
+from mapplot.profiling import stage
+from mapplot.sketch import QuantileSketch, merge_sketches, normalization_limits
+from mapplot.streams import (STDIN, detect_compression, is_stream, open_text,
+                             strip_compression_suffix)
+from mapplot.timeindex import read_time_window
 
+# read_data results kept while a read_cache() block is active, else None
+_READ_CACHE = None
 
-def read_data(filename, ignore_extra=False, labels_from_file=False, solar_relative=False, read_mjd=False):
+
+def _open_source(source):
+    """Open a (possibly compressed) file for reading, or pass an in-memory list of lines through."""
+    if isinstance(source, str):
+        return open_text(source)
+    return contextlib.nullcontext(source)
+
+
+def _trim_to_window(time_window, mjd, coord1, coord2, sizes, colors, labels):
+    """Drop rows outside an (mjd_min, mjd_max) window."""
+    mjd_min, mjd_max = time_window
+    in_window = np.ones(len(mjd), dtype=bool)
+    if mjd_min is not None:
+        in_window &= mjd >= mjd_min
+    if mjd_max is not None:
+        in_window &= mjd <= mjd_max
+    if not in_window.all():
+        mjd, coord1, coord2 = mjd[in_window], coord1[in_window], coord2[in_window]
+        sizes = sizes[in_window] if sizes is not None else None
+        colors = colors[in_window] if colors is not None else None
+        if isinstance(labels, np.ndarray):
+            labels = labels[in_window]
+        elif labels is not None:
+            labels = [lbl for lbl, keep in zip(labels, in_window) if keep]
+    return mjd, coord1, coord2, sizes, colors, labels
+
+
+def _read_fits_data(filename, ignore_extra, labels_from_file, has_mjd, time_window,
+                    column_map, hdu):
+    """Read a FITS table in the read_data return layout."""
+    columns = read_fits_columns(filename, column_map=column_map, hdu=hdu)
+
+    if has_mjd and 'mjd' not in columns:
+        raise ValueError("no MJD column found (map one with --columns mjd=NAME)")
+
+    mjd = columns.get('mjd') if has_mjd else None
+    coord1 = columns['coord1']
+    coord2 = columns['coord2']
+
+    if ignore_extra or labels_from_file:
+        sizes = None
+        colors = None
+    else:
+        sizes = columns.get('size')
+        colors = columns.get('color')
+
+    labels = None
+    if labels_from_file:
+        labels = columns.get('label')
+        if labels is None:
+            labels = np.full(len(coord1), '')
+
+    result = (mjd, coord1, coord2, sizes, colors, labels)
+    if time_window is not None and mjd is not None:
+        result = _trim_to_window(time_window, *result)
+    return result
+
+
+def _split_fields(line, delimiter):
+    return [field.strip() for field in line.split(delimiter)] if delimiter else line.split()
+
+
+def _is_number(text):
+    try:
+        float(text)
+        return True
+    except ValueError:
+        return False
+
+
+def sniff_text_layout(filename):
+    """
+    Inspect the start of a text file for its delimiter and column names.
+
+    Column names come from a CSV header row, or from the last comment line
+    before the first data row when it has one name per column
+    (e.g. '# mjd ra dec H').
+
+    Returns:
+    - names: list of column names, or None
+    - delimiter: ',' for CSV, None for whitespace-separated
+    - header_rows: number of leading non-comment header rows (0 or 1)
+    - n_columns: number of fields in the first data row
+    """
+    with open_text(filename) as f:
+        return _sniff_lines(f, filename)
+
+
+def _sniff_lines(lines, filename):
+    """sniff_text_layout on an iterable of lines; stops at the first data row."""
+    comment = None
+    for line in lines:
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if stripped.startswith('#'):
+            comment = stripped.lstrip('#').strip()
+            continue
+        first_row = stripped
+        break
+    else:
+        return None, None, 0, 0
+
+    is_csv = strip_compression_suffix(filename).lower().endswith('.csv')
+    delimiter = ',' if (is_csv or ',' in first_row) else None
+    fields = _split_fields(first_row, delimiter)
+
+    if delimiter and not any(_is_number(field) for field in fields):
+        return fields, delimiter, 1, len(fields)
+
+    if comment is not None:
+        names = _split_fields(comment, delimiter) if delimiter else comment.replace(',', ' ').split()
+        if len(names) == len(fields):
+            return names, delimiter, 0, len(fields)
+
+    return None, delimiter, 0, len(fields)
+
+
+def text_column_indices(filename, column_map, has_mjd, ignore_extra, labels_from_file,
+                        layout=None):
+    """
+    Work out which columns of a text file hold each needed role.
+
+    layout is a sniff_text_layout result; the file is sniffed when it is None.
+
+    Returns:
+    - indices: dict of role -> 0-based column index
+    - delimiter, header_rows: as from sniff_text_layout
+    """
+    names, delimiter, header_rows, n_columns = layout or sniff_text_layout(filename)
+    column_map = column_map or {}
+
+    indices = {role: int(col) for role, col in column_map.items() if str(col).isdigit()}
+    by_name = {role: col for role, col in column_map.items() if role not in indices}
+
+    if names is not None:
+        for role, name in resolve_columns(names, by_name).items():
+            indices.setdefault(role, names.index(name))
+    elif by_name:
+        raise ValueError(f"{filename} has no column header; map columns by index "
+                         f"(e.g. --columns mjd=0,ra=1,dec=2)")
+
+    if not column_map and names is None:
+        # Headerless CSV: the usual positional layout
+        roles = (['mjd'] if has_mjd else []) + ['coord1', 'coord2', 'size', 'color']
+        indices = dict(zip(roles, range(n_columns)))
+
+    needed = {'coord1', 'coord2'}
+    if has_mjd:
+        needed.add('mjd')
+    missing = sorted(needed - set(indices))
+    if missing:
+        raise ValueError(f"{filename}: no column for {', '.join(missing)} "
+                         f"(map it with --columns)")
+
+    if not has_mjd:
+        indices.pop('mjd', None)
+    if ignore_extra or labels_from_file:
+        indices.pop('size', None)
+        indices.pop('color', None)
+    if not labels_from_file:
+        indices.pop('label', None)
+
+    return indices, delimiter, header_rows
+
+
+def _read_text_columns(filename, source, indices, delimiter, header_rows, labels_from_file):
+    """Parse only the selected columns of a text file (np.loadtxt usecols)."""
+    numeric = [role for role in ('mjd', 'coord1', 'coord2', 'size', 'color') if role in indices]
+    skiprows = header_rows if source is filename else 0
+    usecols = [indices[role] for role in numeric]
+
+    if source is not filename and not any(
+            line.strip() and not line.lstrip().startswith('#') for line in source):
+        data = np.empty((0, len(usecols)))
+    else:
+        with _open_source(source) as f:
+            data = np.loadtxt(f, comments='#', delimiter=delimiter, skiprows=skiprows,
+                              usecols=usecols, ndmin=2)
+
+    columns = {role: data[:, i] for i, role in enumerate(numeric)}
+
+    labels = None
+    if labels_from_file:
+        if 'label' in indices and len(data):
+            with _open_source(source) as f:
+                labels = np.atleast_1d(np.loadtxt(f, comments='#', delimiter=delimiter,
+                                                  skiprows=skiprows, usecols=indices['label'],
+                                                  dtype=str))
+        else:
+            labels = np.full(len(data), '')
+
+    return (columns.get('mjd'), columns['coord1'], columns['coord2'],
+            columns.get('size'), columns.get('color'), labels)
+
+
+def _read_text(source, filename, has_mjd, ignore_extra, labels_from_file, text_layout):
+    """
+    Parse text lines in the read_data layout.
+
+    Parameters:
+    - source: file name, or a list of text lines (time window or stream chunk)
+    - filename: name of the file the lines came from (for messages)
+    - text_layout: (indices, delimiter, header_rows) from text_column_indices
+                   for named/CSV columns, or None for positional columns
+
+    Returns:
+    - mjd, coord1, coord2, sizes, colors, labels
+    """
+    if text_layout is not None:
+        return _read_text_columns(filename, source, *text_layout, labels_from_file)
+
+    labels = None
+    mjd = None
+
+    # If we need labels, read differently
+    if labels_from_file:
+        if has_mjd:
+            # Format: MJD RA Dec Label [size] [color]
+            mjd_list, coord1_list, coord2_list, labels_list = [], [], [], []
+            with _open_source(source) as f:
+                for line in f:
+                    line = line.strip()
+                    if not line or line.startswith('#'):
+                        continue
+                    parts = line.split()
+                    if len(parts) >= 4:
+                        mjd_list.append(float(parts[0]))
+                        coord1_list.append(float(parts[1]))
+                        coord2_list.append(float(parts[2]))
+                        labels_list.append(parts[3])
+                    elif len(parts) >= 3:
+                        mjd_list.append(float(parts[0]))
+                        coord1_list.append(float(parts[1]))
+                        coord2_list.append(float(parts[2]))
+                        labels_list.append('')
+            mjd = np.array(mjd_list)
+            coord1 = np.array(coord1_list)
+            coord2 = np.array(coord2_list)
+            labels = labels_list
+            sizes = None
+            colors = None
+        else:
+            # Format: RA Dec Label [size] [color]
+            coord1_list, coord2_list, labels_list = [], [], []
+            with _open_source(source) as f:
+                for line in f:
+                    line = line.strip()
+                    if not line or line.startswith('#'):
+                        continue
+                    parts = line.split()
+                    if len(parts) >= 3:
+                        coord1_list.append(float(parts[0]))
+                        coord2_list.append(float(parts[1]))
+                        labels_list.append(parts[2])
+                    elif len(parts) >= 2:
+                        coord1_list.append(float(parts[0]))
+                        coord2_list.append(float(parts[1]))
+                        labels_list.append('')
+            coord1 = np.array(coord1_list)
+            coord2 = np.array(coord2_list)
+            labels = labels_list
+            sizes = None
+            colors = None
+    else:
+        # Normal numeric reading
+        if source is not filename and not any(
+                line.strip() and not line.lstrip().startswith('#') for line in source):
+            # Nothing in the requested time window
+            data = np.empty((0, 3 if has_mjd else 2))
+        else:
+            # With --ignore-extra, only the leading columns are parsed
+            usecols = range(3 if has_mjd else 2) if ignore_extra else None
+            with _open_source(source) as f:
+                data = np.loadtxt(f, comments='#', usecols=usecols, ndmin=2)
+
+        if has_mjd:
+            # Format: MJD RA Dec [size] [color]
+            if data.shape[1] < 3:
+                raise ValueError(f"{filename} with time data must have at least 3 columns "
+                                 f"(MJD coord1 coord2)")
+
+            mjd = data[:, 0]
+            coord1 = data[:, 1]
+            coord2 = data[:, 2]
+
+            if ignore_extra:
+                sizes = None
+                colors = None
+            else:
+                sizes = data[:, 3] if data.shape[1] > 3 else None
+                colors = data[:, 4] if data.shape[1] > 4 else None
+        else:
+            # Format: RA Dec [size] [color]
+            if data.shape[1] < 2:
+                raise ValueError(f"{filename} must have at least 2 columns")
+
+            coord1 = data[:, 0]
+            coord2 = data[:, 1]
+
+            if ignore_extra:
+                sizes = None
+                colors = None
+            else:
+                sizes = data[:, 2] if data.shape[1] > 2 else None
+                colors = data[:, 3] if data.shape[1] > 3 else None
+
+    return mjd, coord1, coord2, sizes, colors, labels
+
+
+def read_data(filename, ignore_extra=False, labels_from_file=False, solar_relative=False, read_mjd=False,
+              time_window=None, column_map=None, hdu=None):
     """Read coordinates and optional size/color/label columns from file
 
     Parameters:
@@ -16,117 +345,428 @@ def read_data(filename, ignore_extra=False, labels_from_file=False, solar_relati
     - labels_from_file: use third column (or fourth if solar_relative/read_mjd) as labels
     - solar_relative: if True, first column is MJD, then RA/coord1, then Dec/coord2
     - read_mjd: if True, read first column as MJD (for animation, without solar-relative transform)
+    - time_window: optional (mjd_min, mjd_max) tuple; for MJD-sorted files only
+                   the rows in the window are read, using a sidecar time index
+    - column_map: role -> column mapping (--columns); values are header
+                  names or 0-based column indices
+    - hdu: FITS HDU index or name (default: first table)
+
+    Columnar (.mapc) files and FITS tables are detected by their magic bytes
+    and returned as memory-mapped views instead of being parsed. '-' reads
+    standard input; stdin and named pipes are parsed in chunks.
 
     Returns:
     - mjd, coord1, coord2, sizes, colors, labels
     """
     try:
-        labels = None
-        mjd = None
-
-        # Determine if we're reading MJD (either for solar-relative or animation)
-        has_mjd = solar_relative or read_mjd
-
-        # If we need labels, read differently
-        if labels_from_file:
-            if has_mjd:
-                # Format: MJD RA Dec Label [size] [color]
-                mjd_list, coord1_list, coord2_list, labels_list = [], [], [], []
-                with open(filename, 'r') as f:
-                    for line in f:
-                        line = line.strip()
-                        if not line or line.startswith('#'):
-                            continue
-                        parts = line.split()
-                        if len(parts) >= 4:
-                            mjd_list.append(float(parts[0]))
-                            coord1_list.append(float(parts[1]))
-                            coord2_list.append(float(parts[2]))
-                            labels_list.append(parts[3])
-                        elif len(parts) >= 3:
-                            mjd_list.append(float(parts[0]))
-                            coord1_list.append(float(parts[1]))
-                            coord2_list.append(float(parts[2]))
-                            labels_list.append('')
-                mjd = np.array(mjd_list)
-                coord1 = np.array(coord1_list)
-                coord2 = np.array(coord2_list)
-                labels = labels_list
-                sizes = None
-                colors = None
-            else:
-                # Format: RA Dec Label [size] [color]
-                coord1_list, coord2_list, labels_list = [], [], []
-                with open(filename, 'r') as f:
-                    for line in f:
-                        line = line.strip()
-                        if not line or line.startswith('#'):
-                            continue
-                        parts = line.split()
-                        if len(parts) >= 3:
-                            coord1_list.append(float(parts[0]))
-                            coord2_list.append(float(parts[1]))
-                            labels_list.append(parts[2])
-                        elif len(parts) >= 2:
-                            coord1_list.append(float(parts[0]))
-                            coord2_list.append(float(parts[1]))
-                            labels_list.append('')
-                coord1 = np.array(coord1_list)
-                coord2 = np.array(coord2_list)
-                labels = labels_list
-                sizes = None
-                colors = None
-        else:
-            # Normal numeric reading
-            data = np.loadtxt(filename, comments='#')
-            if data.ndim == 1:
-                data = data.reshape(1, -1)
-
-            if has_mjd:
-                # Format: MJD RA Dec [size] [color]
-                if data.shape[1] < 3:
-                    print(f"Error: {filename} with time data must have at least 3 columns (MJD coord1 coord2)",
-                          file=sys.stderr)
-                    sys.exit(1)
-
-                mjd = data[:, 0]
-                coord1 = data[:, 1]
-                coord2 = data[:, 2]
-
-                if ignore_extra:
-                    sizes = None
-                    colors = None
-                else:
-                    sizes = data[:, 3] if data.shape[1] > 3 else None
-                    colors = data[:, 4] if data.shape[1] > 4 else None
-            else:
-                # Format: RA Dec [size] [color]
-                if data.shape[1] < 2:
-                    print(f"Error: {filename} must have at least 2 columns", file=sys.stderr)
-                    sys.exit(1)
-
-                coord1 = data[:, 0]
-                coord2 = data[:, 1]
-
-                if ignore_extra:
-                    sizes = None
-                    colors = None
-                else:
-                    sizes = data[:, 2] if data.shape[1] > 2 else None
-                    colors = data[:, 3] if data.shape[1] > 3 else None
-
-        return mjd, coord1, coord2, sizes, colors, labels
+        return load_data(filename, ignore_extra, labels_from_file, solar_relative, read_mjd,
+                         time_window, column_map, hdu)
     except Exception as e:
         print(f"Error reading {filename}: {e}", file=sys.stderr)
         sys.exit(1)
 
 
+def load_data(filename, ignore_extra=False, labels_from_file=False, solar_relative=False,
+              read_mjd=False, time_window=None, column_map=None, hdu=None):
+    """
+    read_data for library callers: errors are raised (OSError, ValueError)
+    instead of printed with an exit.
+    """
+    with stage('read_data') as record:
+        result = _cached_read(filename, ignore_extra, labels_from_file, solar_relative, read_mjd,
+                              time_window, column_map, hdu)
+        record['points'] += len(result[1])
+    return result
+
+
+def _cached_read(filename, ignore_extra, labels_from_file, solar_relative, read_mjd, time_window,
+                 column_map, hdu):
+    """_read_data through the read_cache() cache, when one is active."""
+    if _READ_CACHE is not None and not is_stream(filename) and os.path.isfile(filename):
+        stat = os.stat(filename)
+        key = (os.path.abspath(filename), stat.st_mtime_ns, stat.st_size, ignore_extra,
+               labels_from_file, solar_relative, read_mjd, time_window,
+               tuple(sorted((column_map or {}).items())), hdu)
+        if key not in _READ_CACHE:
+            result = _read_data(filename, ignore_extra, labels_from_file, solar_relative,
+                                read_mjd, time_window, column_map, hdu)
+            for column in result:
+                if isinstance(column, np.ndarray):
+                    column.setflags(write=False)
+            _READ_CACHE[key] = result
+        return _READ_CACHE[key]
+
+    return _read_data(filename, ignore_extra, labels_from_file, solar_relative, read_mjd,
+                      time_window, column_map, hdu)
+
+
+@contextlib.contextmanager
+def read_cache():
+    """
+    Reuse read_data (and load_data) results within the block.
+
+    Files are keyed by path, modification time, size and read options, so
+    a file that changes is read again. Cached arrays are read-only. Used by
+    mapplot batch, where jobs that share inputs run in the same process.
+    """
+    global _READ_CACHE
+    previous = _READ_CACHE
+    _READ_CACHE = {} if previous is None else previous
+    try:
+        yield _READ_CACHE
+    finally:
+        _READ_CACHE = previous
+
+
+def _read_data(filename, ignore_extra, labels_from_file, solar_relative, read_mjd, time_window,
+               column_map, hdu):
+    """load_data without the read cache."""
+    # Determine if we're reading MJD (either for solar-relative or animation)
+    has_mjd = solar_relative or read_mjd
+
+    if is_stream(filename):
+        # stdin and named pipes are parsed incrementally, chunk by chunk
+        result = concatenate_chunks(iter_data_chunks(
+            filename, ignore_extra=ignore_extra, labels_from_file=labels_from_file,
+            has_mjd=has_mjd, column_map=column_map))
+        if time_window is not None and has_mjd:
+            return _trim_to_window(time_window, *result)
+        return result
+
+    if is_columnar(filename):
+        return read_columnar_data(filename, ignore_extra=ignore_extra,
+                                  labels_from_file=labels_from_file, has_mjd=has_mjd,
+                                  time_window=time_window)
+
+    if is_fits(filename):
+        return _read_fits_data(filename, ignore_extra, labels_from_file, has_mjd,
+                               time_window, column_map, hdu)
+
+    # Named or CSV columns: parse only the columns that are needed
+    text_layout = None
+    if column_map or sniff_text_layout(filename)[1] is not None:
+        text_layout = text_column_indices(
+            filename, column_map, has_mjd, ignore_extra, labels_from_file)
+
+    # Read only the requested time window when the file can be indexed
+    # (uncompressed, whitespace-separated files with MJD in the first column)
+    source = filename
+    if time_window is not None and has_mjd and detect_compression(filename) is None and (
+            text_layout is None or (text_layout[0]['mjd'] == 0 and text_layout[1] is None)):
+        window_lines = read_time_window(filename, *time_window)
+        if window_lines is not None:
+            source = window_lines
+
+    result = _read_text(source, filename, has_mjd, ignore_extra, labels_from_file,
+                        text_layout)
+
+    if time_window is not None and has_mjd:
+        return _trim_to_window(time_window, *result)
+
+    return result
+
+
+def iter_data_chunks(filename, chunk_rows=DEFAULT_CHUNK_ROWS, ignore_extra=False,
+                     labels_from_file=False, has_mjd=False, column_map=None, hdu=None):
+    """
+    Read a data file in chunks of at most chunk_rows rows.
+
+    Text inputs (including '-', named pipes and compressed files) are read
+    front to back and each chunk of chunk_rows lines is parsed on its own,
+    so only one chunk is held in memory. Columnar and FITS files are memory-mapped and
+    yielded as slices.
+
+    Yields:
+    - (mjd, coord1, coord2, sizes, colors, labels) tuples, as read_data
+    """
+    if not is_stream(filename) and (is_columnar(filename) or is_fits(filename)):
+        result = read_data(filename, ignore_extra=ignore_extra, labels_from_file=labels_from_file,
+                           read_mjd=has_mjd, column_map=column_map, hdu=hdu)
+        for start in range(0, len(result[1]), chunk_rows):
+            rows = slice(start, start + chunk_rows)
+            yield tuple(column[rows] if column is not None else None for column in result)
+        return
+
+    with open_text(filename) as f:
+        # Sniff the layout from the lines up to the first data row, then put them back
+        head = []
+        for line in f:
+            head.append(line)
+            if line.strip() and not line.lstrip().startswith('#'):
+                break
+        text_layout, header_rows = text_chunk_layout(head, filename, column_map, has_mjd,
+                                                     ignore_extra, labels_from_file)
+        if header_rows:
+            head.pop()  # CSV header row
+
+        lines = itertools.chain(head, f)
+        while True:
+            chunk = list(itertools.islice(lines, chunk_rows))
+            if not chunk:
+                break
+            yield parse_text_lines(chunk, filename, text_layout, has_mjd, ignore_extra,
+                                   labels_from_file)
+
+
+def text_chunk_layout(head, filename, column_map=None, has_mjd=False, ignore_extra=False,
+                      labels_from_file=False):
+    """
+    Layout for parsing a text file in pieces, from its first lines.
+
+    Parameters:
+    - head: lines from the start of the file up to and including the first data row
+
+    Returns:
+    - text_layout: for parse_text_lines (None for positional columns)
+    - header_rows: 1 if the last line of head is a CSV header row, else 0
+    """
+    layout = _sniff_lines(head, filename)
+    text_layout = None
+    if column_map or layout[1] is not None:
+        text_layout = text_column_indices(filename, column_map, has_mjd, ignore_extra,
+                                          labels_from_file, layout=layout)
+        text_layout = text_layout[:2] + (0,)
+    return text_layout, layout[2]
+
+
+def parse_text_lines(lines, filename, text_layout=None, has_mjd=False, ignore_extra=False,
+                     labels_from_file=False):
+    """
+    Parse a list of text lines (without a header row) in the read_data layout.
+
+    text_layout comes from text_chunk_layout for the same file.
+    """
+    return _read_text(lines, filename, has_mjd, ignore_extra, labels_from_file, text_layout)
+
+
+def concatenate_chunks(chunks):
+    """Join (mjd, coord1, coord2, sizes, colors, labels) chunks into one result."""
+    chunks = list(chunks)
+    chunks = [chunk for chunk in chunks if len(chunk[1])] or chunks[:1]
+    if not chunks:
+        return np.empty(0), np.empty(0), np.empty(0), None, None, None
+
+    result = []
+    for i, columns in enumerate(zip(*chunks)):
+        if columns[0] is None:
+            result.append(None)
+        elif i == 5 and not isinstance(columns[0], np.ndarray):
+            result.append([lbl for column in columns for lbl in column])
+        else:
+            result.append(np.concatenate(columns))
+    return tuple(result)
+
+
+def input_frame(filename, args):
+    """
+    Coordinate system of the data in filename.
+
+    Columnar files carry a frame tag that overrides --input-coord; text files
+    use --input-coord.
+    """
+    if not args.earth and is_columnar(filename):
+        frame = read_header(filename).get('frame')
+        if frame and frame != 'earth':
+            return frame
+    return args.input_coord
+
+
+@dataclass
+class AnimationData:
+    """
+    Columnar animation records, one row per observation, sorted by MJD.
+
+    lon/lat are already in the plot frame. For solar-relative animations,
+    ecl_lon and elongation hold each record's ecliptic longitude and solar
+    elongation, so frames can re-project by slicing arrays.
+    """
+    mjd: np.ndarray
+    lon: np.ndarray
+    lat: np.ndarray
+    size: np.ndarray
+    color: np.ndarray
+    file_index: np.ndarray
+    label: np.ndarray = None
+    ecl_lon: np.ndarray = None
+    elongation: np.ndarray = None
+
+    def __len__(self):
+        return len(self.mjd)
+
+    def take(self, index):
+        """Return a new AnimationData with rows selected by index (array or slice)."""
+        columns = {}
+        for f in fields(self):
+            value = getattr(self, f.name)
+            columns[f.name] = value[index] if value is not None else None
+        return AnimationData(**columns)
+
+    @classmethod
+    def concatenate(cls, parts):
+        """Join AnimationData parts end to end."""
+        columns = {}
+        for f in fields(cls):
+            values = [getattr(p, f.name) for p in parts]
+            if any(v is None for v in values):
+                columns[f.name] = None
+            else:
+                columns[f.name] = np.concatenate(values)
+        return cls(**columns)
+
+
+def ingest_files(func, args, **kwargs):
+    """
+    Run a per-file ingest function over args.files.
+
+    With --workers > 1 and several files, files are parsed and transformed
+    concurrently in a process pool (each file's transform then runs in its
+    worker process); otherwise files are read in turn and --workers
+    parallelizes the transform of each file. Results are in file order.
+    Standard input is only readable from this process, so '-' among the
+    inputs keeps ingest in-process.
+    """
+    if args.workers > 1 and len(args.files) > 1 and STDIN not in args.files:
+        worker_args = copy.copy(args)
+        worker_args.workers = 1
+        return ordered_map(func, list(args.files), workers=args.workers,
+                           kwargs=dict(kwargs, args=worker_args))
+    return [func(filename, args=args, **kwargs) for filename in args.files]
+
+
+def color_sketch(colors, args):
+    """Quantile sketch of a color column for --cmap-percentiles (None when not needed)."""
+    if colors is None or args.cmap_percentiles is None:
+        return None
+    return QuantileSketch.from_values(colors)
+
+
+def color_limits(sketches, args):
+    """
+    Shared colormap limits for all files from their color sketches.
+
+    Returns:
+    - (vmin, vmax), or None when --cmap-percentiles is unset or no file has colors
+    """
+    merged = merge_sketches(sketches)
+    if merged is None or args.cmap_percentiles is None:
+        return None
+    return normalization_limits(merged, args.cmap_percentiles)
+
+
+def ingest_static_file(filename, args):
+    """
+    Read one data file and transform it into the plot frame (static mode).
+
+    Returns:
+    - mjd, lon, lat, sizes, colors, labels, sketch
+      (sketch is the color column's QuantileSketch with --cmap-percentiles, else None)
+    """
+    mjd, coord1, coord2, sizes, colors, labels = read_data(
+        filename,
+        ignore_extra=args.ignore_extra,
+        labels_from_file=args.labels_from_file,
+        solar_relative=args.solar_relative,
+        column_map=args.columns,
+        hdu=args.hdu
+    )
+
+    if args.solar_relative and mjd is None:
+        print("Error: --solar-relative requires MJD as first column", file=sys.stderr)
+        sys.exit(1)
+
+    coord1, coord2 = transform_to_plot_frame(args, mjd, coord1, coord2,
+                                             input_coord=input_frame(filename, args))
+    return mjd, coord1, coord2, sizes, colors, labels, color_sketch(colors, args)
+
+
+def ingest_animation_file(filename, args, time_window=None):
+    """
+    Read one data file for animation, transform it and sort it by MJD.
+
+    For solar-relative data the ecliptic longitude and solar elongation of
+    every record are computed here, once.
+
+    Returns:
+    - mjd, lon, lat, sizes, colors, labels, ecl_lon, elongation, sketch
+      (ecl_lon and elongation are None unless --solar-relative; sketch as
+      for ingest_static_file)
+    """
+    # Read data with MJD (either for animation or solar-relative)
+    mjd, lon, lat, sizes, colors, labels = read_data(
+        filename,
+        ignore_extra=args.ignore_extra,
+        labels_from_file=args.labels_from_file,
+        solar_relative=args.solar_relative,
+        read_mjd=True,
+        time_window=time_window,
+        column_map=args.columns,
+        hdu=args.hdu
+    )
+
+    if mjd is None:
+        print(f"Error: --animate requires MJD as first column in {filename}", file=sys.stderr)
+        sys.exit(1)
+
+    ecl_lon = None
+    elongation = None
+
+    if args.solar_relative:
+        ecl_lon, lat, elongation = compute_solar_elongation(
+            mjd, lon, lat, input_frame(filename, args),
+            engine=args.transform_engine, chunk_size=args.chunk_size,
+            workers=args.workers, equinox=args.equinox,
+            epoch_bin_days=args.epoch_bin_days
+        )
+        lon = wrap_longitude(elongation - args.solar_center)
+        if args.projection in ['mollweide', 'hammer', 'aitoff']:
+            lon = np.where(lon > 180, lon - 360, lon)
+    else:
+        lon, lat = transform_to_plot_frame(args, mjd, lon, lat,
+                                           input_coord=input_frame(filename, args))
+
+    # Survey files are usually already in time order; only sort the ones that are not
+    if not is_sorted(mjd):
+        order = np.argsort(mjd, kind='stable')
+        mjd, lon, lat = mjd[order], lon[order], lat[order]
+        sizes = sizes[order] if sizes is not None else None
+        colors = colors[order] if colors is not None else None
+        ecl_lon = ecl_lon[order] if ecl_lon is not None else None
+        elongation = elongation[order] if elongation is not None else None
+        if labels is not None:
+            labels = np.asarray(labels, dtype=object)[order]
+
+    return mjd, lon, lat, sizes, colors, labels, ecl_lon, elongation, color_sketch(colors, args)
+
+
+def animation_time_window(args):
+    """
+    MJD range of input rows an animation can show, as (mjd_min, mjd_max).
+
+    Rows before --start-time are still needed for --trail-days trails and
+    rolling statistics; cumulative animations, --show-before-start and
+    keyframes show everything from the first row.
+    """
+    mjd_min = None
+    if (args.start_time is not None and args.trail_days and not args.show_before_start
+            and not args.show_keyframe):
+        lookback = args.trail_days * max(1, min(15, args.stats_cycles))
+        mjd_min = args.start_time - lookback
+
+    return mjd_min, args.stop_time
+
+
 def prepare_animation_data(args, palette_name):
     """
-    Prepare and sort data for animation.
-    Returns list of dicts with: {'mjd', 'lon', 'lat', 'size', 'color', 'label', 'file_index'}
+    Read, transform and time-sort data for animation.
+
+    Each file goes through the same plot-frame transform as static mode
+    (solar-relative or --input-coord/--plot-coord), see ingest_animation_file;
+    files are ingested in parallel with --workers.
+
+    Returns an AnimationData sorted by MJD.
     """
-    all_data = []
+    import matplotlib
+    import matplotlib.colors as mcolors
 
     # Set up colors for files (use user-specified colors if provided)
     if args.color is None:
@@ -136,41 +776,190 @@ def prepare_animation_data(args, palette_name):
         if len(file_colors) < len(args.files):
             file_colors.extend(['black'] * (len(args.files) - len(file_colors)))
 
-    for file_idx, filename in enumerate(args.files):
-        # Read data with MJD (either for animation or solar-relative)
-        mjd, lon, lat, sizes, colors, labels = read_data(
-            filename,
-            ignore_extra=args.ignore_extra,
-            labels_from_file=args.labels_from_file,
-            solar_relative=args.solar_relative,
-            read_mjd=True
-        )
+    parts = []
+    color_values = []
+    sketches = []
+    time_window = animation_time_window(args) if args.time_index else None
 
-        if mjd is None:
-            print(f"Error: --animate requires MJD as first column in {filename}", file=sys.stderr)
-            sys.exit(1)
+    ingested = ingest_files(ingest_animation_file, args, time_window=time_window)
 
-        file_color = file_colors[file_idx]
+    for file_idx, (mjd, lon, lat, sizes, colors, labels, ecl_lon, elongation,
+                   sketch) in enumerate(ingested):
+        n = len(mjd)
+        part = AnimationData(
+            mjd=np.asarray(mjd, dtype=float),
+            lon=np.asarray(lon, dtype=float),
+            lat=np.asarray(lat, dtype=float),
+            size=np.asarray(sizes, dtype=float) if sizes is not None else np.full(n, float(args.size)),
+            color=np.tile(mcolors.to_rgba(file_colors[file_idx]), (n, 1)),
+            file_index=np.full(n, file_idx, dtype=np.int32),
+            label=np.asarray(labels if labels is not None else [None] * n, dtype=object),
+            ecl_lon=ecl_lon,
+            elongation=elongation,
+        )
+        parts.append(part)
+        color_values.append(colors)
+        sketches.append(sketch)
 
-        for i in range(len(lon)):
-            record = {
-                'mjd': mjd[i],
-                'lon': lon[i],
-                'lat': lat[i],
-                'size': sizes[i] if sizes is not None else args.size,
-                'color': colors[i] if colors is not None else file_color,
-                'label': labels[i] if labels is not None else None,
-                'file_index': file_idx
-            }
-            all_data.append(record)
+    # Map color columns through the colormap with one normalization for all files
+    # (percentile limits come from the merged per-file sketches, no second pass)
+    present = [c for c in color_values if c is not None and len(c) > 0]
+    if present:
+        limits = color_limits(sketches, args)
+        if limits is None:
+            limits = (min(np.min(c) for c in present), max(np.max(c) for c in present))
+        norm = mcolors.Normalize(vmin=limits[0], vmax=limits[1])
+        cmap = matplotlib.colormaps[args.cmap]
+        for part, values in zip(parts, color_values):
+            if values is not None:
+                part.color = cmap(norm(values))
 
-    # Sort by MJD
-    all_data.sort(key=lambda x: x['mjd'])
+    # Merge the per-file time-sorted runs into one time order
+    all_data = AnimationData.concatenate(parts)
+    all_data = all_data.take(merge_sorted_runs([part.mjd for part in parts]))
 
     # Downsample if needed
     if args.downsample > 0 and len(all_data) > args.downsample:
-        step = len(all_data) // args.downsample
-        all_data = all_data[::step]
-        print(f"Downsampled {len(all_data) * step} points to {len(all_data)}", file=sys.stderr)
+        n_before = len(all_data)
+        counts_before = np.bincount(all_data.file_index, minlength=len(args.files))
+
+        keep = downsample_indices(all_data, args.downsample, mode=args.downsample_mode,
+                                  seed=args.downsample_seed, n_bins=args.downsample_bins)
+        all_data = all_data.take(keep)
+
+        counts_after = np.bincount(all_data.file_index, minlength=len(args.files))
+        print(f"Downsampled {n_before} points to {len(all_data)} ({args.downsample_mode})",
+              file=sys.stderr)
+        for filename, before, after in zip(args.files, counts_before, counts_after):
+            print(f"  {filename}: kept {after} of {before}", file=sys.stderr)
 
     return all_data
+
+
+def is_sorted(values):
+    """True if values are in non-decreasing order."""
+    return len(values) < 2 or bool(np.all(values[1:] >= values[:-1]))
+
+
+def merge_sorted_runs(runs):
+    """
+    K-way merge of sorted key arrays.
+
+    If the runs are already in order end to end (files covering consecutive
+    periods), the result is the identity permutation after one linear check.
+    Otherwise numpy's stable sort is used: for float keys it is timsort,
+    which detects each pre-sorted run and merges them pairwise with galloping
+    in C. That is a k-way merge in O(n log k), and in practice several times
+    faster than merging with np.searchsorted from Python.
+
+    Ties keep earlier runs first, matching a stable sort of the
+    concatenated keys.
+
+    Parameters:
+    - runs: list of sorted 1-D key arrays
+
+    Returns:
+    - permutation that puts np.concatenate(runs) into sorted order
+    """
+    if not runs:
+        return np.arange(0)
+
+    keys = np.concatenate(runs)
+    if is_sorted(keys):
+        return np.arange(len(keys))
+    return np.argsort(keys, kind='stable')
+
+
+def stratified_sample(groups, target, rng):
+    """
+    Pick about target indices spread as evenly as possible over groups.
+
+    Every group gets the same quota (groups smaller than the quota keep all
+    their points), and points within a group are chosen at random.
+
+    Parameters:
+    - groups: non-negative integer group id per point
+    - target: number of points to keep
+    - rng: numpy Generator used for the random choice
+
+    Returns:
+    - sorted array of selected indices
+    """
+    groups = np.asarray(groups, dtype=np.int64)
+    n = len(groups)
+    if target >= n:
+        return np.arange(n)
+
+    counts = np.bincount(groups)
+
+    # Largest per-group quota that does not exceed the target (water filling)
+    lo, hi = 0, int(counts.max())
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if np.minimum(counts, mid).sum() <= target:
+            lo = mid
+        else:
+            hi = mid - 1
+    quota = np.minimum(counts, lo)
+
+    # Hand out the remainder one point at a time to randomly chosen groups
+    remainder = target - int(quota.sum())
+    if remainder > 0:
+        open_groups = np.flatnonzero(counts > quota)
+        quota[rng.choice(open_groups, size=remainder, replace=False)] += 1
+
+    # Rank points within each group in random order and keep the first quota
+    order = np.lexsort((rng.random(n), groups))
+    sorted_groups = groups[order]
+    group_start = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    rank = np.arange(n) - group_start[sorted_groups]
+    return np.sort(order[rank < quota[sorted_groups]])
+
+
+def sky_cell_index(lon, lat, n_cells):
+    """
+    Equal-area sky cell index for each point.
+
+    Cells are bands uniform in sin(latitude), each split into twice as many
+    uniform longitude bins, giving about n_cells cells of equal area.
+    """
+    n_lat = max(1, int(round(np.sqrt(n_cells / 2.0))))
+    n_lon = 2 * n_lat
+    lat_bin = np.floor((np.sin(np.radians(lat)) + 1.0) / 2.0 * n_lat).astype(np.int64)
+    lon_bin = np.floor((np.asarray(lon) % 360.0) / 360.0 * n_lon).astype(np.int64)
+    return np.clip(lat_bin, 0, n_lat - 1) * n_lon + np.clip(lon_bin, 0, n_lon - 1)
+
+
+def downsample_indices(data, target, mode='time', seed=0, n_bins=1000):
+    """
+    Choose which animation records to keep when downsampling.
+
+    Modes:
+    - stride: every Nth record in time order
+    - time: equal share per time bin (n_bins bins over the MJD range)
+    - file: equal share per input file
+    - sky: equal share per equal-area sky cell (about n_bins cells)
+
+    Returns sorted indices into data, so time order is preserved.
+    """
+    n = len(data)
+    if mode == 'stride':
+        return np.arange(0, n, n // target)
+
+    rng = np.random.default_rng(seed)
+
+    if mode == 'time':
+        span = data.mjd[-1] - data.mjd[0]
+        if span > 0:
+            groups = np.floor((data.mjd - data.mjd[0]) / span * n_bins).astype(np.int64)
+            groups = np.minimum(groups, n_bins - 1)
+        else:
+            groups = np.zeros(n, dtype=np.int64)
+    elif mode == 'file':
+        groups = data.file_index
+    elif mode == 'sky':
+        groups = sky_cell_index(data.lon, data.lat, n_bins)
+    else:
+        raise ValueError(f"Unknown downsample mode: {mode}")
+
+    return stratified_sample(groups, target, rng)
@@ -0,0 +1,208 @@
+"""Downloaded reference data kept in the user data directory ('mapplot data')."""
+
+import json
+import os
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from mapplot.config import DEFAULT_CONFIG, load_config
+
+MPC_OBSERVATORIES_URL = "https://www.minorplanetcenter.net/iau/lists/ObsCodesF.html"
+
+
+def _count_observatories(content):
+    from mapplot.observatories import parse_observatory_table
+    return len(parse_observatory_table(content))
+
+
+# Managed datasets: name (also the key of its path in the 'paths' config
+# section) -> source URL, description, and a function counting the records
+# of downloaded content (a download without records is rejected)
+DATASETS = {
+    'mpc_observatories': {
+        'url': MPC_OBSERVATORIES_URL,
+        'description': 'MPC observatory codes and positions',
+        'count': _count_observatories,
+    },
+}
+
+DAY = 86400.0
+
+
+def dataset_path(name, config=None):
+    """
+    Where a dataset is stored: its 'paths' entry in the configuration, or the
+    same file name in MAPPLOT_DATA_DIR when that environment variable is set.
+    """
+    path = os.path.expanduser((config or DEFAULT_CONFIG)['paths'][name])
+    data_dir = os.environ.get('MAPPLOT_DATA_DIR')
+    if data_dir:
+        return os.path.join(os.path.expanduser(data_dir), os.path.basename(path))
+    return path
+
+
+def _meta_path(path):
+    return path + '.meta.json'
+
+
+def read_meta(path):
+    """
+    Download metadata of a stored dataset: url, etag, last_modified and
+    fetched (the time of the last download or revalidation). Empty when the
+    file or its metadata is missing.
+    """
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(_meta_path(path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        # A copy without metadata (e.g. placed by hand) counts as fetched when written
+        return {'fetched': os.path.getmtime(path)}
+
+
+def _write_atomic(path, data):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _write_meta(path, meta):
+    _write_atomic(_meta_path(path), json.dumps(meta, indent=2).encode('utf-8'))
+
+
+def age(path):
+    """Seconds since a stored dataset was last fetched or revalidated (None if missing)."""
+    fetched = read_meta(path).get('fetched')
+    return None if fetched is None else max(0.0, time.time() - fetched)
+
+
+def is_stale(path, max_age_days):
+    """True when the stored copy is missing or older than max_age_days."""
+    seconds = age(path)
+    return seconds is None or seconds > max_age_days * DAY
+
+
+def update_dataset(name, path=None, max_age_days=7.0, force=False, url=None, timeout=30):
+    """
+    Bring a stored dataset up to date.
+
+    A copy fetched less than max_age_days ago is used as is, without any
+    network access. Otherwise the server is asked for the file with the
+    ETag and Last-Modified of the stored copy (If-None-Match,
+    If-Modified-Since), so an unchanged file is not downloaded again. New
+    content replaces the stored copy atomically.
+
+    Parameters:
+    - name: a key of DATASETS
+    - path: where the dataset is stored (default: dataset_path(name))
+    - max_age_days: age after which the stored copy is revalidated
+    - force: revalidate even if the stored copy is fresh
+    - url: source URL (default: the dataset's)
+    - timeout: network timeout in seconds
+
+    Returns:
+    - (status, count): status is 'fresh' (not checked), 'not-modified' or
+      'downloaded'; count is the number of records downloaded (else None)
+
+    Raises:
+    - OSError on network errors, ValueError for content without records
+    """
+    dataset = DATASETS[name]
+    path = path or dataset_path(name)
+    url = url or dataset['url']
+    meta = read_meta(path)
+
+    if not force and not is_stale(path, max_age_days) and meta.get('url', url) == url:
+        return 'fresh', None
+
+    request = urllib.request.Request(url, headers={'User-Agent': 'mapplot'})
+    if meta.get('url') == url:
+        if meta.get('etag'):
+            request.add_header('If-None-Match', meta['etag'])
+        if meta.get('last_modified'):
+            request.add_header('If-Modified-Since', meta['last_modified'])
+
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            content = response.read()
+            headers = response.headers
+    except urllib.error.HTTPError as e:
+        if e.code != 304:
+            raise
+        meta['fetched'] = time.time()
+        _write_meta(path, meta)
+        return 'not-modified', None
+
+    count = dataset['count'](content)
+    if not count:
+        raise ValueError(f"No records in the download of {name} from {url}")
+
+    _write_atomic(path, content)
+    _write_meta(path, {
+        'url': url,
+        'etag': headers.get('ETag'),
+        'last_modified': headers.get('Last-Modified'),
+        'fetched': time.time(),
+    })
+    return 'downloaded', count
+
+
+def _format_age(seconds):
+    if seconds < 3600:
+        return f"{seconds / 60:.0f} minutes"
+    if seconds < DAY:
+        return f"{seconds / 3600:.1f} hours"
+    return f"{seconds / DAY:.1f} days"
+
+
+def run_data(args):
+    """Update or show the stored reference data ('mapplot data')."""
+    config = load_config(args.config)
+    max_age_days = args.max_age if args.max_age is not None else config['data']['max_age_days']
+    names = args.names or list(DATASETS)
+
+    failed = []
+    for name in names:
+        path = dataset_path(name, config)
+        if args.action == 'status':
+            seconds = age(path)
+            if seconds is None:
+                print(f"{name}: missing ({path})")
+                continue
+            state = 'stale' if seconds > max_age_days * DAY else 'fresh'
+            meta = read_meta(path)
+            print(f"{name}: {state}, fetched {_format_age(seconds)} ago, "
+                  f"{os.path.getsize(path):,} bytes ({path})")
+            if meta.get('etag') or meta.get('last_modified'):
+                print(f"  ETag {meta.get('etag') or '-'}, "
+                      f"Last-Modified {meta.get('last_modified') or '-'}")
+            continue
+
+        try:
+            status, count = update_dataset(name, path, max_age_days=max_age_days,
+                                           force=args.force, url=args.url,
+                                           timeout=args.timeout)
+        except (OSError, ValueError) as e:
+            have_copy = os.path.exists(path)
+            print(f"Warning: Could not update {name}: {e}"
+                  + (" (keeping the stored copy)" if have_copy else ""), file=sys.stderr)
+            failed.append(name)
+            continue
+
+        if status == 'fresh':
+            print(f"{name}: up to date (fetched {_format_age(age(path))} ago, "
+                  f"max age {max_age_days:g} days)", file=sys.stderr)
+        elif status == 'not-modified':
+            print(f"{name}: not modified on the server, kept {path}", file=sys.stderr)
+        else:
+            print(f"{name}: downloaded {count:,} records to {path}", file=sys.stderr)
+
+    if failed:
+        raise RuntimeError(f"Could not update: {', '.join(failed)}")
@@ -0,0 +1,79 @@
+"""FITS binary-table input, read through astropy.io.fits in memmap mode."""
+
+import os
+
+import numpy as np
+
+from mapplot.columns import resolve_columns
+
+FITS_EXTENSIONS = ('.fits', '.fit', '.fts')
+
+_FITS_MAGIC = b'SIMPLE  ='
+
+
+def is_fits(filename):
+    """True if filename is a FITS file (checked by magic bytes)."""
+    if not isinstance(filename, str) or not os.path.isfile(filename):
+        return False
+    try:
+        with open(filename, 'rb') as f:
+            return f.read(len(_FITS_MAGIC)) == _FITS_MAGIC
+    except OSError:
+        return False
+
+
+def _table_hdu(hdul, hdu):
+    """Select the requested HDU, or the first binary/ASCII table."""
+    if hdu is not None:
+        try:
+            selected = hdul[int(hdu)] if str(hdu).isdigit() else hdul[hdu]
+        except (KeyError, IndexError):
+            raise ValueError(f"HDU {hdu} not found")
+        if getattr(selected, 'columns', None) is None:
+            raise ValueError(f"HDU {hdu} is not a table")
+        return selected
+
+    for candidate in hdul:
+        if getattr(candidate, 'columns', None) is not None and candidate.data is not None:
+            return candidate
+    raise ValueError("No table HDU found")
+
+
+def read_fits_columns(filename, column_map=None, hdu=None):
+    """
+    Open a FITS table and return its role columns.
+
+    Numeric columns are views into the memory-mapped file (no copy unless
+    the column is scaled with TSCAL/TZERO). Labels are returned as a numpy
+    string array.
+
+    Parameters:
+    - filename: FITS file
+    - column_map: role -> column name mapping (from --columns); unmapped
+                  roles are matched by common names (MJD, RA, DEC, ...)
+    - hdu: HDU index or extension name (default: first table)
+
+    Returns:
+    - dict of role -> array, for the roles found
+    """
+    from astropy.io import fits
+
+    # Memory-mapped column data stays valid after the file is closed
+    with fits.open(filename, memmap=True) as hdul:
+        table = _table_hdu(hdul, hdu)
+        resolved = resolve_columns(table.columns.names, column_map)
+
+        if 'coord1' not in resolved or 'coord2' not in resolved:
+            raise ValueError(f"Could not find coordinate columns in {filename}; "
+                             "map them with --columns ra=NAME,dec=NAME")
+
+        data = table.data
+        columns = {}
+        for role, name in resolved.items():
+            values = data.field(name)
+            if role == 'label':
+                values = np.char.strip(np.asarray(values).astype(str))
+            elif values.ndim != 1:
+                raise ValueError(f"Column {name} is not a scalar column")
+            columns[role] = values
+    return columns
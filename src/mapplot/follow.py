@@ -0,0 +1,280 @@
+"""Live tail mode (--follow): keep a static plot up to date as input files grow."""
+
+import os
+import sys
+import tempfile
+import time
+
+import cartopy.crs as ccrs
+import numpy as np
+
+from mapplot.aggregate import DensityGrid
+from mapplot.columnar import is_columnar
+from mapplot.coordinates import transform_to_plot_frame
+from mapplot.data_io import color_limits, input_frame, parse_text_lines, text_chunk_layout
+from mapplot.fitstable import is_fits
+from mapplot.plotting import add_colorbar, update_density_mesh
+from mapplot.profiling import stage, timed_draws
+from mapplot.sketch import QuantileSketch
+from mapplot.streams import detect_compression, is_stream
+
+
+def _is_data_line(line):
+    stripped = line.strip()
+    return bool(stripped) and not stripped.startswith('#')
+
+
+class FileTail:
+    """
+    Incremental reader for a text file that grows by appends.
+
+    Each read_new() call reads the bytes written since the previous call and
+    parses only the complete lines among them; a trailing partial line is
+    kept until its newline arrives. The column layout is sniffed once, from
+    the lines up to the first data row.
+    """
+
+    def __init__(self, filename, args, ignore_extra=None):
+        if (is_stream(filename) or not os.path.isfile(filename) or detect_compression(filename)
+                or is_columnar(filename) or is_fits(filename)):
+            raise ValueError(f"--follow needs uncompressed text files; cannot follow {filename}")
+
+        self.filename = filename
+        self.args = args
+        self.ignore_extra = args.ignore_extra if ignore_extra is None else ignore_extra
+        self.n_rows = 0
+        self.sketch = QuantileSketch() if args.cmap_percentiles is not None else None
+        self._reset()
+
+    def _reset(self):
+        self.offset = 0
+        self._partial = b''
+        self._head = []
+        self._text_layout = None
+        self._layout_ready = False
+
+    def read_new(self):
+        """
+        Parse the rows appended since the last call.
+
+        If the file shrank (truncated or replaced), it is read again from the
+        start; rows already plotted stay on the plot.
+
+        Returns:
+        - mjd, lon, lat, sizes, colors, labels in the plot frame, as
+          ingest_static_file, or None when no complete new row was written
+        """
+        size = os.path.getsize(self.filename)
+        if size < self.offset:
+            print(f"Warning: {self.filename} shrank; reading it again from the start",
+                  file=sys.stderr)
+            self._reset()
+        if size == self.offset:
+            return None
+
+        with open(self.filename, 'rb') as f:
+            f.seek(self.offset)
+            data = self._partial + f.read(size - self.offset)
+        self.offset = size
+
+        end = data.rfind(b'\n') + 1
+        self._partial = data[end:]
+        lines = data[:end].decode().splitlines(keepends=True)
+
+        if not self._layout_ready:
+            lines = self._head + lines
+            first = next((i for i, line in enumerate(lines) if _is_data_line(line)), None)
+            if first is None:
+                self._head = lines
+                return None
+            self._text_layout, header_rows = text_chunk_layout(
+                lines[:first + 1], self.filename, self.args.columns, self.args.solar_relative,
+                self.ignore_extra, self.args.labels_from_file)
+            if header_rows:
+                del lines[first]  # CSV header row
+            self._head = []
+            self._layout_ready = True
+
+        if not any(_is_data_line(line) for line in lines):
+            return None
+
+        mjd, coord1, coord2, sizes, colors, labels = parse_text_lines(
+            lines, self.filename, self._text_layout, has_mjd=self.args.solar_relative,
+            ignore_extra=self.ignore_extra, labels_from_file=self.args.labels_from_file)
+        if self.args.solar_relative and mjd is None:
+            raise ValueError("--solar-relative requires MJD as first column")
+
+        lon, lat = transform_to_plot_frame(self.args, mjd, coord1, coord2,
+                                           input_coord=input_frame(self.filename, self.args))
+        if self.sketch is not None and colors is not None:
+            self.sketch.update(colors)
+        self.n_rows += len(lon)
+        return mjd, lon, lat, sizes, colors, labels
+
+
+def open_tails(args):
+    """One FileTail per input file, reading the columns the plot mode needs."""
+    if args.density:
+        ignore_extra = args.density_stat == 'count'
+    else:
+        ignore_extra = args.ignore_extra
+    return [FileTail(filename, args, ignore_extra=ignore_extra) for filename in args.files]
+
+
+def read_initial(tails):
+    """
+    First read of every tail, in the ingest_static_file layout.
+
+    Returns:
+    - list of (mjd, lon, lat, sizes, colors, labels, sketch), one per file
+      (empty coordinate arrays for files without rows yet)
+    """
+    ingested = []
+    for tail in tails:
+        rows = tail.read_new() or (None, np.empty(0), np.empty(0), None, None, None)
+        ingested.append(rows + (tail.sketch,))
+    return ingested
+
+
+def initial_density_grid(tails, args):
+    """DensityGrid of everything the tails hold so far."""
+    grid = DensityGrid(*args.density_bins, track_values=args.density_stat != 'count')
+    for tail in tails:
+        _add_to_grid(grid, tail.filename, tail.read_new(), args)
+    return grid
+
+
+def _add_to_grid(grid, filename, rows, args):
+    if rows is None:
+        return
+    _, lon, lat, _, colors, _ = rows
+    if grid.track_values and colors is None and len(lon):
+        raise ValueError(f"--density-stat {args.density_stat} needs a color (value) "
+                         f"column in {filename}")
+    grid.add(lon, lat, colors)
+
+
+def save_figure_atomic(fig, args):
+    """
+    Save the figure to args.output through a temporary file and os.replace.
+
+    Readers of the output (web pages, image viewers) never see a partly
+    written image.
+    """
+    output = os.path.abspath(args.output)
+    root, ext = os.path.splitext(os.path.basename(output))
+    fd, tmp = tempfile.mkstemp(prefix=f'.{root}.', suffix=ext, dir=os.path.dirname(output))
+    os.close(fd)
+    try:
+        fig.savefig(tmp, dpi=args.dpi, bbox_inches='tight', facecolor=fig.get_facecolor())
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, output)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _append_points(ax, scatter, rows, args, norm=None):
+    """
+    Add new rows to an existing scatter artist.
+
+    Per-point sizes and colors are kept when the file had those columns
+    from the start. A file that had no rows yet was plotted without them,
+    so its first rows set them up (colormap and the shared norm included).
+    """
+    _, lon, lat, sizes, colors, labels = rows
+    offsets = scatter.get_offsets()
+    n_old = len(offsets)
+    scatter.set_offsets(np.concatenate([offsets, np.column_stack([lon, lat])]))
+
+    old_sizes = scatter.get_sizes()
+    if sizes is not None and (n_old == 0 or len(old_sizes) == n_old):
+        scatter.set_sizes(np.concatenate([old_sizes[:n_old], sizes * args.size]))
+    values = scatter.get_array()
+    if colors is not None and (values is not None or n_old == 0):
+        if values is None:
+            values = np.empty(0)
+            scatter.set_cmap(args.cmap)
+            if norm is not None:
+                scatter.set_norm(norm)
+        scatter.set_array(np.concatenate([values, colors]))
+        if args.cmap_percentiles is None:
+            scatter.autoscale()
+
+    if labels is not None and args.labels_from_file:
+        for x, y, lbl in zip(lon, lat, labels):
+            if lbl:
+                ax.text(x, y, lbl, fontsize=8, ha='left', va='bottom',
+                        transform=ccrs.PlateCarree(), zorder=3)
+
+
+def follow_scatter(args, fig, ax, tails, scatters, norm=None, colorbar=None,
+                   cbar_label='Color Value', max_updates=None):
+    """
+    Follow the inputs of a scatter plot, one scatter artist per file.
+
+    norm is the Normalize shared by all files with --cmap-percentiles; its
+    limits are recomputed from the tails' sketches after every update.
+    With --cbar and no colorbar yet (no file had a color column at
+    startup), the colorbar is added once color values arrive.
+    """
+    def update(new_rows):
+        nonlocal colorbar
+        for tail, scatter, rows in zip(tails, scatters, new_rows):
+            if rows is not None:
+                _append_points(ax, scatter, rows, args, norm)
+        limits = color_limits([tail.sketch for tail in tails], args)
+        if norm is not None and limits is not None:
+            norm.vmin, norm.vmax = limits
+
+        if args.cbar and colorbar is None:
+            mapped = [scatter for scatter in scatters if scatter.get_array() is not None]
+            if mapped:
+                colorbar = add_colorbar(fig, ax, mapped[-1], args, cbar_label)
+                fig.tight_layout(pad=1.5)
+
+    _follow_loop(args, fig, tails, update, max_updates)
+
+
+def follow_density(args, fig, tails, grid, mesh, max_updates=None):
+    """Follow the inputs of a --density plot, binning new rows into grid."""
+    def update(new_rows):
+        for tail, rows in zip(tails, new_rows):
+            _add_to_grid(grid, tail.filename, rows, args)
+        update_density_mesh(mesh, grid, args)
+
+    _follow_loop(args, fig, tails, update, max_updates)
+
+
+def _follow_loop(args, fig, tails, update, max_updates=None):
+    """
+    Poll the tails every --follow-interval seconds until interrupted.
+
+    update receives one read_new() result per file; the output is only
+    rewritten when some file had new rows. max_updates bounds the number of
+    polls (for tests); None runs until Ctrl-C.
+    """
+    print(f"Following {len(tails)} file(s); checking every {args.follow_interval:g} s "
+          f"(Ctrl-C to stop)", file=sys.stderr)
+    polls = 0
+    try:
+        while max_updates is None or polls < max_updates:
+            time.sleep(args.follow_interval)
+            polls += 1
+
+            with stage('read_new'):
+                new_rows = [tail.read_new() for tail in tails]
+            n_new = sum(len(rows[1]) for rows in new_rows if rows is not None)
+            if not n_new:
+                continue
+
+            with stage('update') as record:
+                update(new_rows)
+                record['points'] += n_new
+            with stage('savefig'), timed_draws(fig):
+                save_figure_atomic(fig, args)
+            total = sum(tail.n_rows for tail in tails)
+            print(f"  +{n_new:,} rows ({total:,} total), saved to {args.output}", file=sys.stderr)
+    except KeyboardInterrupt:
+        print("\nStopped following.", file=sys.stderr)
@@ -1,11 +1,118 @@
 """MPC observatory database: download, parse, and load."""
 
+import hashlib
 import os
 import sys
 import urllib.request
 
 import numpy as np
 
+from mapplot.datastore import MPC_OBSERVATORIES_URL, dataset_path, update_dataset
+from mapplot.streams import open_text
+
+# Fixed-width fields of an ObsCodes line (after stripping it)
+_CODE = slice(0, 3)
+_LON = slice(4, 13)
+_RHO_COS = slice(14, 21)
+_RHO_SIN = slice(22, 30)
+_NAME_START = 30
+
+# Bytes allowed in the numeric fields (NUL pads lines shorter than the longest)
+_NUMERIC_BYTES = np.zeros(256, dtype=bool)
+_NUMERIC_BYTES[list(b'0123456789.+- \x00')] = True
+_DIGITS = np.zeros(256, dtype=bool)
+_DIGITS[list(b'0123456789')] = True
+
+# Parsed observatory files: (path, mtime_ns, size) -> ObservatoryTable
+_TABLE_CACHE = {}
+
+
+class ObservatoryTable:
+    """
+    MPC observatories as columns, with a code -> row index.
+
+    Attributes:
+    - codes: observatory codes (str array)
+    - lon: longitudes in degrees, -180 to 180
+    - lat: geocentric latitudes in degrees
+    - names: observatory names (str array)
+    """
+
+    def __init__(self, codes, lon, lat, names):
+        self.codes = np.asarray(codes, dtype=str)
+        self.lon = np.asarray(lon, dtype=float)
+        self.lat = np.asarray(lat, dtype=float)
+        self.names = np.asarray(names, dtype=str)
+        self._index = None
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def index(self):
+        """Upper-case code -> row (the first row of a repeated code), built on first use."""
+        if self._index is None:
+            index = {}
+            for row, code in enumerate(np.char.upper(self.codes).tolist()):
+                index.setdefault(code, row)
+            self._index = index
+        return self._index
+
+    def rows(self, codes):
+        """
+        Rows of the given codes, matched case-insensitively.
+
+        Returns:
+        - (rows, missing): row index array in the order of codes, and the
+          codes that are not in the table
+        """
+        index = self.index
+        rows = []
+        missing = []
+        for code in codes:
+            row = index.get(str(code).upper())
+            if row is None:
+                missing.append(code)
+            else:
+                rows.append(row)
+        return np.array(rows, dtype=np.intp), missing
+
+    def select(self, codes):
+        """
+        Rows of every observatory whose code is in codes (case-insensitive),
+        in table order.
+        """
+        wanted = sorted({str(code).upper() for code in codes})
+        return np.flatnonzero(np.isin(np.char.upper(self.codes), wanted))
+
+    def take(self, rows):
+        """A table of the given rows."""
+        return ObservatoryTable(self.codes[rows], self.lon[rows], self.lat[rows], self.names[rows])
+
+    def records(self):
+        """The observatories as a list of dicts with code, lon, lat and name."""
+        return [{'code': code, 'lon': lon, 'lat': lat, 'name': name}
+                for code, lon, lat, name in zip(self.codes.tolist(), self.lon.tolist(),
+                                                 self.lat.tolist(), self.names.tolist())]
+
+
+def download_observatory_table(url=None):
+    """
+    Download observatory codes from Minor Planet Center.
+
+    Returns:
+    - ObservatoryTable (empty if the download fails)
+    """
+    if url is None:
+        url = MPC_OBSERVATORIES_URL
+
+    try:
+        response = urllib.request.urlopen(url, timeout=30)
+        return parse_observatory_table(response.read())
+    except Exception as e:
+        print(f"Warning: Could not download MPC observatories: {e}", file=sys.stderr)
+        return ObservatoryTable([], [], [], [])
+
 
 def download_mpc_observatories(url=None):
     """
@@ -17,118 +124,219 @@ def download_mpc_observatories(url=None):
     - lat: latitude in degrees
     - name: observatory name
     """
-    if url is None:
-        url = "https://www.minorplanetcenter.net/iau/lists/ObsCodesF.html"
+    return download_observatory_table(url).records()
 
-    try:
-        response = urllib.request.urlopen(url, timeout=30)
-        content = response.read().decode('utf-8')
-        return parse_mpc_observatories(content)
-    except Exception as e:
-        print(f"Warning: Could not download MPC observatories: {e}", file=sys.stderr)
-        return []
 
+def _fixed_width(chars, field):
+    """One fixed-width field of every line, as a stripped bytes array."""
+    width = field.stop - field.start
+    return np.char.strip(np.ascontiguousarray(chars[:, field]).view(f'S{width}').ravel())
 
-def parse_mpc_observatories(content):
+
+def _to_float(fields):
+    """Parse a bytes array as floats; fields that are not numbers become NaN."""
+    try:
+        return fields.astype(float)
+    except ValueError:
+        values = np.full(len(fields), np.nan)
+        for i, field in enumerate(fields.tolist()):
+            try:
+                values[i] = float(field)
+            except ValueError:
+                pass
+        return values
+
+
+def parse_observatory_table(content):
     """
-    Parse MPC observatory codes from file content.
+    Parse MPC observatory codes into an ObservatoryTable.
 
     Format is fixed-width:
     Code Longitude rho*cos(phi) rho*sin(phi) Name
 
-    where phi is geocentric latitude, rho is Earth radii
+    where phi is geocentric latitude, rho is Earth radii. The fields of all
+    lines are sliced and converted as arrays. Lines that are too short,
+    contain HTML, or lack a code or any of the numbers (such as space
+    telescopes) are skipped.
+
+    Parameters:
+    - content: file content (str or bytes)
     """
-    observatories = []
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    lines = np.char.strip(np.array(content.splitlines() or [b''], dtype=bytes))
+    width = max(lines.dtype.itemsize, _NAME_START + 1)
+    chars = lines.astype(f'S{width}').view(np.uint8).reshape(len(lines), width)
+
+    valid = (np.char.str_len(lines) >= _NAME_START)
+    valid &= ~np.any((chars == ord('<')) | (chars == ord('>')), axis=1)
+    codes = _fixed_width(chars, _CODE)
+    valid &= np.char.isalnum(np.char.replace(codes, b'.', b''))
+    for field in (_LON, _RHO_COS, _RHO_SIN):
+        valid &= _NUMERIC_BYTES[chars[:, field]].all(axis=1) & _DIGITS[chars[:, field]].any(axis=1)
+
+    chars = chars[valid]
+    codes = codes[valid]
+    lon, rho_cos, rho_sin = (_to_float(_fixed_width(chars, field))
+                             for field in (_LON, _RHO_COS, _RHO_SIN))
+    parsed = ~(np.isnan(lon) | np.isnan(rho_cos) | np.isnan(rho_sin))
+
+    codes = codes[parsed].astype(str)
+    # Names may be UTF-8: decode them all at once rather than one by one
+    names = _fixed_width(chars[parsed], slice(_NAME_START, width)).tolist()
+    names = np.array(b'\n'.join(names).decode('utf-8', 'replace').split('\n')
+                     if names else [], dtype=str)
+    names = np.where(names == '', np.char.add('Observatory ', codes), names)
+
+    lon = lon[parsed]
+    return ObservatoryTable(
+        codes,
+        np.where(lon > 180, lon - 360, lon),
+        np.degrees(np.arctan2(rho_sin[parsed], rho_cos[parsed])),
+        names,
+    )
+
 
-    for line in content.split('\n'):
-        line = line.strip()
-        if not line or len(line) < 30:
-            continue
+def parse_mpc_observatories(content):
+    """
+    Parse MPC observatory codes from file content.
 
-        # Skip HTML tags if present
-        if '<' in line or '>' in line:
-            continue
+    Returns:
+    - list of dicts with code, lon, lat and name (see parse_observatory_table)
+    """
+    return parse_observatory_table(content).records()
 
-        try:
-            # Parse fixed-width format
-            code = line[0:3].strip()
-            if not code or not code.replace('.', '').isalnum():
-                continue
 
-            lon_str = line[4:13].strip()
-            rho_cos_str = line[14:21].strip()
-            rho_sin_str = line[22:30].strip()
-            name = line[30:].strip()
+def _table_cache_file(path):
+    """Path of the on-disk cache of a parsed observatory file."""
+    from mapplot.config import get_cache_dir
+    key = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(get_cache_dir(), f'observatories_{key}.npz')
 
-            if not lon_str or not rho_cos_str or not rho_sin_str:
-                continue
 
-            lon = float(lon_str)
-            rho_cos = float(rho_cos_str)
-            rho_sin = float(rho_sin_str)
+def _read_table_cache(path, stamp):
+    """The cached table of path if it was made from the file as it is now, else None."""
+    try:
+        with np.load(_table_cache_file(path)) as cached:
+            if cached['stamp'].tolist() != list(stamp):
+                return None
+            return ObservatoryTable(cached['codes'], cached['lon'], cached['lat'], cached['names'])
+    except (OSError, KeyError, ValueError):
+        return None
 
-            # Convert to latitude using arctan2
-            lat = np.degrees(np.arctan2(rho_sin, rho_cos))
 
-            # Convert longitude to -180 to 180 range
-            if lon > 180:
-                lon = lon - 360
+def _write_table_cache(path, stamp, table):
+    """Store a parsed table atomically on disk (best effort)."""
+    try:
+        cache_file = _table_cache_file(path)
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        tmp_path = f'{cache_file}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, stamp=np.array(stamp, dtype=np.int64), codes=table.codes,
+                     lon=table.lon, lat=table.lat, names=table.names)
+        os.replace(tmp_path, cache_file)
+    except OSError as e:
+        print(f"Warning: Could not write observatory cache: {e}", file=sys.stderr)
+
+
+def read_observatory_file(path):
+    """
+    Parse an observatory file, using the cached table while the file is
+    unchanged (same mtime and size): in memory within a process, and as a
+    binary .npz in the cache directory across runs.
 
-            observatories.append({
-                'code': code,
-                'lon': lon,
-                'lat': lat,
-                'name': name if name else f"Observatory {code}"
-            })
+    Returns:
+    - ObservatoryTable
+    """
+    stat = os.stat(path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    key = (os.path.abspath(path),) + stamp
+    if key in _TABLE_CACHE:
+        return _TABLE_CACHE[key]
+
+    table = _read_table_cache(path, stamp)
+    if table is None:
+        with open_text(path) as f:
+            table = parse_observatory_table(f.read())
+        _write_table_cache(path, stamp, table)
+    _TABLE_CACHE[key] = table
+    return table
+
+
+def find_observatory_file(obs_file, config=None):
+    """
+    Locate an observatory file: as given, in the package directory, or for
+    the default name the copy kept by 'mapplot data update' (at the
+    'paths: mpc_observatories' entry of config), then ../data/.
 
-        except (ValueError, IndexError):
-            continue
+    Returns:
+    - the path, or None when no such file exists
+    """
+    if not obs_file:
+        return None
+    if os.path.exists(obs_file):
+        return obs_file
+
+    # Try in package data directory
+    pkg_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), obs_file)
+    if os.path.exists(pkg_path):
+        return pkg_path
+
+    if obs_file == 'mpc_observatories.txt':
+        # Try the user data directory, then ../data/ relative to package
+        for path in [dataset_path('mpc_observatories', config),
+                     os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                  '..', '..', 'data', 'mpc_observatories.txt')]:
+            if os.path.exists(path):
+                return path
+    return None
+
+
+def load_observatory_table(obs_file=None, config=None):
+    """
+    Load MPC observatories from file or download.
 
-    return observatories
+    A stored copy is always used as is; 'mapplot data update' refreshes it.
+    Only when there is none is the list downloaded, into the user data
+    directory, so later runs load it from there.
 
+    Parameters:
+    - obs_file: observatory file (default: mpc_observatories.txt)
+    - config: loaded configuration, whose 'paths' entry locates the stored
+      copy (default: DEFAULT_CONFIG)
 
-def load_mpc_observatories(obs_file=None):
-    """Load MPC observatories from file or download."""
-    # Try to find file
-    if obs_file:
-        # Try as-is
-        if not os.path.exists(obs_file):
-            # Try in package data directory
-            pkg_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), obs_file)
-            if os.path.exists(pkg_path):
-                obs_file = pkg_path
-            # Try in ../data/ relative to package
-            elif obs_file == 'mpc_observatories.txt':
-                data_path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
-                                         '..', '..', 'data', 'mpc_observatories.txt')
-                if os.path.exists(data_path):
-                    obs_file = data_path
-                else:
-                    user_path = os.path.expanduser('~/.local/share/mapplot/mpc_observatories.txt')
-                    if os.path.exists(user_path):
-                        obs_file = user_path
-
-    if obs_file and os.path.exists(obs_file):
+    Returns:
+    - ObservatoryTable (empty when nothing could be loaded)
+    """
+    path = find_observatory_file(obs_file or 'mpc_observatories.txt', config)
+    if path is not None:
         try:
-            with open(obs_file, 'r') as f:
-                content = f.read()
-            observatories = parse_mpc_observatories(content)
-            print(f"Loaded {len(observatories)} observatories from {obs_file}",
-                  file=sys.stderr)
-            return observatories
+            table = read_observatory_file(path)
+            print(f"Loaded {len(table)} observatories from {path}", file=sys.stderr)
+            return table
         except Exception as e:
-            print(f"Warning: Could not read {obs_file}: {e}", file=sys.stderr)
+            print(f"Warning: Could not read {path}: {e}", file=sys.stderr)
+            return ObservatoryTable([], [], [], [])
 
-    # Try downloading if file not found
+    # Download into the user data directory if no file was found
     if not obs_file or obs_file == 'mpc_observatories.txt':
+        path = dataset_path('mpc_observatories', config)
         print("Downloading observatory data from Minor Planet Center...",
               file=sys.stderr)
-        observatories = download_mpc_observatories()
-        if observatories:
-            print(f"Downloaded {len(observatories)} observatories", file=sys.stderr)
-        return observatories
+        try:
+            _, count = update_dataset('mpc_observatories', path)
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not download MPC observatories: {e}", file=sys.stderr)
+            return ObservatoryTable([], [], [], [])
+        print(f"Downloaded {count} observatories to {path}", file=sys.stderr)
+        return read_observatory_file(path)
 
-    return []
+    return ObservatoryTable([], [], [], [])
+
+
+def load_mpc_observatories(obs_file=None):
+    """Load MPC observatories from file or download, as a list of dicts (see ObservatoryTable.records)."""
+    return load_observatory_table(obs_file).records()
 
 
 def load_observatory_dates(dates_file):
@@ -148,7 +356,7 @@ def load_observatory_dates(dates_file):
         return dates
 
     try:
-        with open(dates_file, 'r') as f:
+        with open_text(dates_file) as f:
             for line in f:
                 line = line.strip()
                 if not line or line.startswith('#'):
@@ -0,0 +1,124 @@
+"""Chunked, multi-process execution of array transforms and per-file work."""
+
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+
+# Pool of worker processes kept open by shared_pool(), used by run_chunked
+_POOL = None
+
+
+def iter_blocks(n, chunk_size):
+    """Yield (start, stop) index pairs covering range(n) in blocks of chunk_size."""
+    for start in range(0, n, chunk_size):
+        yield start, min(start + chunk_size, n)
+
+
+@contextlib.contextmanager
+def shared_pool(workers):
+    """
+    Keep one pool of worker processes open for every run_chunked call inside
+    the block, instead of starting and stopping a pool per call.
+
+    Used where many chunks are transformed one after another (streamed
+    density rasters), so the process startup is paid once per run rather
+    than once per chunk. Processes start on first use. Does nothing with
+    workers <= 1 or inside another shared_pool block.
+    """
+    global _POOL
+    if workers <= 1 or _POOL is not None:
+        yield
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        _POOL = pool
+        try:
+            yield
+        finally:
+            _POOL = None
+
+
+def run_chunked(func, arrays, chunk_size, workers=1, kwargs=None, n_out=2):
+    """
+    Apply an array function to fixed-size blocks and gather the results.
+
+    The inputs are split into blocks of chunk_size points and func is called
+    on each block, either in-process or in a pool of worker processes.
+    Results are written into preallocated output arrays, and at most
+    2 * workers blocks are in flight at once, so memory beyond the outputs
+    stays bounded by the chunk size. Inside a shared_pool() block its pool
+    is used instead of a new one.
+
+    Parameters:
+    - func: picklable module-level function taking the block arrays as
+            positional arguments and returning a tuple of n_out arrays
+    - arrays: tuple of equal-length input arrays
+    - chunk_size: number of points per block
+    - workers: number of processes (1 = run in this process)
+    - kwargs: extra keyword arguments passed to func
+    - n_out: number of output arrays returned by func
+
+    Returns:
+    - tuple of n_out float arrays, in input order
+    """
+    kwargs = kwargs or {}
+    arrays = tuple(np.asarray(a) for a in arrays)
+    n = len(arrays[0])
+    outputs = tuple(np.empty(n, dtype=float) for _ in range(n_out))
+    blocks = iter_blocks(n, max(1, int(chunk_size)))
+
+    def store(start, stop, results):
+        for out, result in zip(outputs, results):
+            out[start:stop] = result
+
+    if workers <= 1 or n <= chunk_size:
+        for start, stop in blocks:
+            store(start, stop, func(*(a[start:stop] for a in arrays), **kwargs))
+        return outputs
+
+    def run(pool):
+        pending = {}
+        max_pending = 2 * workers
+
+        for start, stop in blocks:
+            if len(pending) >= max_pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    store(*pending.pop(future), future.result())
+
+            future = pool.submit(func, *(a[start:stop] for a in arrays), **kwargs)
+            pending[future] = (start, stop)
+
+        for future in list(pending):
+            store(*pending.pop(future), future.result())
+
+    if _POOL is not None:
+        run(_POOL)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            run(pool)
+
+    return outputs
+
+
+def ordered_map(func, items, workers=1, kwargs=None):
+    """
+    Apply func to each item, in a pool of worker processes when workers > 1.
+
+    Parameters:
+    - func: picklable module-level function taking an item as its first argument
+    - items: list of inputs
+    - workers: number of processes (1 = run in this process)
+    - kwargs: extra keyword arguments passed to func
+
+    Returns:
+    - list of results in the order of items, regardless of completion order
+    """
+    kwargs = kwargs or {}
+    if workers <= 1 or len(items) <= 1:
+        return [func(item, **kwargs) for item in items]
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(items))) as pool:
+        futures = [pool.submit(func, item, **kwargs) for item in items]
+        return [future.result() for future in futures]
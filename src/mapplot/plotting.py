@@ -1,17 +1,22 @@
 """Static plotting functions for sky and terrestrial maps."""
 
+import sys
+
 import numpy as np
 import cartopy.crs as ccrs
 import cartopy.feature as cfeature
+from matplotlib.gridspec import GridSpec
 from matplotlib.patches import Ellipse
 from matplotlib.legend_handler import HandlerPatch
 from matplotlib.patches import Circle
 
 from mapplot.catalog import get_bright_stars
+from mapplot.config import get_data_colors
+from mapplot.constants import MARKERS, TERRESTRIAL_PROJECTIONS
 from mapplot.coordinates import transform_coordinates
 from mapplot.geometry import (ecliptic_path, galactic_plane_path, celestial_equator_path,
                               get_pole_coordinates, milky_way_density_contours)
-from mapplot.observatories import load_mpc_observatories
+from mapplot.observatories import load_observatory_table
 
 
 def plot_sky_map(ax, args):
@@ -303,8 +308,8 @@ def plot_custom_gridlines(ax, grid_coord, plot_coord, grid_spacing, args):
         _plot_grid_line(ax, lon_vals, lat_vals, args)
 
 
-def plot_terrestrial_map(ax, args):
-    """Plot terrestrial map features."""
+def plot_terrestrial_map(ax, args, config=None):
+    """Plot terrestrial map features (config: loaded configuration, for data paths)."""
 
     if args.coastlines:
         ax.coastlines(linewidth=0.5, color='black')
@@ -320,39 +325,290 @@ def plot_terrestrial_map(ax, args):
 
     # Plot observatories if requested
     if args.observatories or args.obs_codes:
-        observatories = load_mpc_observatories(args.obs_file)
+        observatories = load_observatory_table(args.obs_file, config)
 
-        if observatories:
+        if len(observatories):
             if args.obs_codes:
-                obs_codes_upper = [c.upper() for c in args.obs_codes]
-                obs_to_plot = [obs for obs in observatories
-                              if obs['code'].upper() in obs_codes_upper]
-                if not obs_to_plot:
-                    import sys
+                obs_to_plot = observatories.take(observatories.select(args.obs_codes))
+                if not len(obs_to_plot):
                     print(f"Warning: No observatories found with codes: {args.obs_codes}",
                           file=sys.stderr)
             else:
                 obs_to_plot = observatories
 
-            if obs_to_plot:
-                lons = [obs['lon'] for obs in obs_to_plot]
-                lats = [obs['lat'] for obs in obs_to_plot]
-
-                ax.scatter(lons, lats, s=50, c='red', marker='^',
+            if len(obs_to_plot):
+                ax.scatter(obs_to_plot.lon, obs_to_plot.lat, s=50, c='red', marker='^',
                           edgecolors='darkred', linewidths=1,
                           alpha=0.8, transform=ccrs.PlateCarree(),
                           zorder=5, label='Observatories')
 
                 if len(obs_to_plot) <= 50:
-                    for obs in obs_to_plot:
-                        ax.text(obs['lon'], obs['lat'], f" {obs['code']}",
+                    for code, lon, lat in zip(obs_to_plot.codes, obs_to_plot.lon, obs_to_plot.lat):
+                        ax.text(lon, lat, f" {code}",
                                fontsize=6, ha='left', va='center',
                                transform=ccrs.PlateCarree(), zorder=6)
 
-                import sys
                 print(f"Plotted {len(obs_to_plot)} observatories", file=sys.stderr)
 
 
+def plot_density_grid(ax, grid, args):
+    """
+    Draw a DensityGrid statistic (--density-stat) as a raster; returns the mesh.
+
+    With --cmap-percentiles the color limits are percentiles of the occupied
+    cells (the raster is small, so they are computed exactly).
+    """
+    from matplotlib.colors import LogNorm, Normalize
+
+    raster = grid.statistic(args.density_stat)
+    vmin, vmax = _density_limits(raster, args)
+    norm = LogNorm(vmin=vmin, vmax=vmax) if args.density_log else Normalize(vmin=vmin, vmax=vmax)
+
+    return ax.pcolormesh(grid.lon_edges, grid.lat_edges, raster, cmap=args.cmap, norm=norm,
+                         alpha=args.alpha, shading='flat', transform=ccrs.PlateCarree(),
+                         zorder=2)
+
+
+def update_density_mesh(mesh, grid, args):
+    """Redraw a plot_density_grid mesh from the grid's current contents (--follow)."""
+    raster = grid.statistic(args.density_stat)
+    mesh.set_array(raster)
+    vmin, vmax = _density_limits(raster, args)
+    if vmin is None:
+        mesh.autoscale()
+    else:
+        mesh.set_clim(vmin, vmax)
+
+
+def _density_limits(raster, args):
+    """Color limits for a density raster: --cmap-percentiles of the occupied cells, or None."""
+    cells = raster.compressed()
+    if args.cmap_percentiles is None or not len(cells):
+        return None, None
+    vmin, vmax = np.percentile(cells, args.cmap_percentiles)
+    return vmin, vmax
+
+
+def create_map_axes(fig, args):
+    """
+    Add the map axes (and the animation timeline axes, if requested) to fig.
+
+    Sets the projection, background color, extent, sky-mode axis flip and
+    gridlines.
+
+    Returns:
+    - ax, ax_timeline (None without --show-timeline)
+    """
+    projection = TERRESTRIAL_PROJECTIONS[args.projection]()
+
+    # Check if timeline plot is requested
+    if args.show_timeline and args.trail_days:
+        main_height = 1.0 - args.timeline_height
+        timeline_height = args.timeline_height
+
+        gs = GridSpec(2, 1, figure=fig, height_ratios=[main_height, timeline_height],
+                     hspace=0.15)
+
+        ax = fig.add_subplot(gs[0], projection=projection)
+
+        ax_timeline = fig.add_subplot(gs[1])
+        ax_timeline.set_facecolor('white')
+        ax_timeline.grid(True, alpha=0.3)
+        ax_timeline.set_ylabel(args.timeline_ylabel, fontsize=10)
+
+        if args.timeline_xlabel_years:
+            ax_timeline.set_xlabel('Year', fontsize=10)
+        else:
+            ax_timeline.set_xlabel('MJD', fontsize=10)
+
+    else:
+        ax = fig.add_subplot(projection=projection)
+        ax_timeline = None
+
+    # Set background color
+    if args.facecolor:
+        ax.set_facecolor(args.facecolor)
+    else:
+        ax.set_facecolor(args.bgcolor)
+
+    # Set extent if specified
+    if args.extent:
+        ax.set_extent(args.extent, crs=ccrs.PlateCarree())
+    else:
+        ax.set_global()
+
+    # For sky mode, flip horizontal axis (astronomical convention)
+    if not args.earth:
+        ax.invert_xaxis()
+
+    if args.gridlines:
+        plot_gridlines(ax, args)
+
+    return ax, ax_timeline
+
+
+def plot_gridlines(ax, args):
+    """Draw gridlines (-g) in --grid-coord, or in the plot frame."""
+    grid_coord = args.grid_coord if args.grid_coord else args.plot_coord
+
+    if not args.earth and grid_coord != args.plot_coord:
+        if args.grid_spacing:
+            plot_custom_gridlines(ax, grid_coord, args.plot_coord, args.grid_spacing, args)
+        else:
+            plot_custom_gridlines(ax, grid_coord, args.plot_coord, (30, 30), args)
+        return
+
+    if args.grid_spacing:
+        spacing_lon, spacing_lat = args.grid_spacing
+    else:
+        spacing_lon = 30
+        spacing_lat = 30
+
+    gl = ax.gridlines(draw_labels=False, linewidth=1.0,
+                    color=args.grid_color,
+                    alpha=args.grid_alpha,
+                    linestyle=args.grid_style,
+                    xlocs=np.arange(-180, 181, spacing_lon),
+                    ylocs=np.arange(-90, 91, spacing_lat))
+
+    if args.grid_labels and args.projection in ['plate-carree', 'mercator']:
+        try:
+            from cartopy.mpl.ticker import LongitudeFormatter, LatitudeFormatter
+
+            gl.xformatter = LongitudeFormatter()
+            gl.yformatter = LatitudeFormatter()
+
+            gl.top_labels = False
+            gl.right_labels = False
+            gl.bottom_labels = True
+            gl.left_labels = True
+
+            gl.xlabel_style = {'size': 10}
+            gl.ylabel_style = {'size': 10}
+
+        except (ImportError, AttributeError) as e:
+            print(f"Warning: Grid labels not available ({e})", file=sys.stderr)
+    elif args.grid_labels and args.projection not in ['plate-carree', 'mercator']:
+        print(f"Warning: --grid-labels only works with plate-carree and mercator projections",
+              file=sys.stderr)
+        print(f"         Current projection: {args.projection}", file=sys.stderr)
+
+
+def dataset_styles(args, n_datasets, palette_name):
+    """
+    Marker color and legend label for each dataset, filling in defaults.
+
+    Colors missing from --color come from the palette (or black when some
+    were given); --legend without --labels numbers the datasets.
+
+    Returns:
+    - colors, labels (labels is None when there is nothing to label)
+    """
+    if args.color is None:
+        colors = get_data_colors(palette_name, n_datasets)
+    else:
+        colors = list(args.color) + ['black'] * (n_datasets - len(args.color))
+
+    labels = args.labels
+    if args.legend and labels is None:
+        labels = [f'Dataset {i+1}' for i in range(n_datasets)]
+    return colors, labels
+
+
+def plot_datasets(ax, ingested, args, colors, labels, norm=None):
+    """
+    Scatter each ingested dataset onto the map.
+
+    Parameters:
+    - ingested: list of (mjd, lon, lat, sizes, colors, labels, sketch) in the
+      plot frame, as returned by ingest_static_file
+    - colors, labels: per-dataset marker colors and legend labels (dataset_styles)
+    - norm: Normalize shared by all color columns (--cmap-percentiles), or None
+
+    Returns:
+    - list of scatter artists, and the last one with a color column (or None)
+    """
+    marker = MARKERS.get(args.marker, args.marker)
+    scatters = []
+    mappable = None
+
+    for i, (mjd, coord1, coord2, sizes, values, point_labels, _) in enumerate(ingested):
+        if sizes is not None:
+            s = sizes * args.size
+        else:
+            s = args.size
+
+        if values is not None:
+            c = values
+            cmap = args.cmap
+            color_norm = norm
+        else:
+            c = colors[i]
+            cmap = None
+            color_norm = None
+
+        label = labels[i] if labels and i < len(labels) else None
+
+        scatter = ax.scatter(coord1, coord2, s=s, c=c, marker=marker,
+                           alpha=args.alpha, transform=ccrs.PlateCarree(),
+                           edgecolors=args.edgecolor, linewidths=args.edgewidth,
+                           cmap=cmap, norm=color_norm, label=label, zorder=2)
+        scatters.append(scatter)
+
+        if point_labels is not None and args.labels_from_file:
+            for x, y, lbl in zip(coord1, coord2, point_labels):
+                if lbl:
+                    ax.text(x, y, lbl, fontsize=8, ha='left', va='bottom',
+                           transform=ccrs.PlateCarree(), zorder=3)
+
+        if values is not None:
+            mappable = scatter
+
+    return scatters, mappable
+
+
+def add_colorbar(fig, ax, mappable, args, cbar_label='Color Value'):
+    """Horizontal colorbar of mappable below the map."""
+    return fig.colorbar(mappable, ax=ax, orientation='horizontal',
+                        pad=0.05, shrink=0.8, label=cbar_label,
+                        extend='both' if args.cmap_percentiles else 'neither')
+
+
+def finish_static_map(fig, ax, args, mappable=None, cbar_label='Color Value', title=None):
+    """
+    Add the colorbar, cardinal markers, legend and title, then lay the figure out.
+
+    Returns:
+    - the Colorbar, or None
+    """
+    colorbar = None
+    if args.cbar and mappable is not None:
+        colorbar = add_colorbar(fig, ax, mappable, args, cbar_label)
+
+    # Add cardinal direction markers
+    if args.cardinal:
+        plot_cardinal_directions(ax, args)
+
+    # Add legend
+    if args.legend or (not args.earth and (args.catalog or args.ecliptic or args.galactic_plane)):
+        handler_map = {}
+        if hasattr(ax, '_gc_legend_handler'):
+            handler_map.update(ax._gc_legend_handler)
+
+        legend = ax.legend(loc='best', framealpha=0.9, facecolor='white',
+                 edgecolor='gray', frameon=True, borderpad=0.5,
+                 handler_map=handler_map if handler_map else None)
+        legend.set_zorder(100)
+
+    # Add title
+    title = title if title is not None else args.title
+    if title:
+        ax.set_title(title, fontsize=14, fontweight='bold', pad=20)
+
+    fig.tight_layout(pad=1.5)
+    return colorbar
+
+
 def _plot_segmented_line(ax, lon, lat, color, linewidth, alpha, label=None):
     """Plot a line, splitting at 180-degree discontinuities."""
     dl = np.diff(lon)
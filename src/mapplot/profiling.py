@@ -0,0 +1,373 @@
+"""Per-stage wall/CPU timers for --profile, and memory tracing for --profile-memory."""
+
+import contextlib
+import functools
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from mapplot import __version__
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:
+    RESOURCE_AVAILABLE = False
+
+# The active Profile while a profiled() block runs, else None
+_PROFILE = None
+
+
+class Profile:
+    """
+    Timings collected during one profiled run.
+
+    Stages are keyed by their path ('ingest/read_data' for read_data timed
+    inside the ingest stage) in the order they were first entered. Each
+    stage accumulates calls, wall and CPU seconds, CPU seconds of child
+    processes that exited meanwhile (ffmpeg) and the number of points it
+    handled.
+
+    With memory=True, Python allocations are traced with tracemalloc (which
+    must be tracing) and each stage also records mem_peak, the largest
+    allocation above its starting point, mem_retained, what it left
+    allocated, rss, the resident set size when it last ended, and
+    rss_peak_growth, how far it raised the process's peak RSS.
+    """
+
+    def __init__(self, memory=False, memory_budget=None):
+        """
+        Parameters:
+        - memory: trace allocations per stage (tracemalloc must be tracing)
+        - memory_budget: flag stages whose mem_peak exceeds this many bytes
+        """
+        self.stages = {}
+        self.frames = []
+        self.memory = memory
+        self.memory_budget = memory_budget
+        self._stack = []
+        # Peak traced bytes of each open stage, outermost (the whole run) first
+        self._peaks = [tracemalloc.get_traced_memory()[1]] if memory else []
+        self._start = _clock()
+
+    def record(self, name):
+        path = '/'.join(self._stack + [name])
+        if path not in self.stages:
+            self.stages[path] = {'calls': 0, 'wall': 0.0, 'cpu': 0.0, 'child_cpu': 0.0,
+                                 'points': 0}
+            if self.memory:
+                self.stages[path].update(mem_peak=0, mem_retained=0, rss=None,
+                                         rss_peak_growth=0)
+        return path, self.stages[path]
+
+    def memory_enter(self):
+        """Start measuring a stage's allocations; returns the state memory_exit() needs."""
+        current, peak = tracemalloc.get_traced_memory()
+        # tracemalloc has one peak: fold it into the enclosing stage before resetting it
+        self._peaks[-1] = max(self._peaks[-1], peak)
+        tracemalloc.reset_peak()
+        self._peaks.append(current)
+        return current, peak_rss()['peak_rss_bytes']
+
+    def memory_exit(self, record, start):
+        current, peak = tracemalloc.get_traced_memory()
+        peak = max(peak, self._peaks.pop())
+        self._peaks[-1] = max(self._peaks[-1], peak)
+
+        start_current, start_peak_rss = start
+        record['mem_peak'] = max(record['mem_peak'], peak - start_current)
+        record['mem_retained'] += current - start_current
+        record['rss'] = current_rss()
+        if start_peak_rss is not None:
+            record['rss_peak_growth'] += peak_rss()['peak_rss_bytes'] - start_peak_rss
+
+    def report(self, argv=None):
+        """The run as a JSON-serialisable dict."""
+        wall, cpu, child_cpu = _elapsed(self._start)
+        report = {
+            'version': __version__,
+            'argv': list(sys.argv[1:] if argv is None else argv),
+            'total': {'wall': round(wall, 4), 'cpu': round(cpu, 4),
+                      'child_cpu': round(child_cpu, 4)},
+            'stages': [dict(name=path, **{key: round(value, 4) if isinstance(value, float)
+                                          else value for key, value in stage.items()})
+                       for path, stage in self.stages.items()],
+            'frames': None,
+        }
+        if self.frames:
+            report['frames'] = {
+                'count': len(self.frames),
+                'mean': round(sum(self.frames) / len(self.frames), 5),
+                'p50': round(percentile(self.frames, 50), 5),
+                'p95': round(percentile(self.frames, 95), 5),
+                'max': round(max(self.frames), 5),
+            }
+        report.update(peak_rss())
+        report['memory'] = self.memory_report(report['stages']) if self.memory else None
+        return report
+
+    def memory_close(self):
+        """Fold the run's remaining traced peak into the total (before tracemalloc stops)."""
+        self._peaks[0] = max(self._peaks[0], tracemalloc.get_traced_memory()[1])
+
+    def memory_report(self, stages):
+        """
+        Add bytes_per_point and over_budget to the stage entries of a report.
+
+        Points are the input points: those counted by read_data stages, else
+        the largest count of any stage.
+
+        Returns:
+        - dict with traced_peak_bytes, input_points, budget_bytes and
+          over_budget (names of the stages whose mem_peak exceeds the budget)
+        """
+        points = sum(item['points'] for item in stages if item['name'].endswith('read_data'))
+        points = points or max((item['points'] for item in stages), default=0)
+        over = []
+        for item in stages:
+            item['bytes_per_point'] = round(item['mem_peak'] / points, 1) if points else None
+            item['over_budget'] = (self.memory_budget is not None
+                                   and item['mem_peak'] > self.memory_budget)
+            if item['over_budget']:
+                over.append(item['name'])
+        return {
+            'traced_peak_bytes': self._peaks[0],
+            'input_points': points,
+            'budget_bytes': self.memory_budget,
+            'over_budget': over,
+        }
+
+
+def _clock():
+    times = os.times()
+    return time.perf_counter(), time.process_time(), times.children_user + times.children_system
+
+
+def _elapsed(start):
+    now = _clock()
+    return tuple(b - a for a, b in zip(start, now))
+
+
+def percentile(values, q):
+    """q-th percentile of values, interpolating linearly (as numpy's default)."""
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def peak_rss():
+    """
+    Peak resident set size of this process and of its largest child, in bytes.
+
+    Returns:
+    - dict with peak_rss_bytes and peak_rss_children_bytes (None where the
+      platform has no getrusage)
+    """
+    if not RESOURCE_AVAILABLE:
+        return {'peak_rss_bytes': None, 'peak_rss_children_bytes': None}
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return {
+        'peak_rss_bytes': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+        'peak_rss_children_bytes': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale,
+    }
+
+
+def current_rss():
+    """Resident set size of this process now, in bytes (None where /proc is missing)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+@contextlib.contextmanager
+def stage(name):
+    """
+    Time a pipeline stage when profiling is on (a no-op otherwise).
+
+    Yields the stage's record; add to record['points'] the number of points
+    the stage handled. Stages entered inside this one are reported nested.
+    """
+    if _PROFILE is None:
+        yield {'points': 0}
+        return
+
+    profile = _PROFILE
+    path, record = profile.record(name)
+    profile._stack.append(name)
+    memory = profile.memory_enter() if profile.memory else None
+    start = _clock()
+    try:
+        yield record
+    finally:
+        wall, cpu, child_cpu = _elapsed(start)
+        if memory is not None:
+            profile.memory_exit(record, memory)
+        profile._stack.pop()
+        record['calls'] += 1
+        record['wall'] += wall
+        record['cpu'] += cpu
+        record['child_cpu'] += child_cpu
+
+
+def timed_iter(name, iterable):
+    """Iterate, timing each step as stage name (for chunk readers)."""
+    if _PROFILE is None:
+        yield from iterable
+        return
+
+    iterator = iter(iterable)
+    while True:
+        with stage(name) as record:
+            try:
+                item = next(iterator)
+            except StopIteration:
+                record['calls'] -= 1
+                return
+            if isinstance(item, tuple) and len(item) > 1 and item[1] is not None:
+                record['points'] += len(item[1])
+        yield item
+
+
+def timed(name, func):
+    """Wrap func so that each call is timed as stage name."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with stage(name):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+@contextlib.contextmanager
+def timed_draws(fig):
+    """Time every draw of fig (inside savefig or an animation save) as stage 'draw'."""
+    if _PROFILE is None:
+        yield
+        return
+
+    draw = fig.draw
+
+    def timed_draw(renderer):
+        with stage('draw'):
+            return draw(renderer)
+
+    fig.draw = timed_draw
+    try:
+        yield
+    finally:
+        del fig.draw
+
+
+def frame_callback():
+    """
+    progress_callback for Animation.save recording the wall time of each frame
+    (update, draw and encode); None when profiling is off.
+    """
+    if _PROFILE is None:
+        return None
+    profile = _PROFILE
+    last = [time.perf_counter()]
+
+    def callback(current_frame, total_frames):
+        now = time.perf_counter()
+        profile.frames.append(now - last[0])
+        last[0] = now
+
+    return callback
+
+
+@contextlib.contextmanager
+def profiled(args):
+    """
+    Profile the block with --profile: print the stage table to stderr and
+    write the JSON report when the block completes. --profile-memory or
+    --memory-budget also trace memory per stage (and imply --profile).
+    """
+    global _PROFILE
+    budget = getattr(args, 'memory_budget', None)
+    memory = getattr(args, 'profile_memory', False) or budget is not None
+    if not (getattr(args, 'profile', False) or memory):
+        yield None
+        return
+
+    started = memory and not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    previous = _PROFILE
+    _PROFILE = profile = Profile(memory=memory,
+                                 memory_budget=None if budget is None else int(budget * 2**20))
+    try:
+        yield profile
+    finally:
+        _PROFILE = previous
+        if memory:
+            profile.memory_close()
+        if started:
+            tracemalloc.stop()
+
+    report = profile.report()
+    print_summary(report)
+    path = profile_path(args)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+        f.write('\n')
+    print(f"Profile written to {path}", file=sys.stderr)
+
+
+def profile_path(args):
+    """--profile-json, else OUTPUT.profile.json, else mapplot-profile.json."""
+    if args.profile_json:
+        return args.profile_json
+    if args.output:
+        return args.output + '.profile.json'
+    return 'mapplot-profile.json'
+
+
+def _megabytes(n_bytes):
+    return '-' if n_bytes is None else f"{n_bytes / 2**20:,.0f} MB"
+
+
+def print_summary(report, file=None):
+    """Print a profile report as a table (with memory columns when memory was traced)."""
+    file = file or sys.stderr
+    total = report['total']
+    memory = report.get('memory')
+    child = f", {total['child_cpu']:.3f} s child CPU" if total['child_cpu'] else ''
+    print(f"\nProfile: {total['wall']:.3f} s wall, {total['cpu']:.3f} s CPU{child}, "
+          f"peak RSS {_megabytes(report['peak_rss_bytes'])}", file=file)
+    header = f"  {'Stage':<28} {'Calls':>6} {'Wall s':>9} {'CPU s':>9} {'Child s':>8} {'Points':>12}"
+    if memory:
+        header += f" {'Peak MB':>9} {'Kept MB':>9} {'B/point':>9} {'RSS MB':>8}"
+    print(header, file=file)
+    for item in report['stages']:
+        depth = item['name'].count('/')
+        name = '  ' * depth + item['name'].rsplit('/', 1)[-1]
+        points = f"{item['points']:,}" if item['points'] else ''
+        child = f"{item['child_cpu']:.3f}" if item['child_cpu'] else ''
+        line = (f"  {name:<28} {item['calls']:>6} {item['wall']:>9.3f} {item['cpu']:>9.3f} "
+                f"{child:>8} {points:>12}")
+        if memory:
+            per_point = '' if item['bytes_per_point'] is None else f"{item['bytes_per_point']:,.0f}"
+            rss = '' if item['rss'] is None else f"{item['rss'] / 2**20:,.0f}"
+            line += (f" {item['mem_peak'] / 2**20:>9.1f} {item['mem_retained'] / 2**20:>9.1f} "
+                     f"{per_point:>9} {rss:>8}{'  !' if item['over_budget'] else ''}")
+        print(line, file=file)
+
+    frames = report['frames']
+    if frames:
+        print(f"  Frames: {frames['count']}, p50 {frames['p50'] * 1000:.1f} ms, "
+              f"p95 {frames['p95'] * 1000:.1f} ms, max {frames['max'] * 1000:.1f} ms", file=file)
+
+    if memory:
+        print(f"  Traced peak {_megabytes(memory['traced_peak_bytes'])} for "
+              f"{memory['input_points']:,} input points", file=file)
+        for name in memory['over_budget']:
+            item = next(item for item in report['stages'] if item['name'] == name)
+            print(f"Warning: stage {name} allocated {_megabytes(item['mem_peak'])} at its peak, "
+                  f"over the {_megabytes(memory['budget_bytes'])} budget", file=file)
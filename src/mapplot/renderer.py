@@ -0,0 +1,353 @@
+"""Programmatic rendering API: MapRenderer and RenderOptions."""
+
+import os
+from dataclasses import asdict, dataclass, fields
+
+from mapplot.constants import DEFAULT_CHUNK_SIZE
+
+
+class MapplotError(ValueError):
+    """Invalid render options or input data."""
+
+
+@dataclass
+class RenderOptions:
+    """
+    Options for MapRenderer, named and defaulted like the CLI options
+    (grid_spacing for --grid-spacing, and so on).
+
+    Input files, -o and the animation and --follow options are not part of
+    a RenderOptions: data and output are given to each MapRenderer.render()
+    call, and animations are made by the CLI.
+    """
+    # Mode, catalog and frames
+    earth: bool = False
+    catalog: bool = False
+    max_mag: float = 6.0
+    input_coord: str = 'equatorial'
+    plot_coord: str = 'equatorial'
+    grid_coord: str = None
+    transform_engine: str = 'astropy'
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+    workers: int = 1
+
+    # Sky overlays
+    ecliptic: bool = False
+    galactic_plane: bool = False
+    celestial_equator: bool = False
+    poles: tuple = None
+    milky_way: bool = False
+
+    # Solar-relative coordinates
+    solar_relative: bool = False
+    solar_center: float = 180.0
+    equinox: str = 'J2000'
+    epoch_bin_days: float = 1.0
+
+    # Projection and gridlines
+    projection: str = 'plate-carree'
+    extent: tuple = None
+    gridlines: bool = False
+    grid_spacing: tuple = None
+    grid_color: str = 'gray'
+    grid_alpha: float = 0.5
+    grid_style: str = '--'
+    grid_labels: bool = False
+    cardinal: bool = False
+
+    # Terrestrial features
+    coastlines: bool = True
+    countries: bool = False
+    land: bool = False
+    ocean: bool = False
+    observatories: bool = False
+    obs_codes: tuple = None
+    obs_file: str = 'mpc_observatories.txt'
+
+    # Markers and colors
+    marker: str = 'circle'
+    color: tuple = None
+    size: float = 20.0
+    alpha: float = 0.7
+    edgecolor: str = 'none'
+    edgewidth: float = 0.5
+    palette: str = None
+    cmap: str = 'viridis'
+    cbar: bool = False
+    cmap_percentiles: tuple = None
+
+    # Density raster
+    density: bool = False
+    density_bins: tuple = (360, 180)
+    density_log: bool = False
+    density_stat: str = 'count'
+
+    # Figure
+    bgcolor: str = 'white'
+    facecolor: str = None
+    figsize: tuple = (12.0, 8.0)
+    dpi: int = 100
+    title: str = None
+    legend: bool = False
+    labels: tuple = None
+    config: str = None
+
+    # Reading files
+    labels_from_file: bool = False
+    ignore_extra: bool = False
+    columns: dict = None
+    hdu: str = None
+
+    def to_args(self):
+        """
+        Namespace for the plotting functions: CLI defaults overlaid with these options.
+
+        Raises MapplotError for values outside the CLI's choices.
+        """
+        from mapplot.cli import build_parser
+
+        parser = build_parser()
+        args = parser.parse_args([])
+        for action in parser._actions:
+            value = getattr(self, action.dest, None)
+            if action.choices is None or value is None:
+                continue
+            for item in value if isinstance(value, (list, tuple)) else [value]:
+                if item not in action.choices:
+                    raise MapplotError(f"{action.dest}: invalid choice {item!r} "
+                                       f"(choose from {', '.join(map(str, action.choices))})")
+
+        for name, value in asdict(self).items():
+            setattr(args, name, list(value) if isinstance(value, tuple) else value)
+        return args
+
+
+def validate_options(args):
+    """
+    Check combinations of plotting options shared by the CLI and MapRenderer.
+
+    Raises MapplotError with the message the CLI prints after 'Error: '.
+    """
+    if args.solar_relative:
+        if args.earth:
+            raise MapplotError("--solar-relative is not compatible with --earth mode")
+
+        conflicts = [
+            ('galactic_plane', '--galactic-plane',
+             "Galactic plane coordinates don't align with solar-relative frame"),
+            ('celestial_equator', '--celestial-equator',
+             "Celestial equator doesn't align with solar-relative frame"),
+            ('milky_way', '--milky-way', "Milky Way density is in galactic coordinates"),
+            ('poles', '--poles', "Coordinate poles are not meaningful in solar-relative frame"),
+            ('grid_coord', '--grid-coord', "Solar-relative uses its own coordinate system"),
+        ]
+        for name, option, reason in conflicts:
+            if getattr(args, name):
+                raise MapplotError(f"{option} is not compatible with --solar-relative\n"
+                                   f"       ({reason})")
+        if args.plot_coord != 'equatorial':
+            raise MapplotError("--plot-coord is not compatible with --solar-relative\n"
+                               "       (Solar-relative uses its own coordinate system)")
+
+    if args.density:
+        if args.animate:
+            raise MapplotError("--density is not compatible with --animate")
+        if min(args.density_bins) < 1:
+            raise MapplotError("--density-bins must be positive")
+        if args.chunk_rows < 1:
+            raise MapplotError("--chunk-rows must be positive")
+
+    if args.cmap_percentiles is not None:
+        low, high = args.cmap_percentiles
+        if not 0 <= low < high <= 100:
+            raise MapplotError("--cmap-percentiles needs 0 <= LO < HI <= 100")
+
+    if args.epoch_bin_days <= 0:
+        raise MapplotError("--epoch-bin-days must be positive")
+
+
+class MapRenderer:
+    """
+    Render static maps from arrays or files without pyplot.
+
+    The renderer owns a matplotlib Figure. The first render() builds the
+    axes, projection and background (catalog, overlays, coastlines,
+    gridlines); later calls remove only the previous data layers and draw
+    the new data on the same background. Errors are raised as MapplotError
+    (or OSError for unreadable files), never turned into an exit.
+
+    Example:
+        renderer = MapRenderer(RenderOptions(projection='mollweide', catalog=True))
+        renderer.render([{'ra': ra, 'dec': dec, 'color': mag}], output='night1.png')
+        renderer.render(['night2.txt'], output='night2.png')
+
+    A renderer is not thread-safe; use one per thread.
+    """
+
+    def __init__(self, options=None, **kwargs):
+        """
+        Parameters:
+        - options: RenderOptions (default: all defaults)
+        - kwargs: options to override, e.g. MapRenderer(projection='mollweide')
+        """
+        from mapplot.config import load_config
+        from mapplot.core import ASTROPY_AVAILABLE
+
+        options = options or RenderOptions()
+        unknown = set(kwargs) - {f.name for f in fields(RenderOptions)}
+        if unknown:
+            raise MapplotError(f"unknown render option(s): {', '.join(sorted(unknown))}")
+        self.options = RenderOptions(**dict(asdict(options), **kwargs))
+
+        self._args = self.options.to_args()
+        validate_options(self._args)
+        if not self._args.earth and not ASTROPY_AVAILABLE:
+            raise MapplotError("Sky mode requires astropy. Install with: pip install astropy")
+
+        self._config = load_config(self._args.config)
+        self._palette = self._args.palette or self._config['colors']['data_palette']
+
+        self.figure = None
+        self.ax = None
+        self._background = None
+        self._layout = None
+        self._colorbar = None
+
+    def render(self, datasets=(), output=None, title=None):
+        """
+        Draw datasets on the map, replacing those of the previous render().
+
+        Parameters:
+        - datasets: list of data files (paths) and/or mappings of arrays with
+          keys coord1/coord2 (or ra/dec, lon/lat, l/b) and optional mjd,
+          size, color and label, in the input frame (input_coord; mjd is
+          needed with solar_relative)
+        - output: image file to save to (optional)
+        - title: title for this render (default: options.title)
+
+        Returns:
+        - the matplotlib Figure
+        """
+        args = self._args
+        if self.figure is None:
+            self._draw_background()
+        else:
+            self._clear_data()
+
+        ingested = [self._ingest(dataset) for dataset in datasets]
+        mappable, cbar_label = self._draw_data(ingested)
+
+        from mapplot.plotting import finish_static_map
+        self._colorbar = finish_static_map(self.figure, self.ax, args, mappable, cbar_label,
+                                           title=title)
+
+        if output is not None:
+            self.figure.savefig(output, dpi=args.dpi, bbox_inches='tight',
+                                facecolor=self.figure.get_facecolor())
+        return self.figure
+
+    def _draw_background(self):
+        from matplotlib.figure import Figure
+
+        from mapplot.plotting import create_map_axes, plot_sky_map, plot_terrestrial_map
+
+        args = self._args
+        self.figure = Figure(figsize=args.figsize, dpi=args.dpi)
+        self.figure.patch.set_facecolor(args.bgcolor)
+        self.ax, _ = create_map_axes(self.figure, args)
+        if args.earth:
+            plot_terrestrial_map(self.ax, args, self._config)
+        else:
+            plot_sky_map(self.ax, args)
+        self._background = set(self.ax.get_children())
+        params = self.figure.subplotpars
+        self._layout = {name: getattr(params, name)
+                        for name in ('left', 'bottom', 'right', 'top', 'wspace', 'hspace')}
+
+    def _clear_data(self):
+        """Remove what the previous render() added on top of the background."""
+        if self._colorbar is not None:
+            self._colorbar.remove()
+            self._colorbar = None
+        for artist in self.ax.get_children():
+            if artist not in self._background:
+                artist.remove()
+        self.ax.set_title('')
+        # Lay out from the same starting point as the first render
+        self.figure.subplots_adjust(**self._layout)
+
+    def _ingest(self, dataset):
+        """One dataset as (mjd, lon, lat, sizes, colors, labels, sketch) in the plot frame."""
+        import numpy as np
+
+        from mapplot.columns import ROLE_ALIASES
+        from mapplot.data_io import color_sketch, input_frame, load_data
+        from mapplot.coordinates import transform_to_plot_frame
+
+        args = self._args
+        if isinstance(dataset, (str, os.PathLike)):
+            filename = os.fspath(dataset)
+            mjd, coord1, coord2, sizes, colors, labels = load_data(
+                filename, ignore_extra=args.ignore_extra, labels_from_file=args.labels_from_file,
+                solar_relative=args.solar_relative, column_map=args.columns, hdu=args.hdu)
+            name = filename
+            input_coord = input_frame(filename, args)
+        else:
+            columns = {}
+            for key, value in dict(dataset).items():
+                role = ROLE_ALIASES.get(str(key).lower())
+                if role is None:
+                    raise MapplotError(f"unknown dataset column {key!r}")
+                columns[role] = value
+            if 'coord1' not in columns or 'coord2' not in columns:
+                raise MapplotError("datasets need coordinate arrays (coord1/coord2, ra/dec or lon/lat)")
+
+            coord1 = np.asarray(columns['coord1'], dtype=float)
+            coord2 = np.asarray(columns['coord2'], dtype=float)
+            mjd, sizes, colors = (None if columns.get(role) is None
+                                  else np.asarray(columns[role], dtype=float)
+                                  for role in ('mjd', 'size', 'color'))
+            labels = columns.get('label')
+            for role, values in [('coord2', coord2), ('mjd', mjd), ('size', sizes),
+                                 ('color', colors), ('label', labels)]:
+                if values is not None and len(values) != len(coord1):
+                    raise MapplotError(f"dataset column {role} has {len(values)} values, "
+                                       f"expected {len(coord1)}")
+            name = 'dataset'
+            input_coord = args.input_coord
+
+        if args.solar_relative and mjd is None:
+            raise MapplotError(f"solar_relative needs MJD values ({name})")
+
+        lon, lat = transform_to_plot_frame(args, mjd, coord1, coord2, input_coord=input_coord)
+        return mjd, lon, lat, sizes, colors, labels, color_sketch(colors, args)
+
+    def _draw_data(self, ingested):
+        """Draw the ingested datasets; returns the colorbar mappable (or None) and its label."""
+        args = self._args
+
+        if args.density:
+            from mapplot.aggregate import DensityGrid
+            from mapplot.plotting import plot_density_grid
+
+            grid = DensityGrid(*args.density_bins, track_values=args.density_stat != 'count')
+            for i, (_, lon, lat, _, colors, _, _) in enumerate(ingested):
+                if grid.track_values and colors is None and len(lon):
+                    raise MapplotError(f"density_stat {args.density_stat!r} needs a color "
+                                       f"(value) column in dataset {i + 1}")
+                grid.add(lon, lat, colors)
+            mesh = plot_density_grid(self.ax, grid, args)
+            if args.density_stat == 'count':
+                return mesh, 'Count'
+            return mesh, f'{args.density_stat.capitalize()} value'
+
+        from matplotlib.colors import Normalize
+
+        from mapplot.data_io import color_limits
+        from mapplot.plotting import dataset_styles, plot_datasets
+
+        colors, labels = dataset_styles(args, len(ingested), self._palette)
+        limits = color_limits([result[-1] for result in ingested], args)
+        norm = Normalize(vmin=limits[0], vmax=limits[1]) if limits else None
+        _, mappable = plot_datasets(self.ax, ingested, args, colors, labels, norm)
+        return mappable, 'Color Value'
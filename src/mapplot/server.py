@@ -0,0 +1,400 @@
+"""Render daemon (mapplot serve) and its client (mapplot --client)."""
+
+import contextlib
+import hmac
+import http.client
+import http.server
+import io
+import json
+import os
+import secrets
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from mapplot import __version__
+from mapplot.config import get_cache_dir
+
+# Environment variable naming the daemon address for --client
+SERVER_ENV = 'MAPPLOT_SERVER'
+
+SOCKET_NAME = 'serve.sock'
+
+
+def default_address():
+    """Daemon address: $MAPPLOT_SERVER, else serve.sock in the cache directory."""
+    return os.environ.get(SERVER_ENV) or os.path.join(get_cache_dir(), SOCKET_NAME)
+
+
+def _is_http(address):
+    return address.startswith('http://')
+
+
+def token_path(port):
+    """File holding the access token of the HTTP daemon on 127.0.0.1:port."""
+    return os.path.join(get_cache_dir(), f'serve-{port}.token')
+
+
+def write_token(port):
+    """
+    Create a new access token for the HTTP daemon on port.
+
+    The token file is readable by its owner only, so only the user running
+    the daemon can send it jobs (a localhost port is open to every user).
+
+    Returns:
+    - the token
+    """
+    token = secrets.token_hex(32)
+    path = token_path(port)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        f.write(token)
+    os.replace(tmp_path, path)
+    return token
+
+
+def read_token(address):
+    """Access token for an http:// daemon address, or None if there is none."""
+    port = address[len('http://'):].rstrip('/').rpartition(':')[2]
+    try:
+        with open(token_path(port)) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Worker side: warm render processes
+# ---------------------------------------------------------------------------
+
+def warm_worker():
+    """
+    Process-pool initializer: import the plotting stack and load the catalogs.
+
+    Everything loaded here stays in the worker for later jobs, together with
+    what the jobs load themselves (cartopy keeps Natural Earth geometries,
+    the BSC5 catalog and epoch matrices are cached per process).
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot  # noqa: F401
+    import cartopy.crs  # noqa: F401
+
+    from mapplot.catalog import get_bright_stars
+    from mapplot.core import ASTROPY_AVAILABLE
+    import mapplot.plotting  # noqa: F401
+    import mapplot.data_io  # noqa: F401
+
+    if ASTROPY_AVAILABLE:
+        import astropy.coordinates  # noqa: F401
+    with contextlib.redirect_stderr(io.StringIO()):
+        get_bright_stars()
+
+
+def _ready():
+    return os.getpid()
+
+
+def render_job(argv, cwd=None):
+    """
+    Run one render with CLI arguments argv, as `mapplot ARGV` would.
+
+    Runs in a pool process. Output printed by the render is captured and
+    returned rather than written to the daemon's terminal.
+
+    Returns:
+    - dict with status (exit code), stdout, stderr and seconds
+    """
+    import matplotlib.pyplot as plt
+
+    from mapplot.cli import parse_args
+    from mapplot.core import run_mapplot
+
+    out, err = io.StringIO(), io.StringIO()
+    status = 0
+    start = time.perf_counter()
+
+    with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+        try:
+            if cwd:
+                os.chdir(cwd)
+            args = parse_args(argv)
+            if not args.output or args.follow:
+                print("Error: server renders need -o FILE and cannot use --follow",
+                      file=sys.stderr)
+                status = 2
+            else:
+                run_mapplot(args)
+        except SystemExit as e:
+            status = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except Exception as e:
+            print(f"\nError: {e}", file=sys.stderr)
+            status = 1
+        finally:
+            plt.close('all')
+
+    return {'status': status, 'stdout': out.getvalue(), 'stderr': err.getvalue(),
+            'seconds': round(time.perf_counter() - start, 3)}
+
+
+# ---------------------------------------------------------------------------
+# Daemon: HTTP over a Unix socket or localhost TCP
+# ---------------------------------------------------------------------------
+
+class RenderHandler(http.server.BaseHTTPRequestHandler):
+    """
+    POST /render runs a job in the pool; GET /status describes the daemon.
+
+    Over TCP every request must carry the daemon's token
+    (Authorization: Bearer TOKEN). The Unix socket is protected by its
+    file permissions instead.
+    """
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        if self.path != '/render':
+            self._send_json(404, {'error': f'unknown path {self.path}'})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            job = json.loads(self.rfile.read(length) or b'{}')
+            argv = [str(arg) for arg in job['argv']]
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json(400, {'error': f'bad job: {e}'})
+            return
+
+        cwd = job.get('cwd') or self.server.cwd
+        result = self.server.pool.submit(render_job, argv, cwd).result()
+        with self.server.lock:
+            self.server.jobs += 1
+        self._send_json(200, result)
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        if self.path != '/status':
+            self._send_json(404, {'error': f'unknown path {self.path}'})
+            return
+        self._send_json(200, {'version': __version__, 'workers': self.server.workers,
+                              'jobs': self.server.jobs, 'pid': os.getpid()})
+
+    def _authorized(self):
+        token = self.server.token
+        if token is None:
+            return True
+        sent = self.headers.get('Authorization', '')
+        if hmac.compare_digest(sent.encode(), f'Bearer {token}'.encode()):
+            return True
+        self._send_json(401, {'error': 'missing or wrong token'})
+        return False
+
+    def _send_json(self, code, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        return 'local'
+
+    def log_message(self, format, *args):
+        print(f"[{self.log_date_time_string()}] {format % args}", file=sys.stderr)
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, ('local', 0)
+
+
+class _TCPHTTPServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+
+def make_server(address, workers=2, handler=RenderHandler):
+    """
+    Create the render daemon with a pool of warmed-up render processes.
+
+    A Unix socket is created readable and writable by its owner only. Over
+    TCP a new token is written to token_path(port), and requests without it
+    are refused.
+
+    Parameters:
+    - address: Unix socket path, or ('127.0.0.1', port) for HTTP over TCP
+    - workers: number of render processes
+
+    Returns:
+    - server with serve_forever(), shutdown() and server_close()
+    """
+    # Start (and warm) the workers before any server thread exists
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=warm_worker)
+    for future in [pool.submit(_ready) for _ in range(workers)]:
+        future.result()
+
+    if isinstance(address, tuple):
+        server = _TCPHTTPServer(address, handler)
+        server.token = write_token(server.server_address[1])
+    else:
+        _remove_stale_socket(address)
+        # No other thread runs yet, so changing the umask affects only the socket
+        umask = os.umask(0o177)
+        try:
+            server = _UnixHTTPServer(address, handler)
+        finally:
+            os.umask(umask)
+        server.token = None
+
+    server.pool = pool
+    server.workers = workers
+    server.jobs = 0
+    server.cwd = os.getcwd()
+    server.lock = threading.Lock()
+    return server
+
+
+def close_server(server):
+    """Stop accepting jobs, shut the pool down and remove the socket or token file."""
+    server.server_close()
+    server.pool.shutdown()
+    if server.socket.family == socket.AF_UNIX:
+        path = server.server_address
+    else:
+        path = token_path(server.server_address[1])
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def _remove_stale_socket(path):
+    """Remove a socket file left by a daemon that is gone; refuse to replace a live one."""
+    if not os.path.exists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        os.remove(path)
+        return
+    finally:
+        probe.close()
+    raise RuntimeError(f"a mapplot server is already listening on {path}")
+
+
+def run_server(args):
+    """Entry point for 'mapplot serve'."""
+    if args.workers < 1:
+        raise ValueError("--workers must be at least 1")
+
+    if args.port is not None:
+        address = ('127.0.0.1', args.port)
+    else:
+        address = args.socket or os.path.join(get_cache_dir(), SOCKET_NAME)
+
+    print(f"Starting {args.workers} render worker(s)...", file=sys.stderr)
+    server = make_server(address, args.workers)
+    if isinstance(address, tuple):
+        where = f"http://127.0.0.1:{server.server_address[1]}"
+    else:
+        where = address
+    print(f"mapplot server listening on {where} (Ctrl-C to stop)", file=sys.stderr)
+    if server.token is not None:
+        print(f"Access token in {token_path(server.server_address[1])}", file=sys.stderr)
+
+    # Stop cleanly (pool shut down, socket removed) on SIGTERM as well as Ctrl-C
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        server.serve_forever()
+    finally:
+        close_server(server)
+
+
+# ---------------------------------------------------------------------------
+# Client
+# ---------------------------------------------------------------------------
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection to a Unix socket."""
+
+    def __init__(self, path, timeout=None):
+        super().__init__('localhost', timeout=timeout)
+        self._path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self._path)
+
+
+def _connection(address):
+    if _is_http(address):
+        host = address[len('http://'):].rstrip('/')
+        return http.client.HTTPConnection(host)
+    return _UnixHTTPConnection(address)
+
+
+def send_job(argv, address=None, cwd=None):
+    """
+    Send a render job to the daemon and wait for the result.
+
+    An http:// daemon is sent the token it wrote to the cache directory.
+
+    Returns:
+    - render_job result dict, or None when no daemon answers at address
+    """
+    address = address or default_address()
+    body = json.dumps({'argv': list(argv), 'cwd': cwd or os.getcwd()})
+    headers = {'Content-Type': 'application/json'}
+    if _is_http(address):
+        token = read_token(address)
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+    connection = _connection(address)
+    try:
+        connection.request('POST', '/render', body=body, headers=headers)
+        response = connection.getresponse()
+        payload = json.loads(response.read())
+    except (OSError, http.client.HTTPException):
+        return None
+    finally:
+        connection.close()
+
+    if response.status != 200:
+        raise RuntimeError(f"mapplot server error: {payload.get('error', response.status)}")
+    return payload
+
+
+def run_client(argv, args):
+    """
+    Forward a render to the daemon (--client).
+
+    Returns:
+    - exit status of the remote render, or None to render locally (no -o,
+      --follow, or no daemon reachable)
+    """
+    if not args.output or args.follow:
+        return None
+
+    address = args.server or default_address()
+    try:
+        result = send_job(argv, address)
+    except RuntimeError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    if result is None:
+        print(f"Note: no mapplot server at {address}; rendering locally", file=sys.stderr)
+        return None
+
+    sys.stdout.write(result['stdout'])
+    sys.stderr.write(result['stderr'])
+    return result['status']
@@ -0,0 +1,130 @@
+"""Mergeable quantile sketch (KLL) for color normalization of streamed data."""
+
+import numpy as np
+
+# Default compactor size; rank error is roughly 1.7 / k
+DEFAULT_SKETCH_K = 200
+
+
+class QuantileSketch:
+    """
+    KLL quantile sketch with exact minimum and maximum.
+
+    Values are kept in levels of compactors; an item at level h stands for
+    2**h input values. When a level outgrows its capacity it is sorted and
+    every other item (alternating offset) is promoted to the next level, so
+    memory stays O(k log n). Sketches built on separate chunks or in
+    separate processes merge into one sketch of the combined data.
+    """
+
+    def __init__(self, k=DEFAULT_SKETCH_K):
+        self.k = int(k)
+        self.levels = [np.empty(0)]
+        self.n = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self._offset = 0
+
+    @classmethod
+    def from_values(cls, values, k=DEFAULT_SKETCH_K):
+        sketch = cls(k)
+        sketch.update(values)
+        return sketch
+
+    def _capacity(self, level):
+        depth = len(self.levels)
+        return max(2, int(np.ceil(self.k * (2.0 / 3.0) ** (depth - level - 1))))
+
+    def update(self, values):
+        """Add a batch of values (non-finite values are ignored)."""
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[np.isfinite(values)]
+        if len(values) == 0:
+            return
+        self.n += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other):
+        """Fold another sketch into this one."""
+        if other is None or other.n == 0:
+            return self
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # Keep one item back when the count is odd, so weights stay exact
+                keep = items[-1:] if len(items) % 2 else items[:0]
+                pairs = items[:len(items) - len(keep)]
+                promoted = pairs[self._offset::2]
+                self._offset ^= 1
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                # Capacities depend on the depth, so recheck from the bottom
+                level = 0
+                continue
+            level += 1
+
+    def quantiles(self, qs):
+        """
+        Approximate quantiles for fractions qs in [0, 1].
+
+        0 and 1 return the exact minimum and maximum.
+        """
+        qs = np.atleast_1d(np.asarray(qs, dtype=float))
+        if self.n == 0:
+            return np.full(len(qs), np.nan)
+
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items_h), 2.0 ** h)
+                                  for h, items_h in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        items, cumulative = items[order], np.cumsum(weights[order])
+
+        index = np.searchsorted(cumulative, qs * cumulative[-1], side='left')
+        result = items[np.minimum(index, len(items) - 1)]
+        result = np.where(qs <= 0, self.min, result)
+        return np.where(qs >= 1, self.max, result)
+
+
+def merge_sketches(sketches):
+    """Merge an iterable of sketches (None entries skipped); None if all are empty."""
+    merged = None
+    for sketch in sketches:
+        if sketch is None or sketch.n == 0:
+            continue
+        merged = QuantileSketch(sketch.k).merge(sketch) if merged is None else merged.merge(sketch)
+    return merged
+
+
+def normalization_limits(sketch, percentiles=None):
+    """
+    Color normalization limits from a sketch.
+
+    Parameters:
+    - sketch: QuantileSketch of the color values
+    - percentiles: (low, high) percentiles, or None for the exact min and max
+
+    Returns:
+    - vmin, vmax
+    """
+    if percentiles is None:
+        return sketch.min, sketch.max
+    low, high = sketch.quantiles([percentiles[0] / 100.0, percentiles[1] / 100.0])
+    return float(low), float(high)
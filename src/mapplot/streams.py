@@ -0,0 +1,121 @@
+"""Transparent decompression of text inputs (gzip, bz2, xz, optional zstd)."""
+
+import bz2
+import gzip
+import io
+import lzma
+import os
+import stat
+import sys
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# Leading bytes of each compressed format
+COMPRESSION_MAGIC = {
+    b'\x1f\x8b': 'gzip',
+    b'BZh': 'bz2',
+    b'\xfd7zXZ\x00': 'xz',
+    b'\x28\xb5\x2f\xfd': 'zstd',
+}
+
+COMPRESSION_EXTENSIONS = {
+    '.gz': 'gzip',
+    '.bz2': 'bz2',
+    '.xz': 'xz',
+    '.zst': 'zstd',
+}
+
+# Input name for standard input
+STDIN = '-'
+
+# Decompressed bytes buffered per read
+_BUFFER_BYTES = 1024 * 1024
+
+
+def detect_compression(filename):
+    """
+    Compression format of a file, from its magic bytes or extension.
+
+    Returns:
+    - 'gzip', 'bz2', 'xz', 'zstd', or None for uncompressed files
+    """
+    if not isinstance(filename, str) or not os.path.isfile(filename):
+        return None
+    with open(filename, 'rb') as f:
+        head = f.read(6)
+    for magic, name in COMPRESSION_MAGIC.items():
+        if head.startswith(magic):
+            return name
+    return COMPRESSION_EXTENSIONS.get(os.path.splitext(filename)[1].lower())
+
+
+def is_stream(filename):
+    """True for '-' (stdin) and named pipes, which can only be read once, front to back."""
+    if filename == STDIN:
+        return True
+    try:
+        return stat.S_ISFIFO(os.stat(filename).st_mode)
+    except (OSError, TypeError, ValueError):
+        return False
+
+
+def strip_compression_suffix(filename):
+    """File name without a trailing compression extension ('a.csv.gz' -> 'a.csv')."""
+    root, ext = os.path.splitext(filename)
+    return root if ext.lower() in COMPRESSION_EXTENSIONS else filename
+
+
+def open_text(filename):
+    """
+    Open a possibly compressed file for reading as text.
+
+    Compressed files are decompressed as they are read, so the whole
+    decompressed text is never held in memory. '-' opens standard input
+    (left open when the returned file is closed).
+    """
+    if filename == STDIN:
+        return open(sys.stdin.fileno(), 'r', closefd=False)
+
+    compression = detect_compression(filename)
+
+    if compression is None:
+        return open(filename, 'r')
+    if compression == 'gzip':
+        return gzip.open(filename, 'rt')
+    if compression == 'bz2':
+        return bz2.open(filename, 'rt')
+    if compression == 'xz':
+        return lzma.open(filename, 'rt')
+
+    if not ZSTD_AVAILABLE:
+        raise ValueError(f"{filename} is zstd-compressed; install zstandard "
+                         "(pip install zstandard) to read it")
+    raw = zstandard.ZstdDecompressor().stream_reader(open(filename, 'rb'), closefd=True)
+    return io.TextIOWrapper(io.BufferedReader(raw, buffer_size=_BUFFER_BYTES))
+
+
+def open_text_output(filename):
+    """
+    Open a file for writing text, compressed according to its extension
+    (.gz, .bz2, .xz, .zst; anything else is written uncompressed).
+    """
+    compression = COMPRESSION_EXTENSIONS.get(os.path.splitext(filename)[1].lower())
+
+    if compression is None:
+        return open(filename, 'w')
+    if compression == 'gzip':
+        # Level 6 is twice as fast as the default 9 on numeric text, and as small
+        return gzip.open(filename, 'wt', compresslevel=6)
+    if compression == 'bz2':
+        return bz2.open(filename, 'wt')
+    if compression == 'xz':
+        return lzma.open(filename, 'wt')
+
+    if not ZSTD_AVAILABLE:
+        raise ValueError(f"Writing {filename} needs zstandard (pip install zstandard)")
+    raw = zstandard.ZstdCompressor().stream_writer(open(filename, 'wb'), closefd=True)
+    return io.TextIOWrapper(raw)
@@ -0,0 +1,308 @@
+"""Synthetic survey data for load testing ('mapplot synth')."""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+from mapplot.columnar import EXTENSION as COLUMNAR_EXTENSION, write_columnar
+from mapplot.fitstable import FITS_EXTENSIONS
+from mapplot.streams import open_text_output, strip_compression_suffix
+
+KINDS = ['tracks', 'sky', 'labeled', 'earth', 'obsdates']
+
+# Rows generated (and formatted) at a time; each block draws from its own
+# random stream, so a file does not depend on how it is written
+BLOCK_ROWS = 100000
+
+# Detections of one tracklet are this many days apart (about 30 minutes)
+TRACKLET_SPACING = 0.02
+
+# Spread of the sky distribution around opposition and the ecliptic (degrees)
+OPPOSITION_SIGMA = 35.0
+ECLIPTIC_SIGMA = 12.0
+
+# Decimals kept of each numeric column, in every format, so that text and
+# binary files hold the same values
+DECIMALS = {
+    'mjd': 6,
+    'coord1': 5,
+    'coord2': 5,
+    'size': 2,
+    'color': 2,
+    'start': 0,
+    'end': 0,
+}
+
+# FITS column names, as recognised by DEFAULT_COLUMN_NAMES
+FITS_NAMES = {'mjd': 'MJD', 'coord1': 'RA', 'coord2': 'DEC', 'size': 'SIZE',
+              'color': 'COLOR', 'label': 'LABEL'}
+
+
+def _block_rng(seed, block):
+    return np.random.default_rng([seed, block])
+
+
+def _blocks(n_rows):
+    """(block index, first row, row count) of each block of n_rows rows."""
+    for block, first in enumerate(range(0, n_rows, BLOCK_ROWS)):
+        yield block, first, min(BLOCK_ROWS, n_rows - first)
+
+
+def generate_tracks(n_rows, seed=0, start_mjd=60000.0, days=365.0, per_object=4):
+    """
+    Survey detections, concentrated toward opposition and the ecliptic.
+
+    Each object is seen per_object times, TRACKLET_SPACING days apart,
+    moving up to a degree or so per day. Rows come out sorted by MJD.
+
+    Parameters:
+    - n_rows: number of detections
+    - seed: random seed; the same arguments always give the same rows
+    - start_mjd, days: time span of the survey
+    - per_object: detections per object
+
+    Yields:
+    - dicts of mjd, coord1 (RA), coord2 (Dec), size, color (V magnitude) and
+      label (object designation) arrays, one per block of rows
+    """
+    from mapplot.coordinates import get_sun_position_fast, transform_coordinates_matrix
+
+    for block, first, count in _blocks(n_rows):
+        rng = _block_rng(seed, block)
+        # Each block covers its share of the time span, so blocks are in MJD order
+        t0 = start_mjd + days * first / n_rows
+        t1 = start_mjd + days * (first + count) / n_rows
+        arc = (per_object - 1) * TRACKLET_SPACING
+
+        n_objects = -(-count // per_object)
+        discovered = rng.uniform(t0, max(t0, t1 - arc), n_objects)
+        sun_lon, _ = get_sun_position_fast(discovered)
+        lon = sun_lon + 180.0 + rng.normal(0.0, OPPOSITION_SIGMA, n_objects)
+        lat = np.clip(rng.normal(0.0, ECLIPTIC_SIGMA, n_objects), -89.0, 89.0)
+        rate = rng.normal(0.0, 0.3, (n_objects, 2))
+        # Many faint objects, few bright ones
+        magnitude = np.clip(23.5 - rng.exponential(1.5, n_objects), 15.0, 23.5)
+
+        obj = np.arange(count) // per_object
+        dt = (np.arange(count) % per_object) * TRACKLET_SPACING
+        mjd = discovered[obj] + dt
+        ra, dec = transform_coordinates_matrix((lon[obj] + rate[obj, 0] * dt) % 360.0,
+                                               np.clip(lat[obj] + rate[obj, 1] * dt, -90.0, 90.0),
+                                               'ecliptic', 'equatorial')
+        ids = block * -(-BLOCK_ROWS // per_object) + obj
+        order = np.argsort(mjd, kind='stable')
+        yield {
+            'mjd': mjd[order],
+            'coord1': ra[order],
+            'coord2': dec[order],
+            'size': np.clip(60.0 * 10 ** (-0.2 * (magnitude[obj] - 18.0)), 2.0, 60.0)[order],
+            'color': magnitude[obj][order],
+            'label': np.char.add('S', np.char.zfill(ids.astype(str), 7))[order],
+        }
+
+
+def generate_earth(n_rows, seed=0, clusters=200):
+    """
+    Points on the Earth: most in clusters of varied size (cities, stations),
+    the rest spread evenly over the globe.
+
+    Yields:
+    - dicts of coord1 (longitude), coord2 (latitude), size and color
+      (a temperature-like value falling with latitude) arrays
+    """
+    rng = np.random.default_rng([seed])
+    center_lon = rng.uniform(-180.0, 180.0, clusters)
+    center_lat = np.degrees(np.arcsin(rng.uniform(-0.87, 0.87, clusters)))
+    spread = rng.uniform(0.2, 3.0, clusters)
+    weight = rng.pareto(1.2, clusters) + 1.0
+    weight /= weight.sum()
+
+    for block, first, count in _blocks(n_rows):
+        rng = _block_rng(seed, block)
+        member = rng.choice(clusters, count, p=weight)
+        lon = center_lon[member] + rng.normal(0.0, 1.0, count) * spread[member]
+        lat = center_lat[member] + rng.normal(0.0, 1.0, count) * spread[member]
+
+        scattered = rng.random(count) < 0.2
+        n_scattered = int(scattered.sum())
+        lon[scattered] = rng.uniform(-180.0, 180.0, n_scattered)
+        lat[scattered] = np.degrees(np.arcsin(rng.uniform(-1.0, 1.0, n_scattered)))
+
+        lon = (lon + 180.0) % 360.0 - 180.0
+        lat = np.clip(lat, -90.0, 90.0)
+        yield {
+            'coord1': lon,
+            'coord2': lat,
+            'size': np.clip(rng.lognormal(1.0, 0.8, count), 1.0, 50.0),
+            'color': 28.0 - 0.45 * np.abs(lat) + rng.normal(0.0, 3.0, count),
+        }
+
+
+def generate_obsdates(n_rows, seed=0, obs_file='mpc_observatories.txt'):
+    """
+    Operational date ranges for MPC observatory codes (the --obs-dates-file
+    format). Codes repeat when n_rows exceeds the number of observatories.
+
+    Yields:
+    - dicts of code, start and end (-1: still operating) arrays
+    """
+    from mapplot.observatories import load_observatory_table
+
+    codes = load_observatory_table(obs_file).codes
+    if not len(codes):
+        codes = np.array(['500'])
+    for block, first, count in _blocks(n_rows):
+        rng = _block_rng(seed, block)
+        start = np.round(rng.uniform(33000.0, 60500.0, count))
+        end = np.minimum(start + np.round(rng.uniform(1000.0, 20000.0, count)), 60900.0)
+        yield {
+            'code': codes[(first + np.arange(count)) % len(codes)],
+            'start': start,
+            'end': np.where(rng.random(count) < 0.6, -1.0, end),
+        }
+
+
+def kind_columns(kind, extra=False):
+    """
+    The columns written for a kind, in file order.
+
+    Parameters:
+    - kind: one of KINDS
+    - extra: also write size and color (tracks, sky and earth)
+    """
+    if kind == 'obsdates':
+        return ['code', 'start', 'end']
+    if kind == 'labeled':
+        return ['coord1', 'coord2', 'label']
+    columns = ['mjd', 'coord1', 'coord2'] if kind == 'tracks' else ['coord1', 'coord2']
+    return columns + (['size', 'color'] if extra else [])
+
+
+def _header(kind, columns, n_rows, seed):
+    names = {'mjd': 'MJD', 'coord1': 'Lon' if kind == 'earth' else 'RA',
+             'coord2': 'Lat' if kind == 'earth' else 'Dec', 'size': 'Size', 'color': 'Color',
+             'label': 'Label', 'code': 'Code', 'start': 'StartMJD', 'end': 'EndMJD'}
+    return (f"# Synthetic {kind} data: {n_rows} rows, seed {seed} (mapplot synth)\n"
+            f"# Format: {' '.join(names[column] for column in columns)}\n")
+
+
+def write_text(f, blocks, columns):
+    """
+    Write blocks of columns as whitespace-separated text.
+
+    Each block is formatted with one %-operation on a repeated row format,
+    several times faster than np.savetxt.
+
+    Returns:
+    - number of rows written
+    """
+    row = ' '.join(f'%.{DECIMALS[column]}f' if column in DECIMALS else '%s'
+                   for column in columns) + '\n'
+    n_rows = 0
+    for block in blocks:
+        count = len(block[columns[0]])
+        values = np.empty((count, len(columns)), dtype=object)
+        for i, column in enumerate(columns):
+            values[:, i] = block[column]
+        f.write(row * count % tuple(values.ravel().tolist()))
+        n_rows += count
+    return n_rows
+
+
+def _rounded(blocks, columns):
+    for block in blocks:
+        yield {column: np.round(block[column], DECIMALS[column]) if column in DECIMALS
+               else block[column] for column in columns}
+
+
+def _concatenate(blocks, columns):
+    blocks = list(blocks)
+    return {column: np.concatenate([block[column] for block in blocks]) for column in columns}
+
+
+def output_format(filename):
+    """'columnar', 'fits' or 'text' (possibly compressed), from the file name."""
+    if strip_compression_suffix(filename) != filename:
+        return 'text'
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == COLUMNAR_EXTENSION:
+        return 'columnar'
+    if extension in FITS_EXTENSIONS:
+        return 'fits'
+    return 'text'
+
+
+def synthesize(kind, n_rows, output, seed=0, extra=False, start_mjd=60000.0, days=365.0,
+               per_object=4):
+    """
+    Generate a synthetic dataset and write it to output.
+
+    The format follows the file name: .mapc (columnar), .fits, or text,
+    compressed for .gz, .bz2, .xz and .zst. obsdates are text only.
+
+    Parameters:
+    - kind: 'tracks' (MJD RA Dec), 'sky' (RA Dec), 'labeled' (RA Dec label),
+      'earth' (lon lat) or 'obsdates' (code start end)
+    - n_rows: number of rows
+    - output: file to write
+    - seed: random seed; the same arguments give the same data in every format
+    - extra: add size and color columns (tracks, sky and earth)
+    - start_mjd, days: survey time span (tracks, sky, labeled)
+    - per_object: detections per object (tracks, sky, labeled)
+
+    Returns:
+    - number of rows written
+    """
+    if kind not in KINDS:
+        raise ValueError(f"Unknown kind: {kind} (choose from {', '.join(KINDS)})")
+    if n_rows < 1:
+        raise ValueError("The row count must be positive")
+    if per_object < 1:
+        raise ValueError("--per-object must be positive")
+
+    columns = kind_columns(kind, extra)
+    if kind == 'earth':
+        blocks = generate_earth(n_rows, seed)
+    elif kind == 'obsdates':
+        blocks = generate_obsdates(n_rows, seed)
+    else:
+        blocks = generate_tracks(n_rows, seed, start_mjd, days, per_object)
+    blocks = _rounded(blocks, columns)
+
+    file_format = output_format(output)
+    if kind == 'obsdates' and file_format != 'text':
+        raise ValueError("Observatory dates can only be written as text")
+
+    if file_format == 'columnar':
+        write_columnar(output, _concatenate(blocks, columns),
+                       frame='earth' if kind == 'earth' else 'equatorial')
+    elif file_format == 'fits':
+        from astropy.table import Table
+
+        data = _concatenate(blocks, columns)
+        names = dict(FITS_NAMES, coord1='LON', coord2='LAT') if kind == 'earth' else FITS_NAMES
+        Table([data[column] for column in columns],
+              names=[names[column] for column in columns]).write(output, overwrite=True)
+    else:
+        # Write under a temporary name (keeping the compression extension) so
+        # that an interrupted run leaves no partial file
+        compression = output[len(strip_compression_suffix(output)):]
+        tmp_path = f'{output}.{os.getpid()}.tmp{compression}'
+        with open_text_output(tmp_path) as f:
+            f.write(_header(kind, columns, n_rows, seed))
+            write_text(f, blocks, columns)
+        os.replace(tmp_path, output)
+    return n_rows
+
+
+def run_synth(args):
+    """Generate a synthetic dataset ('mapplot synth')."""
+    start = time.perf_counter()
+    n_rows = synthesize(args.kind, args.rows, args.output, seed=args.seed, extra=args.extra,
+                        start_mjd=args.start_mjd, days=args.days, per_object=args.per_object)
+    elapsed = time.perf_counter() - start
+    size = os.path.getsize(args.output)
+    print(f"Wrote {n_rows:,} {args.kind} rows to {args.output} "
+          f"({size / 2**20:,.1f} MB in {elapsed:.1f} s)", file=sys.stderr)
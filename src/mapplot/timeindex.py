@@ -0,0 +1,153 @@
+"""Sidecar MJD index for reading time windows from sorted text files."""
+
+import os
+import sys
+
+import numpy as np
+
+# Sidecar index file suffix (appended to the data file name)
+INDEX_SUFFIX = '.mjdidx.npz'
+
+# Data rows per index block
+DEFAULT_BLOCK_ROWS = 4096
+
+# Bytes scanned at a time when locating line starts
+_SCAN_BYTES = 64 * 1024 * 1024
+
+
+def index_path(filename):
+    """Path of the sidecar index for a data file."""
+    return filename + INDEX_SUFFIX
+
+
+def _data_line_starts(filename):
+    """
+    Byte offsets of every data line (not blank, not a # comment) in a file.
+
+    Scans the file with numpy in fixed-size blocks, so memory stays bounded.
+    """
+    size = os.path.getsize(filename)
+    if size == 0:
+        return np.empty(0, dtype=np.int64)
+
+    buf = np.memmap(filename, dtype=np.uint8, mode='r')
+    newlines = [np.flatnonzero(buf[start:start + _SCAN_BYTES] == ord('\n')) + start
+                for start in range(0, size, _SCAN_BYTES)]
+    starts = np.concatenate([[0]] + [nl + 1 for nl in newlines]).astype(np.int64)
+    starts = starts[starts < size]
+
+    first = buf[starts]
+    is_data = ~np.isin(first, np.frombuffer(b'#\n\r', dtype=np.uint8))
+
+    # Lines with leading whitespace need a closer look
+    for i in np.flatnonzero(np.isin(first, np.frombuffer(b' \t', dtype=np.uint8))):
+        end = starts[i + 1] if i + 1 < len(starts) else size
+        text = bytes(buf[starts[i]:end]).strip()
+        is_data[i] = bool(text) and not text.startswith(b'#')
+
+    return starts[is_data]
+
+
+def build_time_index(filename, block_rows=DEFAULT_BLOCK_ROWS):
+    """
+    Build a time index for a text file whose first column is MJD.
+
+    Returns a dict with the MJD and byte offset of the first row of every
+    block of block_rows data rows, or None if the file is not sorted by MJD.
+    """
+    mjd = np.atleast_1d(np.loadtxt(filename, comments='#', usecols=0))
+    if len(mjd) > 1 and not np.all(mjd[1:] >= mjd[:-1]):
+        return None
+
+    starts = _data_line_starts(filename)
+    if len(starts) != len(mjd):
+        return None
+
+    stat = os.stat(filename)
+    return {
+        'mjd': mjd[::block_rows],
+        'offsets': starts[::block_rows],
+        'n_rows': np.int64(len(mjd)),
+        'size': np.int64(stat.st_size),
+        'mtime_ns': np.int64(stat.st_mtime_ns),
+    }
+
+
+def load_time_index(filename, build=True):
+    """
+    Load the sidecar index for filename, building and saving it if needed.
+
+    An index is rebuilt when the data file's size or modification time has
+    changed. Returns None if the file cannot be indexed (not sorted by MJD).
+    """
+    path = index_path(filename)
+    stat = os.stat(filename)
+
+    if os.path.exists(path):
+        try:
+            with np.load(path) as cached:
+                index = {key: cached[key] for key in cached.files}
+            if index['size'] == stat.st_size and index['mtime_ns'] == stat.st_mtime_ns:
+                return index
+        except (OSError, KeyError, ValueError):
+            pass
+
+    if not build:
+        return None
+
+    print(f"Building time index for {filename}...", file=sys.stderr)
+    index = build_time_index(filename)
+    if index is None:
+        print(f"Warning: {filename} is not sorted by MJD; reading the whole file",
+              file=sys.stderr)
+        return None
+
+    try:
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **index)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Warning: Could not save time index {path}: {e}", file=sys.stderr)
+
+    return index
+
+
+def read_time_window(filename, mjd_min=None, mjd_max=None):
+    """
+    Read only the lines of a time-sorted file that can fall inside a window.
+
+    Parameters:
+    - filename: text file with MJD as first column, sorted by MJD
+    - mjd_min, mjd_max: window bounds (None = open-ended)
+
+    Returns:
+    - list of text lines covering the window (whole index blocks, so the
+      caller still trims exactly), or None if the file cannot be indexed
+    """
+    index = load_time_index(filename)
+    if index is None:
+        return None
+
+    block_mjd = index['mjd']
+    offsets = index['offsets']
+
+    if mjd_min is None or len(block_mjd) == 0:
+        first_block = 0
+    else:
+        # Start one block early: rows equal to mjd_min may begin in the previous block
+        first_block = max(0, int(np.searchsorted(block_mjd, mjd_min, side='left')) - 1)
+
+    if mjd_max is None:
+        end_offset = int(index['size'])
+    else:
+        end_block = int(np.searchsorted(block_mjd, mjd_max, side='right'))
+        end_offset = int(offsets[end_block]) if end_block < len(offsets) else int(index['size'])
+
+    start_offset = int(offsets[first_block]) if len(offsets) else 0
+
+    with open(filename, 'rb') as f:
+        f.seek(start_offset)
+        text = f.read(max(0, end_offset - start_offset)).decode('utf-8')
+
+    return text.splitlines()
@@ -0,0 +1,169 @@
+"""Tests for streamed input and density aggregation."""
+
+import os
+import subprocess
+import sys
+import threading
+
+import numpy as np
+import pytest
+
+from mapplot import parallel
+from mapplot.aggregate import DensityGrid, build_density_grid
+from mapplot.cli import parse_args
+from mapplot.data_io import concatenate_chunks, iter_data_chunks, read_data
+from mapplot.streams import is_stream
+
+
+@pytest.fixture
+def points_file(tmp_path):
+    rng = np.random.default_rng(1)
+    rows = np.column_stack([rng.uniform(0, 360, 2500), rng.uniform(-90, 90, 2500)])
+    f = tmp_path / "points.txt"
+    np.savetxt(f, rows, header='ra dec')
+    return str(f), rows
+
+
+class TestChunkedReading:
+    def test_chunks_match_read_data(self, points_file):
+        filename, rows = points_file
+        chunks = list(iter_data_chunks(filename, chunk_rows=1000))
+        assert len(chunks) == 3
+        assert max(len(chunk[1]) for chunk in chunks) <= 1000
+        _, coord1, coord2, _, _, _ = concatenate_chunks(chunks)
+        expected = read_data(filename)
+        np.testing.assert_array_equal(coord1, expected[1])
+        np.testing.assert_array_equal(coord2, expected[2])
+
+    def test_csv_header_chunks(self, tmp_path):
+        f = tmp_path / "objs.csv"
+        f.write_text("name,ra,dec\n" + "".join(f"o{i},{i}.0,{i / 10}\n" for i in range(5)))
+        chunks = list(iter_data_chunks(str(f), chunk_rows=2, labels_from_file=True))
+        _, coord1, _, _, _, labels = concatenate_chunks(chunks)
+        np.testing.assert_array_equal(coord1, [0.0, 1.0, 2.0, 3.0, 4.0])
+        assert list(labels) == ['o0', 'o1', 'o2', 'o3', 'o4']
+
+    @pytest.mark.skipif(not hasattr(os, 'mkfifo'), reason='needs named pipes')
+    def test_named_pipe(self, tmp_path):
+        fifo = str(tmp_path / "pipe")
+        os.mkfifo(fifo)
+        assert is_stream(fifo)
+
+        def writer():
+            with open(fifo, 'w') as f:
+                f.write("# MJD RA Dec\n60000.0 10.0 20.0\n60001.0 11.0 21.0\n")
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        mjd, coord1, _, _, _, _ = read_data(fifo, read_mjd=True)
+        thread.join()
+        np.testing.assert_array_equal(mjd, [60000.0, 60001.0])
+        np.testing.assert_array_equal(coord1, [10.0, 11.0])
+
+    def test_stdin(self):
+        code = ("from mapplot.data_io import read_data; "
+                "print(read_data('-', read_mjd=True)[1].tolist())")
+        result = subprocess.run([sys.executable, '-c', code], input="60000 1.5 2\n60001 2.5 3\n",
+                                capture_output=True, text=True, check=True)
+        assert result.stdout.strip() == '[1.5, 2.5]'
+
+
+class TestDensityGrid:
+    def test_matches_histogram(self, points_file):
+        _, rows = points_file
+        grid = DensityGrid(36, 18, lon_min=0.0)
+        grid.add(rows[:1000, 0], rows[:1000, 1])
+        grid.add(rows[1000:, 0], rows[1000:, 1])
+
+        expected, _, _ = np.histogram2d(rows[:, 1], rows[:, 0], bins=[grid.lat_edges, grid.lon_edges])
+        np.testing.assert_array_equal(grid.counts, expected)
+        assert grid.n_rows == 2500
+
+    def test_longitude_wraps(self):
+        grid = DensityGrid(4, 2)
+        grid.add([-180.0, 180.0, 359.0, -1.0], [0.0, 0.0, 0.0, 0.0])
+        assert grid.counts[1, 0] == 2  # -180 and 180
+        assert grid.counts[1, 1] == 2  # 359 and -1
+
+    def test_merge(self):
+        a, b = DensityGrid(8, 4), DensityGrid(8, 4)
+        a.add([10.0], [10.0])
+        b.add([10.0, 100.0], [10.0, -10.0])
+        a.merge(b)
+        assert a.counts.sum() == 3 and a.n_rows == 3
+        with pytest.raises(ValueError):
+            a.merge(DensityGrid(4, 4))
+
+    def test_build_from_files(self, points_file):
+        filename, rows = points_file
+        sys.argv = ['mapplot', '--density', '--density-bins', '36', '18', filename]
+        grid = build_density_grid(parse_args(), chunk_rows=700)
+        assert grid.n_rows == len(rows)
+        assert grid.counts.sum() == len(rows)
+
+    def test_chunks_share_one_worker_pool(self, points_file, monkeypatch):
+        filename, rows = points_file
+        pools = []
+
+        class CountingPool(parallel.ProcessPoolExecutor):
+            def __init__(self, *args, **kwargs):
+                pools.append(self)
+                super().__init__(*args, **kwargs)
+
+        monkeypatch.setattr(parallel, 'ProcessPoolExecutor', CountingPool)
+        argv = ['--density', '--density-bins', '36', '18', '--plot-coord', 'galactic',
+                '--transform-engine', 'matrix', '--chunk-size', '300', filename]
+        sys.argv = ['mapplot'] + argv
+        serial = build_density_grid(parse_args(), chunk_rows=700)
+        assert pools == []
+
+        sys.argv = ['mapplot', '--workers', '2'] + argv
+        grid = build_density_grid(parse_args(), chunk_rows=700)
+        assert len(pools) == 1
+        np.testing.assert_array_equal(grid.counts, serial.counts)
+
+
+class TestDensityStatistics:
+    def test_mean_min_max(self):
+        grid = DensityGrid(4, 2, track_values=True)
+        grid.add([10.0, 20.0], [10.0, 20.0], [1.0, 5.0])
+        grid.add([30.0, -100.0], [30.0, -30.0], [3.0, np.nan])
+
+        cell = grid.cell_index([10.0], [10.0])[0]
+        assert grid.statistic('mean').ravel()[cell] == 3.0
+        assert grid.statistic('min').ravel()[cell] == 1.0
+        assert grid.statistic('max').ravel()[cell] == 5.0
+
+        # A NaN value is counted but has no statistics
+        nan_cell = grid.cell_index([-100.0], [-30.0])[0]
+        assert grid.counts.ravel()[nan_cell] == 1
+        assert grid.statistic('mean').mask.ravel()[nan_cell]
+
+    def test_chunked_equals_single_pass(self):
+        rng = np.random.default_rng(2)
+        lon, lat, values = rng.uniform(0, 360, 5000), rng.uniform(-90, 90, 5000), rng.normal(size=5000)
+        whole = DensityGrid(20, 10, track_values=True)
+        whole.add(lon, lat, values)
+        parts = [DensityGrid(20, 10, track_values=True) for _ in range(3)]
+        for part, rows in zip(parts, np.array_split(np.arange(5000), 3)):
+            part.add(lon[rows], lat[rows], values[rows])
+        parts[0].merge(parts[1])
+        parts[0].merge(parts[2])
+        for stat in ['count', 'mean', 'min', 'max']:
+            np.testing.assert_allclose(parts[0].statistic(stat).filled(0),
+                                       whole.statistic(stat).filled(0))
+
+    def test_count_grid_has_no_values(self):
+        with pytest.raises(ValueError):
+            DensityGrid(4, 2).statistic('mean')
+
+    def test_build_mean_from_value_column(self, tmp_path, capsys):
+        f = tmp_path / "mags.txt"
+        f.write_text("# ra dec H\n10.0 10.0 18.0\n10.5 10.5 20.0\n200.0 -40.0 15.0\n")
+        sys.argv = ['mapplot', '--density', '--density-stat', 'mean', '--density-bins', '36', '18',
+                    '--columns', 'ra=ra,dec=dec,color=H', '--chunk-rows', '2', str(f)]
+        grid = build_density_grid(parse_args())
+        mean = grid.statistic('mean')
+        assert mean.count() == 2
+        assert sorted(mean.compressed()) == [15.0, 19.0]
+        assert '3 rows processed' in capsys.readouterr().err
@@ -0,0 +1,113 @@
+"""Tests for batch manifest rendering (mapplot batch)."""
+
+import json
+import os
+
+import pytest
+
+from mapplot.batch import load_manifest, options_to_argv, run_batch, split_groups
+from mapplot.cli import parse_batch_args
+
+
+class TestManifest:
+    def test_options_to_argv(self):
+        argv = options_to_argv({'files': ['a.txt', 'b.txt'], 'o': 'map.png', 'ecliptic': True,
+                                'legend': False, 'title': None, 'grid_spacing': [30, 15]})
+        assert argv == ['a.txt', 'b.txt', '-o', 'map.png', '--ecliptic',
+                        '--grid-spacing', '30', '15']
+
+    def test_yaml_defaults_and_job_forms(self, tmp_path):
+        path = tmp_path / 'jobs.yaml'
+        path.write_text(
+            "defaults: {projection: mollweide}\n"
+            "jobs:\n"
+            "  - {name: first, files: data.txt, output: a.png}\n"
+            "  - {name: second, args: 'data.txt -o b.png --ecliptic'}\n"
+            "  - [data.txt, -o, c.png]\n")
+        jobs = load_manifest(str(path))
+        assert jobs == [
+            ('first', ['--projection', 'mollweide', 'data.txt', '--output', 'a.png']),
+            ('second', ['--projection', 'mollweide', 'data.txt', '-o', 'b.png', '--ecliptic']),
+            ('job3', ['--projection', 'mollweide', 'data.txt', '-o', 'c.png']),
+        ]
+
+    def test_json_manifest(self, tmp_path):
+        path = tmp_path / 'jobs.json'
+        path.write_text(json.dumps({'jobs': ['data.txt -o a.png']}))
+        assert load_manifest(str(path)) == [('job1', ['data.txt', '-o', 'a.png'])]
+
+    def test_missing_jobs_list(self, tmp_path):
+        path = tmp_path / 'jobs.json'
+        path.write_text('{"defaults": {}}')
+        with pytest.raises(ValueError, match="'jobs'"):
+            load_manifest(str(path))
+
+
+class TestSplitGroups:
+    def test_large_groups_spread_over_workers(self):
+        batches = split_groups([list(range(200)), [200, 201, 202]], workers=4)
+        assert [len(indices) for _, indices in batches] == [50, 50, 50, 50, 3]
+        assert sorted(i for group, indices in batches if group == 0 for i in indices) == \
+            list(range(200))
+        assert split_groups([[0, 1], [2]], workers=2) == [(0, [0, 1]), (1, [2])]
+        assert split_groups([[0, 1, 2]], workers=1) == [(0, [0, 1, 2])]
+
+    def test_shared_background_split_in_two(self):
+        assert split_groups([[0, 1, 2, 3]], workers=2) == [(0, [0, 1]), (0, [2, 3])]
+
+
+class TestRunBatch:
+    def _write(self, tmp_path, jobs):
+        path = tmp_path / 'jobs.json'
+        path.write_text(json.dumps({'jobs': jobs}))
+        return str(path)
+
+    def test_jobs_render_and_share_groups(self, tmp_path, tmp_data_file, capsys):
+        data = os.path.basename(tmp_data_file)
+        manifest = self._write(tmp_path, [
+            {'name': 'a', 'files': [data], 'output': 'a.png'},
+            {'name': 'b', 'files': [data], 'output': 'b.png', 'color': 'red'},
+            {'name': 'c', 'files': [data], 'output': 'c.png', 'projection': 'robinson'},
+        ])
+        summary = str(tmp_path / 'summary.json')
+        run_batch(parse_batch_args([manifest, '--workers', '2', '--summary', summary]))
+
+        with open(summary) as f:
+            report = json.load(f)
+        jobs = {job['name']: job for job in report['jobs']}
+        assert all(job['status'] == 0 for job in jobs.values())
+        assert all(os.path.getsize(tmp_path / f'{name}.png') > 0 for name in 'abc')
+        # Same inputs and background: same group, hence the same worker
+        assert jobs['a']['group'] == jobs['b']['group'] != jobs['c']['group']
+        assert jobs['a']['pid'] == jobs['b']['pid']
+        assert 'Finished 3 of 3' in capsys.readouterr().err
+
+    def test_shared_background_runs_as_several_batches(self, tmp_path, tmp_data_file, capsys):
+        data = os.path.basename(tmp_data_file)
+        manifest = self._write(tmp_path, [
+            {'name': f'map{i}', 'files': [data], 'output': f'map{i}.png'} for i in range(4)])
+        summary = str(tmp_path / 'summary.json')
+        run_batch(parse_batch_args([manifest, '--workers', '2', '--summary', summary]))
+
+        with open(summary) as f:
+            jobs = json.load(f)['jobs']
+        assert all(job['status'] == 0 for job in jobs)
+        assert len({job['group'] for job in jobs}) == 1
+        assert 'in 1 group(s) as 2 batch(es) with 2 worker(s)' in capsys.readouterr().err
+
+    def test_failed_and_invalid_jobs(self, tmp_path, tmp_data_file, capsys):
+        data = os.path.basename(tmp_data_file)
+        manifest = self._write(tmp_path, [
+            {'name': 'good', 'files': [data], 'output': 'good.png'},
+            {'name': 'missing', 'files': ['missing.txt'], 'output': 'missing.png'},
+            {'name': 'invalid', 'args': [data, '--no-such-option']},
+        ])
+        with pytest.raises(SystemExit) as e:
+            run_batch(parse_batch_args([manifest, '--workers', '1']))
+        assert e.value.code == 1
+
+        jobs = {job['name']: job for job in json.loads(capsys.readouterr().out)['jobs']}
+        assert jobs['good']['status'] == 0
+        assert jobs['missing']['status'] == 1
+        assert 'missing.txt' in jobs['missing']['error']
+        assert jobs['invalid']['status'] == 2
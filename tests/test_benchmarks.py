@@ -0,0 +1,74 @@
+"""Tests for the benchmark runner in benchmarks/run.py."""
+
+import importlib.util
+import json
+import os
+
+import numpy as np
+import pytest
+
+_SPEC = importlib.util.spec_from_file_location(
+    'benchmarks_run', os.path.join(os.path.dirname(__file__), '..', 'benchmarks', 'run.py'))
+bench = importlib.util.module_from_spec(_SPEC)
+_SPEC.loader.exec_module(bench)
+
+
+class TestScaleUp:
+    def test_tiles_rows_with_jitter(self, tmp_path):
+        path = bench.scale_up(bench.TRACKS, 5000, str(tmp_path))
+        rows = np.loadtxt(path)
+        source = np.loadtxt(os.path.join(bench.DATA_DIR, bench.TRACKS))
+
+        assert rows.shape == (5000, 3)
+        np.testing.assert_array_equal(rows[:, 0], source[np.arange(5000) % len(source), 0])
+        assert np.all((rows[:, 1] >= 0) & (rows[:, 1] < 360))
+        assert np.all(np.abs(rows[:, 2]) <= 90)
+        assert bench.scale_up(bench.TRACKS, 5000, str(tmp_path)) == path
+
+
+class TestCompare:
+    def test_statuses(self):
+        baseline = {'results': [
+            {'name': 'read_data', 'points': 100, 'median': 1.0},
+            {'name': 'bsc5', 'points': None, 'median': 1.0},
+            {'name': 'render_sky', 'points': 100, 'median': 1.0},
+        ]}
+        results = [
+            {'name': 'read_data', 'points': 100, 'median': 1.3},
+            {'name': 'bsc5', 'points': None, 'median': 1.1},
+            {'name': 'render_sky', 'points': 100, 'median': 0.5},
+            {'name': 'render_sky', 'points': 1000, 'median': 2.0},
+        ]
+        rows = bench.compare(results, baseline, tolerance=0.25)
+        assert [(row[0], row[4]) for row in rows] == [
+            ('read_data@100', 'slower'), ('bsc5', 'ok'), ('render_sky@100', 'faster'),
+            ('render_sky@1000', 'new')]
+        assert rows[0][3] == pytest.approx(1.3)
+
+
+class TestRunner:
+    @pytest.mark.parametrize('inputs', ['scaled', 'synth'])
+    def test_run_benchmark(self, tmp_path, inputs):
+        result = bench.run_benchmark('transform_matrix', 1000, str(tmp_path), repeat=2,
+                                     inputs=inputs)
+        assert result['name'] == 'transform_matrix' and result['points'] == 1000
+        assert len(result['runs']) == 2
+        assert 0 < result['min'] <= result['median']
+        assert bench.result_key(result).endswith('/synth') == (inputs == 'synth')
+
+    def test_main_fails_on_regression(self, tmp_path, capsys):
+        output = str(tmp_path / 'results.json')
+        argv = ['--only', 'read_data', 'bsc5', '--max-points', '1e4', '--repeat', '1',
+                '--workdir', str(tmp_path), '-o', output]
+        assert bench.main(argv) == 0
+        results = json.load(open(output))
+        assert [bench.result_key(r) for r in results['results']] == ['read_data@10000', 'bsc5']
+        assert results['environment']['python']
+
+        # A baseline 100 times faster than this run
+        for result in results['results']:
+            result['median'] /= 100
+        baseline = str(tmp_path / 'baseline.json')
+        json.dump(results, open(baseline, 'w'))
+        assert bench.main(argv + ['--baseline', baseline]) == 1
+        assert 'slower than the baseline' in capsys.readouterr().err
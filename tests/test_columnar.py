@@ -0,0 +1,125 @@
+"""Tests for the columnar binary data format."""
+
+import sys
+
+import numpy as np
+import pytest
+
+from mapplot.cli import parse_args, parse_convert_args
+from mapplot.columnar import (is_columnar, read_columnar, read_header, run_convert,
+                              write_columnar)
+from mapplot.coordinates import transform_coordinates
+from mapplot.data_io import input_frame, prepare_animation_data, read_data
+
+
+@pytest.fixture
+def mjd_columnar_file(tmp_path):
+    path = tmp_path / 'tracks.mapc'
+    write_columnar(str(path), {
+        'mjd': [60000.0, 60001.0, 60002.0, 60003.0],
+        'coord1': [10.0, 20.0, 30.0, 40.0],
+        'coord2': [-5.0, 0.0, 5.0, 10.0],
+        'size': [1.0, 2.0, 3.0, 4.0],
+        'label': ['A', '', 'B', 'A'],
+    })
+    return str(path)
+
+
+class TestColumnarFormat:
+    def test_round_trip_memmap(self, mjd_columnar_file):
+        columns, header = read_columnar(mjd_columnar_file)
+        assert header['n_rows'] == 4
+        assert header['frame'] == 'equatorial'
+        assert header['sorted_by_mjd']
+        assert header['labels'] == ['A', 'B']
+        assert isinstance(columns['coord1'], np.memmap)
+        np.testing.assert_array_equal(columns['coord1'], [10.0, 20.0, 30.0, 40.0])
+        np.testing.assert_array_equal(columns['label'], [0, -1, 1, 0])
+        assert 'color' not in columns
+
+    def test_columns_aligned(self, mjd_columnar_file):
+        header = read_header(mjd_columnar_file)
+        assert header['data_start'] % 64 == 0
+        assert all(info['offset'] % 64 == 0 for info in header['columns'].values())
+
+    def test_detected_by_magic(self, mjd_columnar_file, tmp_data_file):
+        assert is_columnar(mjd_columnar_file)
+        assert not is_columnar(tmp_data_file)
+
+    def test_empty_file(self, tmp_path):
+        path = str(tmp_path / 'empty.mapc')
+        write_columnar(path, {'coord1': [], 'coord2': []})
+        columns, header = read_columnar(path)
+        assert header['n_rows'] == 0
+        assert len(columns['coord1']) == 0
+
+    def test_rejects_unknown_frame(self, tmp_path):
+        with pytest.raises(ValueError):
+            write_columnar(str(tmp_path / 'x.mapc'), {'coord1': [1.0], 'coord2': [2.0]},
+                           frame='horizon')
+
+
+class TestReadDataColumnar:
+    def test_static_layout(self, mjd_columnar_file):
+        mjd, coord1, coord2, sizes, colors, labels = read_data(mjd_columnar_file)
+        assert mjd is None
+        np.testing.assert_array_equal(coord2, [-5.0, 0.0, 5.0, 10.0])
+        np.testing.assert_array_equal(sizes, [1.0, 2.0, 3.0, 4.0])
+        assert colors is None and labels is None
+
+    def test_labels_and_mjd(self, mjd_columnar_file):
+        mjd, _, _, sizes, _, labels = read_data(mjd_columnar_file, labels_from_file=True,
+                                                read_mjd=True)
+        np.testing.assert_array_equal(mjd, [60000.0, 60001.0, 60002.0, 60003.0])
+        assert labels == ['A', '', 'B', 'A']
+        assert sizes is None
+
+    def test_time_window_slices(self, mjd_columnar_file):
+        mjd, coord1, _, _, _, _ = read_data(mjd_columnar_file, read_mjd=True,
+                                            time_window=(60000.5, 60002.0))
+        np.testing.assert_array_equal(mjd, [60001.0, 60002.0])
+        np.testing.assert_array_equal(coord1, [20.0, 30.0])
+
+    def test_missing_mjd_errors(self, tmp_path):
+        path = str(tmp_path / 'static.mapc')
+        write_columnar(path, {'coord1': [1.0], 'coord2': [2.0]})
+        with pytest.raises(SystemExit):
+            read_data(path, read_mjd=True)
+
+
+class TestConvert:
+    def test_text_to_columnar(self, tmp_mjd_data_file, tmp_path):
+        out = str(tmp_path / 'out.mapc')
+        run_convert(parse_convert_args(['--mjd', tmp_mjd_data_file, out]))
+        expected = read_data(tmp_mjd_data_file, read_mjd=True)
+        converted = read_data(out, read_mjd=True)
+        for a, b in zip(expected[:3], converted[:3]):
+            np.testing.assert_array_equal(a, b)
+
+    def test_fits_to_columnar(self, tmp_path):
+        from astropy.table import Table
+        fits_path = str(tmp_path / 'in.fits')
+        Table({'MJD': [60000.0, 60001.0], 'RA': [1.0, 2.0], 'DEC': [3.0, 4.0],
+               'NAME': ['x', 'y']}).write(fits_path)
+        out = str(tmp_path / 'out.mapc')
+        run_convert(parse_convert_args(['--frame', 'galactic', fits_path, out]))
+
+        mjd, coord1, coord2, _, _, labels = read_data(out, labels_from_file=True, read_mjd=True)
+        np.testing.assert_array_equal(mjd, [60000.0, 60001.0])
+        np.testing.assert_array_equal(coord1, [1.0, 2.0])
+        assert labels == ['x', 'y']
+        assert read_header(out)['frame'] == 'galactic'
+
+    def test_frame_tag_overrides_input_coord(self, tmp_path):
+        path = str(tmp_path / 'gal.mapc')
+        write_columnar(path, {'mjd': [60000.0, 60001.0], 'coord1': [10.0, 20.0],
+                              'coord2': [5.0, 6.0]}, frame='galactic')
+        sys.argv = ['mapplot', '--animate', '-o', 'out.gif', path]
+        args = parse_args()
+        assert input_frame(path, args) == 'galactic'
+
+        data = prepare_animation_data(args, 'tableau10')
+        ra, dec = transform_coordinates(np.array([10.0, 20.0]), np.array([5.0, 6.0]),
+                                        'galactic', 'equatorial')
+        np.testing.assert_allclose(data.lon, ra)
+        np.testing.assert_allclose(data.lat, dec)
@@ -5,9 +5,11 @@ import pytest
 
 from mapplot.coordinates import (
     transform_coordinates, mjd_to_year, get_current_mjd,
-    get_sun_position_fast, get_sun_position_precise, get_sun_position,
-    compute_solar_relative_coords,
+    get_sun_position_fast, get_sun_position_precise, get_sun_position, get_sun_longitude_of_date,
+    compute_solar_relative_coords, compute_solar_elongation, transform_coordinates_matrix,
+    transform_to_ecliptic_of_date, ecliptic_of_date_matrices,
 )
+from mapplot import coordinates
 
 
 class TestTransformCoordinates:
@@ -71,6 +73,143 @@ class TestTransformCoordinates:
         assert np.isfinite(lat).all()
 
 
+class TestMatrixEngine:
+    """The matrix engine should agree with astropy to within aberration."""
+
+    def setup_method(self):
+        rng = np.random.default_rng(42)
+        self.ra = rng.uniform(0, 360, 500)
+        self.dec = np.degrees(np.arcsin(rng.uniform(-1, 1, 500)))
+
+    def test_galactic_matches_astropy(self):
+        l1, b1 = transform_coordinates(self.ra, self.dec, 'equatorial', 'galactic')
+        l2, b2 = transform_coordinates_matrix(self.ra, self.dec, 'equatorial', 'galactic')
+        lon_diff = np.abs((l1 - l2 + 180) % 360 - 180)
+        np.testing.assert_allclose(lon_diff * np.cos(np.radians(b1)), 0, atol=1e-8)
+        np.testing.assert_allclose(b1, b2, atol=1e-8)
+
+    def test_ecliptic_within_aberration(self):
+        l1, b1 = transform_coordinates(self.ra, self.dec, 'equatorial', 'ecliptic')
+        l2, b2 = transform_coordinates(self.ra, self.dec, 'equatorial', 'ecliptic',
+                                       engine='matrix')
+        lon_diff = np.abs((l1 - l2 + 180) % 360 - 180)
+        assert (lon_diff * np.cos(np.radians(b1)) < 25 / 3600).all()
+        assert (np.abs(b1 - b2) < 25 / 3600).all()
+
+    def test_roundtrip(self):
+        lon, lat = transform_coordinates_matrix(self.ra, self.dec, 'equatorial', 'ecliptic')
+        ra2, dec2 = transform_coordinates_matrix(lon, lat, 'ecliptic', 'equatorial')
+        np.testing.assert_allclose((ra2 - self.ra + 180) % 360 - 180, 0, atol=1e-9)
+        np.testing.assert_allclose(dec2, self.dec, atol=1e-9)
+
+    def test_invalid_engine_raises(self):
+        with pytest.raises(ValueError):
+            transform_coordinates(self.ra, self.dec, 'equatorial', 'ecliptic', engine='bogus')
+
+
+class TestChunkedTransform:
+    """Chunked and multi-process transforms must match the unchunked path."""
+
+    def setup_method(self):
+        rng = np.random.default_rng(7)
+        self.mjd = rng.uniform(50000, 60000, 1000)
+        self.ra = rng.uniform(0, 360, 1000)
+        self.dec = rng.uniform(-90, 90, 1000)
+
+    @pytest.mark.parametrize('engine', ['astropy', 'matrix'])
+    def test_chunked_matches_unchunked(self, engine):
+        expected = transform_coordinates(self.ra, self.dec, 'equatorial', 'galactic',
+                                         engine=engine)
+        result = transform_coordinates(self.ra, self.dec, 'equatorial', 'galactic',
+                                       engine=engine, chunk_size=128)
+        np.testing.assert_array_equal(expected[0], result[0])
+        np.testing.assert_array_equal(expected[1], result[1])
+
+    def test_process_pool_matches_unchunked(self):
+        expected = transform_coordinates(self.ra, self.dec, 'equatorial', 'ecliptic')
+        result = transform_coordinates(self.ra, self.dec, 'equatorial', 'ecliptic',
+                                       chunk_size=300, workers=2)
+        np.testing.assert_array_equal(expected[0], result[0])
+        np.testing.assert_array_equal(expected[1], result[1])
+
+    def test_solar_relative_chunked(self):
+        expected = compute_solar_relative_coords(self.mjd, self.ra, self.dec, 'equatorial')
+        result = compute_solar_relative_coords(self.mjd, self.ra, self.dec, 'equatorial',
+                                               chunk_size=256, workers=2)
+        np.testing.assert_array_equal(expected[0], result[0])
+        np.testing.assert_array_equal(expected[1], result[1])
+
+
+class TestEclipticOfDate:
+    @pytest.fixture(autouse=True)
+    def isolated_cache(self, tmp_path, monkeypatch):
+        monkeypatch.setenv('MAPPLOT_CACHE_DIR', str(tmp_path))
+        monkeypatch.setattr(coordinates, '_EPOCH_MATRIX_CACHE', {})
+        self.cache_dir = tmp_path
+
+    def test_j2000_bin_matches_fixed_ecliptic(self):
+        # An observation at J2000 should land within precession of one bin of J2000
+        ra = np.array([10.0, 200.0])
+        dec = np.array([5.0, -40.0])
+        mjd = np.array([51544.5, 51544.5])
+        lon1, lat1 = transform_to_ecliptic_of_date(ra, dec, mjd, 'equatorial')
+        lon2, lat2 = transform_coordinates_matrix(ra, dec, 'equatorial', 'ecliptic')
+        np.testing.assert_allclose(lon1, lon2, atol=1e-4)
+        np.testing.assert_allclose(lat1, lat2, atol=1e-4)
+
+    def test_precession_over_decades(self):
+        # Ecliptic longitudes of date advance ~50 arcsec/year relative to J2000
+        ra = np.array([90.0])
+        dec = np.array([23.0])
+        lon_2000, _ = transform_to_ecliptic_of_date(ra, dec, np.array([51544.5]), 'equatorial')
+        lon_2025, _ = transform_to_ecliptic_of_date(ra, dec, np.array([60676.5]), 'equatorial')
+        drift = (lon_2025[0] - lon_2000[0]) * 3600
+        assert 1200 < drift < 1300
+
+    def test_matrices_cached_on_disk(self):
+        ecliptic_of_date_matrices(np.array([60000, 60001]))
+        cache_files = list(self.cache_dir.glob('ecliptic_of_date_*.npz'))
+        assert len(cache_files) == 1
+
+        coordinates._EPOCH_MATRIX_CACHE.clear()
+        bins, _ = coordinates._load_epoch_cache(1.0)
+        np.testing.assert_array_equal(bins, [60000, 60001])
+
+    def test_solar_relative_equinox_of_date(self):
+        mjd = np.array([51544.5, 60000.0])
+        ra = np.array([180.0, 45.0])
+        dec = np.array([0.0, 20.0])
+        lon, lat = compute_solar_relative_coords(mjd, ra, dec, 'equatorial', equinox='date')
+        assert np.isfinite(lon).all() and np.isfinite(lat).all()
+        assert (lon >= -180).all() and (lon <= 180).all()
+
+    def test_sun_longitude_matches_astropy(self):
+        from astropy.coordinates import GeocentricTrueEcliptic, get_sun
+        from astropy.time import Time
+
+        mjd = np.linspace(47892.0, 65000.0, 40)  # 1990 to 2036
+        t = Time(mjd, format='mjd')
+        expected = get_sun(t).transform_to(GeocentricTrueEcliptic(equinox=t)).lon.deg
+        diff = (get_sun_longitude_of_date(mjd) - expected + 180) % 360 - 180
+        assert np.abs(diff).max() < 0.015
+
+    def test_elongation_of_the_sun_is_zero(self):
+        from astropy.coordinates import get_sun
+        from astropy.time import Time
+
+        # Sun positions (equatorial) from astropy, across the equation of centre's range
+        mjd = np.array([51544.5, 55000.0, 58000.0, 60676.5, 60800.0])
+        sun = get_sun(Time(mjd, format='mjd'))
+        _, _, elongation = compute_solar_elongation(mjd, sun.ra.deg, sun.dec.deg,
+                                                    'equatorial', equinox='date')
+        np.testing.assert_allclose(elongation, 0.0, atol=0.02)
+
+    def test_invalid_equinox_raises(self):
+        with pytest.raises(ValueError):
+            compute_solar_relative_coords(np.array([60000.0]), np.array([0.0]),
+                                          np.array([0.0]), 'equatorial', equinox='B1950')
+
+
 class TestMJDToYear:
     def test_j2000_epoch(self):
         # MJD 51544.5 = 2000 Jan 1.5 = year 2000.0
@@ -1,9 +1,17 @@
 """Tests for data file parsing."""
 
+import sys
+
 import numpy as np
 import pytest
 
-from mapplot.data_io import read_data
+from mapplot.cli import parse_args
+from mapplot.columns import parse_column_map
+from mapplot.coordinates import transform_coordinates, compute_solar_relative_coords
+from mapplot.data_io import (read_data, prepare_animation_data, AnimationData,
+                             stratified_sample, sky_cell_index, merge_sorted_runs,
+                             is_sorted, ingest_files, ingest_static_file, read_cache)
+from mapplot.parallel import ordered_map
 
 
 class TestReadData:
@@ -61,3 +69,234 @@ class TestReadData:
         mjd, coord1, coord2, sizes, colors, labels = read_data(str(f))
         np.testing.assert_array_equal(coord1, [10.0])
         np.testing.assert_array_equal(coord2, [20.0])
+
+
+def _animation_args(argv):
+    sys.argv = ['mapplot', '--animate', '-o', 'out.gif'] + argv
+    return parse_args()
+
+
+class TestPrepareAnimationData:
+    def test_sorted_columnar_output(self, tmp_path):
+        f1 = tmp_path / "a.txt"
+        f1.write_text("60002.0 10.0 1.0\n60000.0 20.0 2.0\n")
+        f2 = tmp_path / "b.txt"
+        f2.write_text("60001.0 30.0 3.0\n")
+        args = _animation_args([str(f1), str(f2)])
+
+        data = prepare_animation_data(args, 'tableau10')
+        assert isinstance(data, AnimationData)
+        np.testing.assert_array_equal(data.mjd, [60000.0, 60001.0, 60002.0])
+        np.testing.assert_array_equal(data.file_index, [0, 1, 0])
+        np.testing.assert_array_equal(data.lon, [20.0, 30.0, 10.0])
+        assert data.color.shape == (3, 4)
+
+    def test_plot_coord_transform_applied(self, tmp_mjd_data_file):
+        args = _animation_args(['--plot-coord', 'galactic', tmp_mjd_data_file])
+        data = prepare_animation_data(args, 'tableau10')
+        expected_l, expected_b = transform_coordinates(
+            np.array([120.0, 121.0, 122.0]), np.array([30.0, 31.0, 32.0]),
+            'equatorial', 'galactic')
+        np.testing.assert_allclose(data.lon, expected_l)
+        np.testing.assert_allclose(data.lat, expected_b)
+
+    def test_solar_relative_precomputed(self, tmp_mjd_data_file):
+        args = _animation_args(['--solar-relative', tmp_mjd_data_file])
+        data = prepare_animation_data(args, 'tableau10')
+        mjd = np.array([60000.0, 60001.0, 60002.0])
+        ra = np.array([120.0, 121.0, 122.0])
+        dec = np.array([30.0, 31.0, 32.0])
+        lon, lat = compute_solar_relative_coords(mjd, ra, dec, 'equatorial')
+        np.testing.assert_allclose(data.lon, lon)
+        np.testing.assert_allclose(data.lat, lat)
+        assert data.elongation is not None
+        assert data.ecl_lon is not None
+
+    @pytest.mark.parametrize('equinox', ['J2000', 'date'])
+    def test_corotated_frame_at_epoch_matches_static(self, tmp_mjd_data_file, equinox):
+        from mapplot.animation import corotated_longitudes
+        args = _animation_args(['--solar-relative', '--corotate', '--equinox', equinox,
+                                tmp_mjd_data_file])
+        data = prepare_animation_data(args, 'tableau10')
+        lons = [corotated_longitudes(data.ecl_lon[i], mjd, args) for i, mjd in enumerate(data.mjd)]
+        np.testing.assert_allclose(lons, data.lon, atol=1e-9)
+
+    def test_color_column_uses_colormap(self, tmp_path):
+        f = tmp_path / "colored.txt"
+        f.write_text("60000.0 10.0 1.0 5.0 0.0\n60001.0 20.0 2.0 5.0 1.0\n")
+        args = _animation_args(['--cmap', 'viridis', str(f)])
+        data = prepare_animation_data(args, 'tableau10')
+        assert not np.allclose(data.color[0], data.color[1])
+        np.testing.assert_array_equal(data.size, [5.0, 5.0])
+
+
+class TestDownsampling:
+    def test_stratified_exact_target(self):
+        groups = np.repeat([0, 1, 2], [1000, 10, 90])
+        keep = stratified_sample(groups, 60, np.random.default_rng(0))
+        assert len(keep) == 60
+        counts = np.bincount(groups[keep], minlength=3)
+        # Small group keeps everything, large groups share the rest evenly
+        assert counts[1] == 10
+        assert counts[0] == 25 and counts[2] == 25
+
+    def test_stratified_deterministic(self):
+        groups = np.random.default_rng(1).integers(0, 20, 5000)
+        a = stratified_sample(groups, 500, np.random.default_rng(3))
+        b = stratified_sample(groups, 500, np.random.default_rng(3))
+        np.testing.assert_array_equal(a, b)
+        assert np.all(np.diff(a) > 0)
+
+    def test_sky_cells_equal_area(self):
+        rng = np.random.default_rng(2)
+        lon = rng.uniform(-180, 180, 200000)
+        lat = np.degrees(np.arcsin(rng.uniform(-1, 1, 200000)))
+        counts = np.bincount(sky_cell_index(lon, lat, 50))
+        # Uniform points on the sphere should fill equal-area cells evenly
+        assert counts.min() > 0.8 * counts.mean()
+
+    @pytest.mark.parametrize('mode', ['time', 'file', 'sky', 'stride'])
+    def test_modes_keep_time_order(self, tmp_path, mode):
+        rng = np.random.default_rng(4)
+        f1 = tmp_path / "dense.txt"
+        f2 = tmp_path / "sparse.txt"
+        np.savetxt(f1, np.column_stack([np.sort(rng.uniform(60000, 60100, 900)),
+                                        rng.uniform(0, 360, 900), rng.uniform(-60, 60, 900)]))
+        np.savetxt(f2, np.column_stack([np.sort(rng.uniform(60000, 60100, 100)),
+                                        rng.uniform(0, 360, 100), rng.uniform(-60, 60, 100)]))
+        args = _animation_args(['--downsample', '200', '--downsample-mode', mode,
+                                str(f1), str(f2)])
+
+        data = prepare_animation_data(args, 'tableau10')
+        assert len(data) <= 200 or mode == 'stride'
+        assert np.all(np.diff(data.mjd) >= 0)
+        if mode == 'file':
+            np.testing.assert_array_equal(np.bincount(data.file_index), [100, 100])
+
+
+class TestMergeSortedRuns:
+    def test_matches_stable_argsort(self):
+        rng = np.random.default_rng(5)
+        runs = [np.sort(rng.integers(0, 50, size)).astype(float) for size in (40, 0, 17, 33, 8)]
+        expected = np.argsort(np.concatenate(runs), kind='stable')
+        np.testing.assert_array_equal(merge_sorted_runs(runs), expected)
+
+    def test_single_and_empty(self):
+        np.testing.assert_array_equal(merge_sorted_runs([np.array([1.0, 2.0])]), [0, 1])
+        assert len(merge_sorted_runs([])) == 0
+
+    def test_is_sorted(self):
+        assert is_sorted(np.array([1.0, 1.0, 2.0]))
+        assert not is_sorted(np.array([2.0, 1.0]))
+        assert is_sorted(np.array([]))
+
+
+class TestColumnSelection:
+    def test_comment_header_names(self, tmp_path):
+        f = tmp_path / "wide.txt"
+        f.write_text("# generated\n# mjd a b ra dec H\n"
+                     "60000.0 1 2 10.0 20.0 18.5\n60001.0 3 4 11.0 21.0 19.0\n")
+        mjd, coord1, coord2, sizes, colors, labels = read_data(
+            str(f), read_mjd=True, column_map=parse_column_map('mjd=mjd,ra=ra,dec=dec,size=H'))
+        np.testing.assert_array_equal(mjd, [60000.0, 60001.0])
+        np.testing.assert_array_equal(coord1, [10.0, 11.0])
+        np.testing.assert_array_equal(sizes, [18.5, 19.0])
+        assert colors is None
+
+    def test_only_mapped_columns_parsed(self, tmp_path):
+        # Non-numeric extra columns would break a full np.loadtxt
+        f = tmp_path / "flags.txt"
+        f.write_text("60000.0 xx 10.0 20.0 flag\n60001.0 yy 11.0 21.0 flag\n")
+        mjd, coord1, coord2, sizes, _, _ = read_data(
+            str(f), read_mjd=True, column_map=parse_column_map('mjd=0,ra=2,dec=3'))
+        np.testing.assert_array_equal(coord2, [20.0, 21.0])
+        assert sizes is None
+
+    def test_csv_header(self, tmp_path):
+        f = tmp_path / "objs.csv"
+        f.write_text("name,RA,Dec,size\nVega,279.2,38.8,2.0\nDeneb,310.4,45.3,1.5\n")
+        _, coord1, coord2, sizes, _, _ = read_data(str(f))
+        np.testing.assert_array_equal(coord1, [279.2, 310.4])
+        np.testing.assert_array_equal(sizes, [2.0, 1.5])
+
+        _, _, _, _, _, labels = read_data(str(f), labels_from_file=True)
+        assert list(labels) == ['Vega', 'Deneb']
+
+    def test_headerless_csv_positional(self, tmp_path):
+        f = tmp_path / "pts.csv"
+        f.write_text("60000.0,10.0,20.0\n60001.0,11.0,21.0\n")
+        mjd, coord1, _, _, _, _ = read_data(str(f), read_mjd=True)
+        np.testing.assert_array_equal(mjd, [60000.0, 60001.0])
+        np.testing.assert_array_equal(coord1, [10.0, 11.0])
+
+    def test_names_without_header_error(self, tmp_data_file):
+        with pytest.raises(SystemExit):
+            read_data(tmp_data_file, column_map=parse_column_map('ra=RA,dec=DEC'))
+
+    def test_ignore_extra_skips_trailing_columns(self, tmp_path):
+        f = tmp_path / "extra.txt"
+        f.write_text("10.0 20.0 a b\n30.0 40.0 c d\n")
+        _, coord1, coord2, sizes, _, _ = read_data(str(f), ignore_extra=True)
+        np.testing.assert_array_equal(coord1, [10.0, 30.0])
+        assert sizes is None
+
+
+def _negate(x, offset=0):
+    return offset - x
+
+
+class TestParallelIngest:
+    def test_ordered_map_keeps_order(self):
+        assert ordered_map(_negate, [1, 2, 3], workers=2, kwargs={'offset': 10}) == [9, 8, 7]
+        assert ordered_map(_negate, [1, 2, 3]) == [-1, -2, -3]
+
+    def _files(self, tmp_path, n_files=3):
+        rng = np.random.default_rng(0)
+        files = []
+        for i in range(n_files):
+            f = tmp_path / f"part{i}.txt"
+            rows = np.column_stack([60000 + rng.uniform(0, 30, 50),
+                                    rng.uniform(0, 360, 50), rng.uniform(-60, 60, 50)])
+            np.savetxt(f, rows)
+            files.append(str(f))
+        return files
+
+    def test_static_workers_match_serial(self, tmp_path):
+        files = self._files(tmp_path)
+        argv = ['mapplot', '--plot-coord', 'galactic', '--columns', 'ra=1,dec=2']
+        sys.argv = argv + files
+        serial = ingest_files(ingest_static_file, parse_args())
+        sys.argv = argv + ['--workers', '2'] + files
+        parallel = ingest_files(ingest_static_file, parse_args())
+
+        assert len(parallel) == len(files)
+        for a, b in zip(serial, parallel):
+            np.testing.assert_array_equal(a[1], b[1])
+            np.testing.assert_array_equal(a[2], b[2])
+
+    def test_animation_workers_deterministic(self, tmp_path):
+        files = self._files(tmp_path)
+        serial = prepare_animation_data(_animation_args(files), 'tableau10')
+        parallel = prepare_animation_data(_animation_args(['--workers', '2'] + files), 'tableau10')
+        np.testing.assert_array_equal(serial.mjd, parallel.mjd)
+        np.testing.assert_array_equal(serial.file_index, parallel.file_index)
+        np.testing.assert_array_equal(serial.lon, parallel.lon)
+
+
+class TestReadCache:
+    def test_hits_share_arrays(self, tmp_data_file):
+        with read_cache():
+            first = read_data(tmp_data_file)
+            assert read_data(tmp_data_file) is first
+            assert not first[1].flags.writeable
+            assert read_data(tmp_data_file, ignore_extra=True) is not first
+        assert read_data(tmp_data_file) is not first
+        assert read_data(tmp_data_file)[1].flags.writeable
+
+    def test_changed_file_is_read_again(self, tmp_data_file):
+        with read_cache():
+            read_data(tmp_data_file)
+            with open(tmp_data_file, 'a') as f:
+                f.write("70.0 80.0\n")
+            _, coord1, _, _, _, _ = read_data(tmp_data_file)
+        np.testing.assert_array_equal(coord1, [10.0, 30.0, 50.0, 70.0])
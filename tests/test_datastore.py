@@ -0,0 +1,171 @@
+"""Tests for stored reference data (mapplot data) against a local HTTP server."""
+
+import http.server
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+from mapplot import datastore, observatories
+from mapplot.core import main
+from mapplot.datastore import dataset_path, read_meta, update_dataset
+from mapplot.observatories import load_observatory_table
+
+OBSCODES = """\
+<pre>
+000   0.0000 0.62411 +0.77873 Greenwich
+568 204.5278 0.94171 +0.33725 Mauna Kea
+G96 249.2108 0.84560 +0.53254 Mount Lemmon
+</pre>
+"""
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    """Serves server.content with an ETag, answering 304 to a matching If-None-Match."""
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(dict(self.headers))
+        if self.path != '/ObsCodes.html':
+            self.send_error(404)
+            return
+        etag = f'"v{server.version}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = server.content.encode('utf-8')
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', 'Mon, 05 Oct 2026 12:00:00 GMT')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def mpc_server(tmp_path, monkeypatch):
+    """A stand-in for the MPC site, with data stored under tmp_path."""
+    server = http.server.HTTPServer(('127.0.0.1', 0), _Handler)
+    server.requests = []
+    server.content = OBSCODES
+    server.version = 1
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    url = f'http://127.0.0.1:{server.server_port}/ObsCodes.html'
+    monkeypatch.setitem(datastore.DATASETS, 'mpc_observatories',
+                        dict(datastore.DATASETS['mpc_observatories'], url=url))
+    monkeypatch.setenv('MAPPLOT_DATA_DIR', str(tmp_path / 'data'))
+    monkeypatch.setenv('MAPPLOT_CACHE_DIR', str(tmp_path / 'cache'))
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class TestUpdate:
+    def test_download_then_fresh(self, mpc_server):
+        assert update_dataset('mpc_observatories') == ('downloaded', 3)
+        path = dataset_path('mpc_observatories')
+        assert open(path).read() == OBSCODES
+        meta = read_meta(path)
+        assert meta['etag'] == '"v1"'
+        assert meta['last_modified'] == 'Mon, 05 Oct 2026 12:00:00 GMT'
+
+        # Within the maximum age the stored copy is used without a request
+        assert update_dataset('mpc_observatories') == ('fresh', None)
+        assert len(mpc_server.requests) == 1
+
+    def test_revalidation(self, mpc_server):
+        update_dataset('mpc_observatories')
+        path = dataset_path('mpc_observatories')
+        fetched = read_meta(path)['fetched']
+
+        assert update_dataset('mpc_observatories', max_age_days=0) == ('not-modified', None)
+        request = mpc_server.requests[-1]
+        assert request['If-None-Match'] == '"v1"'
+        assert request['If-Modified-Since'] == 'Mon, 05 Oct 2026 12:00:00 GMT'
+        assert read_meta(path)['fetched'] >= fetched
+
+        mpc_server.version = 2
+        mpc_server.content = OBSCODES.replace(
+            '</pre>', 'I41 243.1403 0.82478 +0.56379 Palomar\n</pre>')
+        assert update_dataset('mpc_observatories', force=True) == ('downloaded', 4)
+        assert read_meta(path)['etag'] == '"v2"'
+
+    def test_failed_download_keeps_copy(self, mpc_server):
+        update_dataset('mpc_observatories')
+        path = dataset_path('mpc_observatories')
+
+        mpc_server.version = 2
+        mpc_server.content = '<html>Service unavailable</html>'
+        with pytest.raises(ValueError, match='No records'):
+            update_dataset('mpc_observatories', force=True)
+        assert open(path).read() == OBSCODES
+
+    def test_copy_without_metadata_ages_by_mtime(self, tmp_path, monkeypatch):
+        monkeypatch.setenv('MAPPLOT_DATA_DIR', str(tmp_path))
+        path = dataset_path('mpc_observatories')
+        open(path, 'w').write(OBSCODES)
+        assert not datastore.is_stale(path, 7)
+        os.utime(path, (time.time() - 8 * datastore.DAY,) * 2)
+        assert datastore.is_stale(path, 7)
+
+
+class TestLoad:
+    def test_downloads_once_into_data_dir(self, mpc_server, monkeypatch):
+        # Only the user data directory, not the bundled data/ copy
+        def find_stored(obs_file, config=None):
+            path = dataset_path('mpc_observatories')
+            return path if os.path.exists(path) else None
+        monkeypatch.setattr(observatories, 'find_observatory_file', find_stored)
+
+        assert load_observatory_table().codes.tolist() == ['000', '568', 'G96']
+        assert len(load_observatory_table()) == 3
+        assert len(mpc_server.requests) == 1
+
+
+class TestConfiguredPath:
+    def test_custom_paths_entry_used_for_update_and_render(self, mpc_server, tmp_path,
+                                                          monkeypatch, capsys):
+        pytest.importorskip('yaml')
+        monkeypatch.delenv('MAPPLOT_DATA_DIR')
+        stored = tmp_path / 'custom' / 'obscodes.txt'
+        rc = tmp_path / 'mapplotrc'
+        rc.write_text(f"paths:\n  mpc_observatories: {stored}\n")
+
+        monkeypatch.setattr(sys, 'argv', ['mapplot', 'data', 'update', '--config', str(rc)])
+        main()
+        assert stored.exists()
+
+        monkeypatch.setattr(sys, 'argv', [
+            'mapplot', '--earth', '--no-coastlines', '--observatories', '--config', str(rc),
+            '-o', str(tmp_path / 'obs.png')])
+        main()
+        assert f'Loaded 3 observatories from {stored}' in capsys.readouterr().err
+        assert len(mpc_server.requests) == 1
+
+
+class TestDataCli:
+    def test_update_and_status(self, mpc_server, monkeypatch, capsys):
+        monkeypatch.setattr(sys, 'argv', ['mapplot', 'data', 'update'])
+        main()
+        assert 'downloaded 3 records' in capsys.readouterr().err
+
+        monkeypatch.setattr(sys, 'argv', ['mapplot', 'data', 'status', 'mpc_observatories'])
+        main()
+        out = capsys.readouterr().out
+        assert 'mpc_observatories: fresh' in out and 'ETag "v1"' in out
+
+    def test_update_failure_exits(self, mpc_server, monkeypatch, capsys):
+        url = f'http://127.0.0.1:{mpc_server.server_port}/missing'
+        monkeypatch.setattr(sys, 'argv', ['mapplot', 'data', 'update', '--url', url])
+        with pytest.raises(SystemExit) as excinfo:
+            main()
+        assert excinfo.value.code == 1
+        assert 'HTTP Error 404' in capsys.readouterr().err
@@ -0,0 +1,130 @@
+"""Tests for FITS binary-table input."""
+
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from mapplot.cli import parse_args
+from mapplot.columns import parse_column_map, resolve_columns
+from mapplot.data_io import prepare_animation_data, read_data
+from mapplot.fitstable import is_fits, read_fits_columns
+
+
+@pytest.fixture
+def fits_table_file(tmp_path):
+    from astropy.io import fits
+    columns = [
+        fits.Column(name='MJD_OBS', format='D', array=np.array([60002.0, 60000.0, 60001.0])),
+        fits.Column(name='RA_DEG', format='D', array=np.array([10.0, 20.0, 30.0])),
+        fits.Column(name='DEC_DEG', format='D', array=np.array([-1.0, 0.0, 1.0])),
+        fits.Column(name='H', format='E', array=np.array([18.0, 19.5, 21.0])),
+        fits.Column(name='DESIG', format='8A', array=np.array(['2024 AA', 'Ceres', ''])),
+    ]
+    hdu = fits.BinTableHDU.from_columns(columns, name='OBS')
+    path = str(tmp_path / 'survey.fits')
+    fits.HDUList([fits.PrimaryHDU(), hdu]).writeto(path)
+    return path
+
+
+MAPPING = 'mjd=MJD_OBS,ra=RA_DEG,dec=DEC_DEG,size=H,label=DESIG'
+
+
+class TestColumnMap:
+    def test_aliases(self):
+        assert parse_column_map('mjd=T, ra=X ,dec=Y,name=N') == {
+            'mjd': 'T', 'coord1': 'X', 'coord2': 'Y', 'label': 'N'}
+
+    @pytest.mark.parametrize('spec', ['ra', 'foo=X', 'ra='])
+    def test_invalid(self, spec):
+        with pytest.raises(ValueError):
+            parse_column_map(spec)
+
+    def test_default_names_case_insensitive(self):
+        assert resolve_columns(['Ra', 'DEC', 'mag']) == {'coord1': 'Ra', 'coord2': 'DEC'}
+
+    def test_missing_mapped_column(self):
+        with pytest.raises(ValueError):
+            resolve_columns(['RA', 'DEC'], {'size': 'H'})
+
+    def test_cli_rejects_bad_mapping(self):
+        sys.argv = ['mapplot', '--columns', 'bogus=1', 'x.fits']
+        with pytest.raises(SystemExit):
+            parse_args()
+
+
+class TestFitsInput:
+    def test_detected_by_magic(self, fits_table_file, tmp_data_file):
+        assert is_fits(fits_table_file)
+        assert not is_fits(tmp_data_file)
+
+    def test_columns_are_memmap_views(self, fits_table_file):
+        columns = read_fits_columns(fits_table_file, parse_column_map(MAPPING))
+        np.testing.assert_array_equal(columns['coord1'], [10.0, 20.0, 30.0])
+        # A view into the table buffer, not a copy
+        assert not columns['coord1'].flags.owndata
+        assert list(columns['label']) == ['2024 AA', 'Ceres', '']
+
+    def test_file_closed_after_read(self, fits_table_file):
+        # Unclosed files warn (an error here) at garbage collection. Each live
+        # memory map holds a descriptor only until its arrays are freed.
+        code = f"""
+import gc, os
+from mapplot.columns import parse_column_map
+from mapplot.fitstable import read_fits_columns
+
+def open_files():
+    return sum(os.path.realpath(os.path.join('/proc/self/fd', fd)) == {fits_table_file!r}
+               for fd in os.listdir('/proc/self/fd'))
+
+kept = [read_fits_columns({fits_table_file!r}, parse_column_map({MAPPING!r}))
+        for _ in range(20)]
+for _ in range(5):
+    try:
+        read_fits_columns({fits_table_file!r})
+    except ValueError:
+        pass
+gc.collect()
+assert open_files() <= 20, 'failed reads left files open'
+assert kept[-1]['coord1'].tolist() == [10.0, 20.0, 30.0]
+del kept
+gc.collect()
+assert open_files() == 0, 'files left open'
+"""
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+        result = subprocess.run([sys.executable, '-W', 'error::ResourceWarning', '-c', code],
+                                capture_output=True, text=True, env=env)
+        assert result.returncode == 0, result.stderr
+        assert 'ResourceWarning' not in result.stderr
+
+    def test_read_data_roles(self, fits_table_file):
+        mjd, coord1, coord2, sizes, colors, labels = read_data(
+            fits_table_file, read_mjd=True, column_map=parse_column_map(MAPPING), hdu='OBS')
+        np.testing.assert_array_equal(mjd, [60002.0, 60000.0, 60001.0])
+        np.testing.assert_array_equal(coord2, [-1.0, 0.0, 1.0])
+        np.testing.assert_allclose(sizes, [18.0, 19.5, 21.0])
+        assert colors is None and labels is None
+
+    def test_labels_and_time_window(self, fits_table_file):
+        mjd, _, _, _, _, labels = read_data(
+            fits_table_file, read_mjd=True, labels_from_file=True,
+            column_map=parse_column_map(MAPPING), time_window=(60000.5, None))
+        np.testing.assert_array_equal(mjd, [60002.0, 60001.0])
+        assert list(labels) == ['2024 AA', '']
+
+    def test_unmapped_coordinates_error(self, fits_table_file):
+        with pytest.raises(SystemExit):
+            read_data(fits_table_file)
+
+    def test_bad_hdu_errors(self, fits_table_file):
+        with pytest.raises(SystemExit):
+            read_data(fits_table_file, column_map=parse_column_map(MAPPING), hdu='MISSING')
+
+    def test_animation_from_fits(self, fits_table_file):
+        sys.argv = ['mapplot', '--animate', '-o', 'out.gif', '--ignore-extra',
+                    '--columns', MAPPING, fits_table_file]
+        data = prepare_animation_data(parse_args(), 'tableau10')
+        np.testing.assert_array_equal(data.mjd, [60000.0, 60001.0, 60002.0])
+        np.testing.assert_array_equal(data.lon, [20.0, 30.0, 10.0])
@@ -0,0 +1,171 @@
+"""Tests for live tail mode (--follow)."""
+
+import gzip
+import os
+import sys
+
+import cartopy.crs as ccrs
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+
+from mapplot import follow
+from mapplot.cli import parse_args
+from mapplot.core import main
+from mapplot.follow import (FileTail, follow_density, follow_scatter, initial_density_grid,
+                            open_tails, read_initial, save_figure_atomic)
+from mapplot.plotting import plot_density_grid
+
+
+def _args(*argv):
+    sys.argv = ['mapplot', '--follow', '--follow-interval', '0.01', '-o', 'out.png'] + list(argv)
+    return parse_args()
+
+
+def _append(path, text):
+    with open(path, 'a') as f:
+        f.write(text)
+
+
+class TestFileTail:
+    def test_reads_only_appended_rows(self, tmp_path):
+        path = str(tmp_path / 'obs.txt')
+        _append(path, "# ra dec\n10.0 20.0\n11.0 21.0\n")
+        tail = FileTail(path, _args(path))
+
+        _, lon, lat, _, _, _ = tail.read_new()
+        np.testing.assert_array_equal(lon, [10.0, 11.0])
+        assert tail.read_new() is None
+
+        _append(path, "12.0 22.0\n")
+        _, lon, _, _, _, _ = tail.read_new()
+        np.testing.assert_array_equal(lon, [12.0])
+        assert tail.n_rows == 3
+
+    def test_partial_line_waits_for_newline(self, tmp_path):
+        path = str(tmp_path / 'obs.txt')
+        _append(path, "10.0 20.0\n11.0 2")
+        tail = FileTail(path, _args(path))
+        assert len(tail.read_new()[1]) == 1
+
+        _append(path, "1.0\n")
+        _, lon, lat, _, _, _ = tail.read_new()
+        np.testing.assert_array_equal(lat, [21.0])
+
+    def test_csv_header_before_first_row(self, tmp_path):
+        path = str(tmp_path / 'obs.csv')
+        _append(path, "name,ra,dec\n")
+        tail = FileTail(path, _args('--columns', 'ra=ra,dec=dec', path))
+        assert tail.read_new() is None
+
+        _append(path, "a,5.0,6.0\nb,7.0,8.0\n")
+        _, lon, _, _, _, _ = tail.read_new()
+        np.testing.assert_array_equal(lon, [5.0, 7.0])
+
+    def test_truncated_file_is_reread(self, tmp_path, capsys):
+        path = str(tmp_path / 'obs.txt')
+        _append(path, "10.0 20.0\n11.0 21.0\n")
+        tail = FileTail(path, _args(path))
+        tail.read_new()
+
+        with open(path, 'w') as f:
+            f.write("30.0 40.0\n")
+        _, lon, _, _, _, _ = tail.read_new()
+        np.testing.assert_array_equal(lon, [30.0])
+        assert 'shrank' in capsys.readouterr().err
+
+    def test_rejects_compressed(self, tmp_path):
+        path = str(tmp_path / 'obs.txt.gz')
+        with gzip.open(path, 'wt') as f:
+            f.write("10.0 20.0\n")
+        with pytest.raises(ValueError):
+            FileTail(path, _args(path))
+
+
+class TestFollowOutput:
+    def test_scatter_gains_new_points(self, tmp_path):
+        path = str(tmp_path / 'obs.txt')
+        _append(path, "10.0 20.0 1.0 5.0\n")
+        args = _args(path)
+        args.output = str(tmp_path / 'map.png')
+        tails = open_tails(args)
+        _, lon, lat, sizes, colors, _, _ = read_initial(tails)[0]
+
+        fig, ax = plt.subplots(subplot_kw={'projection': ccrs.PlateCarree()})
+        scatter = ax.scatter(lon, lat, s=sizes * args.size, c=colors)
+        _append(path, "11.0 21.0 2.0 7.0\n")
+        follow_scatter(args, fig, ax, tails, [scatter], max_updates=1)
+        plt.close(fig)
+
+        assert len(scatter.get_offsets()) == 2
+        np.testing.assert_array_equal(scatter.get_array(), [5.0, 7.0])
+        assert scatter.norm.vmax == 7.0
+        assert os.path.exists(args.output)
+
+    def test_file_empty_at_startup_gets_sizes_and_colors(self, tmp_path):
+        path = str(tmp_path / 'log.txt')
+        _append(path, "# lon lat size color\n")
+        args = _args(path)
+        args.output = str(tmp_path / 'map.png')
+        tails = open_tails(args)
+        _, lon, lat, sizes, colors, _, _ = read_initial(tails)[0]
+        assert sizes is None and colors is None
+
+        fig, ax = plt.subplots(subplot_kw={'projection': ccrs.PlateCarree()})
+        scatter = ax.scatter(lon, lat, s=args.size, c='red')
+        _append(path, "10.0 20.0 1.0 5.0\n11.0 21.0 2.0 7.0\n12.0 22.0 3.0 6.0\n")
+        follow_scatter(args, fig, ax, tails, [scatter], max_updates=1)
+        plt.close(fig)
+
+        np.testing.assert_array_equal(scatter.get_array(), [5.0, 7.0, 6.0])
+        np.testing.assert_array_equal(scatter.get_sizes(), np.array([1.0, 2.0, 3.0]) * args.size)
+        assert scatter.norm.vmin == 5.0 and scatter.norm.vmax == 7.0
+
+    def test_percentile_colorbar_from_empty_file(self, tmp_path, monkeypatch):
+        path = str(tmp_path / 'log.txt')
+        open(path, 'w').close()
+        output = str(tmp_path / 'map.png')
+        followed = {}
+
+        def follow_once(args, fig, ax, tails, scatters, *rest):
+            _append(path, "".join(f"{i}.0 {i}.0 1.0 {i}.0\n" for i in range(1, 101)))
+            follow_scatter(args, fig, ax, tails, scatters, *rest, max_updates=1)
+            followed.update(fig=fig, scatter=scatters[0])
+
+        monkeypatch.setattr(follow, 'follow_scatter', follow_once)
+        monkeypatch.setattr(sys, 'argv', [
+            'mapplot', '--earth', '--no-coastlines', '--follow', '--follow-interval', '0.01',
+            '--cmap-percentiles', '5', '95', '--cbar', '-o', output, path])
+        main()
+
+        scatter = followed['scatter']
+        assert len(scatter.get_array()) == 100
+        assert 4.0 < scatter.norm.vmin < 7.0 and 94.0 < scatter.norm.vmax < 97.0
+        assert len(followed['fig'].axes) == 2  # map and colorbar
+        plt.close(followed['fig'])
+
+    def test_density_grid_updates(self, tmp_path):
+        path = str(tmp_path / 'obs.txt')
+        _append(path, "10.0 20.0\n")
+        args = _args('--density', '--density-bins', '36', '18', path)
+        args.output = str(tmp_path / 'density.png')
+        tails = open_tails(args)
+        grid = initial_density_grid(tails, args)
+
+        fig, ax = plt.subplots(subplot_kw={'projection': ccrs.PlateCarree()})
+        mesh = plot_density_grid(ax, grid, args)
+        _append(path, "10.5 20.5\n100.0 -30.0\n")
+        follow_density(args, fig, tails, grid, mesh, max_updates=2)
+        plt.close(fig)
+
+        assert grid.n_rows == 3
+        assert mesh.get_array().max() == 2
+
+    def test_atomic_save_leaves_no_temp_files(self, tmp_path):
+        args = _args()
+        args.output = str(tmp_path / 'map.png')
+        fig, _ = plt.subplots()
+        save_figure_atomic(fig, args)
+        save_figure_atomic(fig, args)
+        plt.close(fig)
+        assert os.listdir(tmp_path) == ['map.png']
@@ -0,0 +1,48 @@
+"""Regression tests for lazy imports (python -X importtime)."""
+
+import subprocess
+import sys
+
+import pytest
+
+HEAVY = ['numpy', 'matplotlib', 'cartopy', 'astropy']
+
+
+def _imported(argv):
+    """Top-level packages imported by a Python command, from -X importtime."""
+    result = subprocess.run([sys.executable, '-X', 'importtime'] + argv,
+                            capture_output=True, text=True)
+    modules = set()
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and 'cumulative' not in line:
+            modules.add(line.rsplit('|', 1)[1].strip())
+    return result, modules
+
+
+class TestLazyImports:
+    @pytest.mark.parametrize('argv', [
+        ['-c', 'import mapplot.core'],
+        ['-c', 'import mapplot.cli'],
+        ['-m', 'mapplot', '--version'],
+        ['-m', 'mapplot', '--help'],
+    ])
+    def test_cli_startup_skips_plotting_stack(self, argv):
+        result, modules = _imported(argv)
+        assert result.returncode == 0
+        assert 'mapplot.core' in modules or 'mapplot.cli' in modules
+        loaded = [name for name in HEAVY if name in {m.split('.')[0] for m in modules}]
+        assert loaded == []
+
+    def test_argument_error_skips_plotting_stack(self):
+        result, modules = _imported(['-m', 'mapplot', '--no-such-option'])
+        assert result.returncode == 2
+        assert 'matplotlib' not in modules
+
+    def test_static_modules_skip_astropy_and_animation(self):
+        code = ('import sys, matplotlib.pyplot, mapplot.plotting, mapplot.data_io, '
+                'mapplot.aggregate, mapplot.follow; '
+                'print(sorted(m for m in ("astropy", "matplotlib.animation", "mapplot.animation") '
+                'if m in sys.modules))')
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                                check=True)
+        assert result.stdout.strip() == '[]'
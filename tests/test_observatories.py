@@ -0,0 +1,91 @@
+"""Tests for the MPC observatory table."""
+
+import os
+
+import numpy as np
+import pytest
+
+from mapplot import observatories
+from mapplot.observatories import (ObservatoryTable, parse_mpc_observatories,
+                                   parse_observatory_table, read_observatory_file)
+
+
+def _line(code, lon, rho_cos, rho_sin, name=''):
+    """An ObsCodes line: code, longitude, rho*cos(phi), rho*sin(phi), name."""
+    return f"{code:3} {lon:9} {rho_cos:7} {rho_sin:8} {name}"
+
+
+OBSCODES = '\n'.join([
+    '<pre>',
+    'Code  Long.   cos      sin    Name',
+    _line('000', '0.0000', '0.62411', '+0.77873', 'Greenwich'),
+    _line('568', '204.5278', '0.94171', '+0.33725', 'Mauna Kea'),
+    _line('g96', '249.2108', '0.84560', '+0.53254', 'Mount Lemmon'),
+    _line('250', '', '', '', 'Hubble Space Telescope'),
+    _line('K01', '359.0000', '0.60000', '+0.80000'),
+    '</pre>',
+])
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv('MAPPLOT_CACHE_DIR', str(tmp_path / 'cache'))
+    monkeypatch.setattr(observatories, '_TABLE_CACHE', {})
+    return tmp_path / 'cache'
+
+
+class TestParse:
+    def test_fields(self):
+        table = parse_observatory_table(OBSCODES)
+        assert table.codes.tolist() == ['000', '568', 'g96', 'K01']
+        assert table.names.tolist() == ['Greenwich', 'Mauna Kea', 'Mount Lemmon',
+                                        'Observatory K01']
+        np.testing.assert_allclose(table.lon, [0.0, -155.4722, -110.7892, -1.0])
+        assert table.lat[1] == pytest.approx(np.degrees(np.arctan2(0.33725, 0.94171)))
+
+    def test_records_match_table(self, data_dir):
+        with open(os.path.join(data_dir, 'mpc_observatories.txt'), 'rb') as f:
+            content = f.read()
+        table = parse_observatory_table(content)
+        records = parse_mpc_observatories(content)
+        assert len(records) == len(table) == 78
+        assert records == table.records()
+        assert records[0]['code'] == '000' and records[0]['lon'] == 0.0
+
+    def test_empty(self):
+        assert len(parse_observatory_table('')) == 0
+
+
+class TestLookup:
+    def test_rows_case_insensitive(self):
+        table = parse_observatory_table(OBSCODES)
+        rows, missing = table.rows(['G96', '000', 'xxx'])
+        assert rows.tolist() == [2, 0]
+        assert missing == ['xxx']
+
+    def test_select_keeps_table_order(self):
+        table = ObservatoryTable(['A', 'B', 'A'], [1, 2, 3], [0, 0, 0], ['x', 'y', 'z'])
+        assert table.select(['b', 'a']).tolist() == [0, 1, 2]
+        assert table.take(table.select(['a'])).lon.tolist() == [1.0, 3.0]
+        assert table.select([]).tolist() == []
+
+
+class TestCache:
+    def test_disk_cache_follows_file(self, tmp_path, cache_dir, monkeypatch):
+        path = tmp_path / 'obs.txt'
+        path.write_text(OBSCODES)
+        assert len(read_observatory_file(str(path))) == 4
+        assert len(list(cache_dir.glob('observatories_*.npz'))) == 1
+
+        # A new process reads the .npz instead of parsing
+        monkeypatch.setattr(observatories, '_TABLE_CACHE', {})
+        monkeypatch.setattr(observatories, 'parse_observatory_table', None)
+        table = read_observatory_file(str(path))
+        assert table.codes.tolist() == ['000', '568', 'g96', 'K01']
+        assert table.names[2] == 'Mount Lemmon'
+
+        # Editing the file invalidates both caches
+        monkeypatch.setattr(observatories, 'parse_observatory_table', parse_observatory_table)
+        path.write_text(OBSCODES.replace('Mauna Kea', 'Maunakea'))
+        os.utime(path, ns=(0, 0))
+        assert read_observatory_file(str(path)).names[1] == 'Maunakea'
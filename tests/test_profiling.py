@@ -0,0 +1,158 @@
+"""Tests for --profile stage timers."""
+
+import json
+import sys
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from mapplot.cli import parse_args
+from mapplot.core import run_mapplot
+from mapplot.profiling import (frame_callback, percentile, profiled, stage, timed,
+                               timed_iter)
+
+
+def _args(*argv):
+    sys.argv = ['mapplot'] + list(argv)
+    return parse_args()
+
+
+class TestStages:
+    def test_inactive_is_noop(self):
+        with stage('read_data') as record:
+            record['points'] += 10
+        assert frame_callback() is None
+
+    def test_nested_stages_and_points(self, tmp_path):
+        args = _args('--profile', '--profile-json', str(tmp_path / 'p.json'))
+        with profiled(args) as profile:
+            with stage('ingest'):
+                for _ in range(2):
+                    with stage('read_data') as record:
+                        record['points'] += 5
+            timed('update_frame', lambda: None)()
+            chunks = list(timed_iter('chunk', iter([(None, np.zeros(3)), (None, np.zeros(4))])))
+
+        assert len(chunks) == 2
+        assert list(profile.stages) == ['ingest', 'ingest/read_data', 'update_frame', 'chunk']
+        assert profile.stages['ingest/read_data']['calls'] == 2
+        assert profile.stages['ingest/read_data']['points'] == 10
+        assert profile.stages['chunk']['calls'] == 2
+        assert profile.stages['chunk']['points'] == 7
+
+    def test_frame_percentiles(self, tmp_path, capsys):
+        args = _args('--profile', '--profile-json', str(tmp_path / 'p.json'))
+        with profiled(args) as profile:
+            callback = frame_callback()
+            for i in range(3):
+                callback(i, 3)
+        profile.frames = [0.01 * i for i in range(1, 101)]
+        report = profile.report()
+        assert report['frames']['count'] == 100
+        assert report['frames']['p95'] == pytest.approx(np.percentile(profile.frames, 95))
+        assert report['frames']['max'] == pytest.approx(1.0)
+
+    @pytest.mark.parametrize('q', [0, 37.5, 50, 95, 100])
+    def test_percentile_matches_numpy(self, q):
+        values = [3.0, 1.0, 4.0, 1.5, 9.0, 2.6]
+        assert percentile(values, q) == pytest.approx(np.percentile(values, q))
+
+
+class TestProfileReport:
+    def test_static_render_report(self, tmp_path, tmp_data_file, capsys):
+        output = str(tmp_path / 'map.png')
+        run_mapplot(_args(tmp_data_file, '--profile', '-o', output))
+
+        report = json.load(open(output + '.profile.json'))
+        stages = {item['name']: item for item in report['stages']}
+        for name in ['imports', 'setup', 'background', 'ingest', 'ingest/read_data',
+                     'ingest/transform', 'plot_data', 'layout', 'savefig', 'savefig/draw']:
+            assert name in stages, name
+        assert stages['ingest/read_data']['points'] == 3
+        assert report['total']['wall'] >= stages['savefig']['wall'] > 0
+        assert report['frames'] is None
+        if report['peak_rss_bytes'] is not None:
+            assert report['peak_rss_bytes'] > 2**20
+
+        err = capsys.readouterr().err
+        assert 'Profile:' in err and 'read_data' in err
+
+    def test_density_report(self, tmp_path, tmp_data_file):
+        path = str(tmp_path / 'profile.json')
+        run_mapplot(_args(tmp_data_file, '--density', '--density-bins', '36', '18',
+                          '--profile', '--profile-json', path, '-o', str(tmp_path / 'd.png')))
+        stages = {item['name']: item for item in json.load(open(path))['stages']}
+        assert stages['ingest']['points'] == 3
+        assert stages['ingest/read_data']['points'] == 3
+        assert 'ingest/bin' in stages
+
+    def test_animation_frames(self, tmp_path, tmp_mjd_data_file):
+        output = str(tmp_path / 'anim.gif')
+        run_mapplot(_args('--animate', tmp_mjd_data_file, '--fps', '5', '--stop-time', '60002',
+                          '--figsize', '4', '3', '--dpi', '40', '--profile', '-o', output))
+        report = json.load(open(output + '.profile.json'))
+        stages = {item['name']: item for item in report['stages']}
+        assert report['frames']['count'] == stages['save/update_frame']['calls'] > 0
+        assert report['frames']['p50'] <= report['frames']['p95'] <= report['frames']['max']
+        assert stages['prepare_data']['points'] == 3
+
+
+class TestMemory:
+    def test_nested_peaks_and_retained(self, tmp_path):
+        args = _args('--profile-memory', '--profile-json', str(tmp_path / 'p.json'))
+        with profiled(args) as profile:
+            with stage('outer'):
+                with stage('read_data') as record:
+                    record['points'] += 1000
+                    block = bytearray(8 * 2**20)
+                    del block
+                kept = bytearray(2**20)
+
+        assert not tracemalloc.is_tracing()
+        outer, inner = profile.stages['outer'], profile.stages['outer/read_data']
+        assert inner['mem_peak'] >= 8 * 2**20
+        assert abs(inner['mem_retained']) < 2**18
+        # The inner peak counts towards the outer stage despite reset_peak()
+        assert outer['mem_peak'] >= 8 * 2**20
+        assert 2**20 <= outer['mem_retained'] < 2**20 + 2**18
+        assert len(kept) == 2**20
+
+        report = json.load(open(tmp_path / 'p.json'))
+        stages = {item['name']: item for item in report['stages']}
+        assert report['memory']['input_points'] == 1000
+        assert report['memory']['traced_peak_bytes'] >= 8 * 2**20
+        assert stages['outer/read_data']['bytes_per_point'] == pytest.approx(
+            inner['mem_peak'] / 1000, abs=0.1)
+        assert report['memory']['over_budget'] == []
+
+    def test_budget_flags_stages(self, tmp_path, capsys):
+        args = _args('--memory-budget', '2', '--profile-json', str(tmp_path / 'p.json'))
+        with profiled(args):
+            with stage('small'):
+                bytearray(2**20)
+            with stage('large'):
+                bytearray(4 * 2**20)
+
+        report = json.load(open(tmp_path / 'p.json'))
+        assert report['memory']['budget_bytes'] == 2 * 2**20
+        assert report['memory']['over_budget'] == ['large']
+        assert [item['over_budget'] for item in report['stages']] == [False, True]
+        assert 'Warning: stage large allocated' in capsys.readouterr().err
+
+    def test_timing_only_report(self, tmp_path, tmp_data_file):
+        output = str(tmp_path / 'map.png')
+        run_mapplot(_args(tmp_data_file, '--profile', '-o', output))
+        report = json.load(open(output + '.profile.json'))
+        assert report['memory'] is None
+        assert 'mem_peak' not in report['stages'][0]
+
+    def test_static_render(self, tmp_path, tmp_data_file, capsys):
+        output = str(tmp_path / 'map.png')
+        run_mapplot(_args(tmp_data_file, '--profile-memory', '-o', output))
+        report = json.load(open(output + '.profile.json'))
+        stages = {item['name']: item for item in report['stages']}
+        assert report['memory']['input_points'] == 3
+        assert stages['ingest/read_data']['bytes_per_point'] is not None
+        assert stages['savefig']['rss'] is None or stages['savefig']['rss'] > 2**20
+        assert 'Peak MB' in capsys.readouterr().err
@@ -0,0 +1,100 @@
+"""Tests for the programmatic rendering API (MapRenderer)."""
+
+import io
+
+import matplotlib.image as mpimg
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+from matplotlib.figure import Figure
+
+from mapplot.cli import parse_args
+from mapplot.renderer import MapplotError, MapRenderer, RenderOptions, validate_options
+
+SMALL = dict(figsize=(4, 3), dpi=50)
+POINTS = {'ra': [10.0, 100.0, 200.0], 'dec': [20.0, -30.0, 45.0], 'color': [5.0, 7.0, 9.0]}
+
+
+def _pixels(figure):
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format='png')
+    buffer.seek(0)
+    return mpimg.imread(buffer)
+
+
+class TestRenderOptions:
+    def test_defaults_match_cli(self):
+        cli_defaults = vars(parse_args([]))
+        args = RenderOptions().to_args()
+        for name in vars(RenderOptions()):
+            assert getattr(args, name) == cli_defaults[name], name
+
+    def test_invalid_choice(self):
+        with pytest.raises(MapplotError, match='projection'):
+            RenderOptions(projection='flat').to_args()
+
+    def test_unknown_option(self):
+        with pytest.raises(MapplotError, match='unknown render option'):
+            MapRenderer(projections='mollweide')
+
+    def test_conflicting_options(self):
+        with pytest.raises(MapplotError, match='--galactic-plane'):
+            MapRenderer(solar_relative=True, galactic_plane=True)
+
+        args = parse_args(['--cmap-percentiles', '90', '10'])
+        with pytest.raises(MapplotError, match='cmap-percentiles'):
+            validate_options(args)
+
+
+class TestMapRenderer:
+    def test_renders_arrays_without_pyplot(self, tmp_path):
+        plt.close('all')
+        renderer = MapRenderer(projection='mollweide', gridlines=True, cbar=True, **SMALL)
+        output = tmp_path / 'map.png'
+        figure = renderer.render([POINTS], output=str(output))
+
+        assert isinstance(figure, Figure)
+        assert plt.get_fignums() == []
+        assert output.stat().st_size > 0
+        assert len(figure.axes) == 2  # map and colorbar
+
+    def test_files_and_arrays(self, tmp_data_file):
+        renderer = MapRenderer(legend=True, **SMALL)
+        renderer.render([tmp_data_file, {'lon': [0.0], 'lat': [0.0]}])
+        texts = [t.get_text() for t in renderer.ax.get_legend().get_texts()]
+        assert texts == ['Dataset 1', 'Dataset 2']
+        assert renderer.options.labels is None
+        assert renderer.options.color is None
+
+    def test_repeated_renders_reuse_background(self):
+        options = RenderOptions(projection='mollweide', ecliptic=True, cbar=True, **SMALL)
+        renderer = MapRenderer(options)
+        figure = renderer.render([POINTS], title='first')
+        ax = renderer.ax
+        n_children = len(ax.get_children())
+
+        second = {'ra': [50.0, 60.0], 'dec': [0.0, 10.0], 'color': [1.0, 2.0]}
+        assert renderer.render([second], title='second') is figure
+        assert renderer.ax is ax
+        assert len(ax.get_children()) == n_children
+        assert len(figure.axes) == 2
+
+        fresh = MapRenderer(options).render([second], title='second')
+        np.testing.assert_array_equal(_pixels(figure), _pixels(fresh))
+
+    def test_density_from_arrays(self):
+        renderer = MapRenderer(density=True, density_bins=(36, 18), **SMALL)
+        renderer.render([{'ra': [10.0, 10.5, 100.0], 'dec': [20.0, 20.5, -30.0]}])
+        mesh = [c for c in renderer.ax.collections if c.get_array() is not None][-1]
+        assert mesh.get_array().max() == 2
+
+    def test_errors_raise(self, tmp_path):
+        renderer = MapRenderer(**SMALL)
+        with pytest.raises(OSError):
+            renderer.render([str(tmp_path / 'missing.txt')])
+        with pytest.raises(MapplotError, match='expected 2'):
+            renderer.render([{'ra': [1.0, 2.0], 'dec': [1.0, 2.0], 'size': [1.0]}])
+        with pytest.raises(MapplotError, match='unknown dataset column'):
+            renderer.render([{'ra': [1.0], 'dec': [1.0], 'weight': [1.0]}])
+        with pytest.raises(MapplotError, match='MJD'):
+            MapRenderer(solar_relative=True, **SMALL).render([POINTS])
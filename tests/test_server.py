@@ -0,0 +1,134 @@
+"""Tests for the render daemon (mapplot serve) and --client."""
+
+import json
+import os
+import stat
+import sys
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from mapplot.cli import parse_args, parse_serve_args
+from mapplot.server import close_server, make_server, run_client, send_job, token_path
+
+
+@pytest.fixture
+def tcp_server(tmp_path, monkeypatch):
+    monkeypatch.setenv('MAPPLOT_CACHE_DIR', str(tmp_path / 'cache'))
+    server = make_server(('127.0.0.1', 0), workers=1)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    close_server(server)
+
+
+@pytest.fixture(scope='module')
+def unix_server(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('server') / 'serve.sock')
+    server = make_server(path, workers=1)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield path
+    server.shutdown()
+    close_server(server)
+
+
+class TestRenderServer:
+    def test_render_over_unix_socket(self, unix_server, tmp_path, tmp_data_file):
+        output = str(tmp_path / 'map.png')
+        result = send_job([tmp_data_file, '-o', output], unix_server)
+        assert result['status'] == 0, result['stderr']
+        assert 'Saved to' in result['stdout']
+        assert os.path.getsize(output) > 0
+
+    def test_relative_paths_use_client_cwd(self, unix_server, tmp_path, tmp_data_file):
+        result = send_job([tmp_data_file, '-o', 'relative.png'], unix_server, cwd=str(tmp_path))
+        assert result['status'] == 0
+        assert os.path.exists(tmp_path / 'relative.png')
+
+    def test_errors_are_returned(self, unix_server, tmp_path):
+        result = send_job([str(tmp_path / 'missing.txt'), '-o', str(tmp_path / 'x.png')], unix_server)
+        assert result['status'] == 1
+        assert 'missing.txt' in result['stderr']
+
+        result = send_job(['--no-such-option'], unix_server)
+        assert result['status'] == 2
+
+    def test_display_jobs_refused(self, unix_server, tmp_data_file):
+        result = send_job([tmp_data_file], unix_server)
+        assert result['status'] == 2
+        assert '-o FILE' in result['stderr']
+
+    def test_stale_socket_replaced(self, tmp_path):
+        path = str(tmp_path / 'stale.sock')
+        open(path, 'w').close()
+        server = make_server(path, workers=1)
+        close_server(server)
+        assert not os.path.exists(path)
+
+    def test_socket_owner_only(self, unix_server):
+        assert stat.S_IMODE(os.stat(unix_server).st_mode) == 0o600
+
+    def test_http_status(self, tcp_server):
+        port = tcp_server.server_address[1]
+        with open(token_path(port)) as f:
+            token = f.read()
+        assert stat.S_IMODE(os.stat(token_path(port)).st_mode) == 0o600
+
+        request = urllib.request.Request(f"http://127.0.0.1:{port}/status",
+                                         headers={'Authorization': f'Bearer {token}'})
+        status = json.loads(urllib.request.urlopen(request).read())
+        assert status['workers'] == 1
+
+    def test_http_requires_token(self, tcp_server, tmp_path):
+        port = tcp_server.server_address[1]
+        for headers in ({}, {'Authorization': 'Bearer wrong'}):
+            request = urllib.request.Request(
+                f"http://127.0.0.1:{port}/render", headers=headers,
+                data=json.dumps({'argv': ['--catalog', '-o', str(tmp_path / 'x.png')]}).encode())
+            with pytest.raises(urllib.error.HTTPError) as excinfo:
+                urllib.request.urlopen(request)
+            assert excinfo.value.code == 401
+        assert not os.path.exists(tmp_path / 'x.png')
+        assert tcp_server.jobs == 0
+
+    def test_http_client_sends_token(self, tcp_server, tmp_path, tmp_data_file):
+        address = f"http://127.0.0.1:{tcp_server.server_address[1]}"
+        result = send_job([tmp_data_file, '-o', str(tmp_path / 'tcp.png')], address)
+        assert result['status'] == 0, result['stderr']
+
+        os.remove(token_path(tcp_server.server_address[1]))
+        with pytest.raises(RuntimeError, match='token'):
+            send_job([tmp_data_file, '-o', str(tmp_path / 'tcp.png')], address)
+
+    def test_token_removed_on_close(self, tmp_path, monkeypatch):
+        monkeypatch.setenv('MAPPLOT_CACHE_DIR', str(tmp_path))
+        server = make_server(('127.0.0.1', 0), workers=1)
+        path = token_path(server.server_address[1])
+        assert os.path.exists(path)
+        close_server(server)
+        assert not os.path.exists(path)
+
+
+class TestClient:
+    def test_forwards_to_server(self, unix_server, tmp_path, tmp_data_file, capsys):
+        argv = ['--client', '--server', unix_server, tmp_data_file, '-o', str(tmp_path / 'c.png')]
+        sys.argv = ['mapplot'] + argv
+        assert run_client(argv, parse_args()) == 0
+        assert 'Saved to' in capsys.readouterr().out
+
+    def test_falls_back_without_server(self, tmp_path, tmp_data_file, capsys):
+        argv = ['--client', '--server', str(tmp_path / 'none.sock'), tmp_data_file,
+                '-o', str(tmp_path / 'c.png')]
+        assert run_client(argv, parse_args(argv)) is None
+        assert 'rendering locally' in capsys.readouterr().err
+
+    def test_interactive_renders_locally(self, tmp_data_file):
+        argv = ['--client', tmp_data_file]
+        assert run_client(argv, parse_args(argv)) is None
+
+    def test_serve_args(self):
+        args = parse_serve_args(['--port', '8765', '--workers', '3'])
+        assert args.port == 8765 and args.workers == 3 and args.socket is None
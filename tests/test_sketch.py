@@ -0,0 +1,87 @@
+"""Tests for the mergeable quantile sketch and percentile color limits."""
+
+import sys
+
+import numpy as np
+
+from mapplot.cli import parse_args
+from mapplot.data_io import color_limits, ingest_files, ingest_static_file
+from mapplot.sketch import QuantileSketch, merge_sketches, normalization_limits
+
+
+def _rank_error(values, estimate, q):
+    return abs(np.searchsorted(np.sort(values), estimate) / len(values) - q)
+
+
+class TestQuantileSketch:
+    def test_quantiles_within_rank_error(self):
+        values = np.random.default_rng(0).lognormal(size=200000)
+        sketch = QuantileSketch.from_values(values)
+        for q, estimate in zip([0.01, 0.25, 0.5, 0.75, 0.99], sketch.quantiles([0.01, 0.25, 0.5, 0.75, 0.99])):
+            assert _rank_error(values, estimate, q) < 0.02
+
+    def test_bounded_size_and_exact_extremes(self):
+        values = np.random.default_rng(1).normal(size=500000)
+        sketch = QuantileSketch()
+        for chunk in np.array_split(values, 50):
+            sketch.update(chunk)
+        assert sketch.n == len(values)
+        assert sum(len(level) for level in sketch.levels) < 2000
+        np.testing.assert_array_equal(sketch.quantiles([0.0, 1.0]), [values.min(), values.max()])
+
+    def test_merge_matches_single_sketch(self):
+        values = np.random.default_rng(2).uniform(0, 100, 300000)
+        parts = [QuantileSketch.from_values(chunk) for chunk in np.array_split(values, 7)]
+        merged = merge_sketches(parts)
+        assert merged.n == len(values)
+        for q, estimate in zip([0.05, 0.5, 0.95], merged.quantiles([0.05, 0.5, 0.95])):
+            assert _rank_error(values, estimate, q) < 0.02
+        # Merging does not modify the inputs
+        assert parts[0].n == len(np.array_split(values, 7)[0])
+
+    def test_ignores_non_finite(self):
+        sketch = QuantileSketch.from_values([1.0, np.nan, 3.0, np.inf])
+        assert sketch.n == 2
+        assert normalization_limits(sketch) == (1.0, 3.0)
+
+    def test_empty(self):
+        assert merge_sketches([None, QuantileSketch()]) is None
+        assert np.isnan(QuantileSketch().quantiles(0.5)).all()
+
+
+class TestPercentileColorLimits:
+    def _files(self, tmp_path):
+        rng = np.random.default_rng(3)
+        files = []
+        for i in range(3):
+            f = tmp_path / f"mags{i}.txt"
+            values = rng.normal(18.0 + i, 1.0, 2000)
+            values[:5] = 99.0  # outliers that would dominate a min/max scale
+            np.savetxt(f, np.column_stack([rng.uniform(0, 360, 2000), rng.uniform(-60, 60, 2000),
+                                           np.ones(2000), values]))
+            files.append(str(f))
+        return files
+
+    def test_outliers_clipped(self, tmp_path):
+        sys.argv = ['mapplot', '--cmap-percentiles', '1', '99'] + self._files(tmp_path)
+        args = parse_args()
+        vmin, vmax = color_limits([result[-1] for result in ingest_files(ingest_static_file, args)], args)
+        assert 14.0 < vmin < 17.0
+        assert 20.0 < vmax < 23.0
+
+    def test_parallel_matches_serial(self, tmp_path):
+        files = self._files(tmp_path)
+        sys.argv = ['mapplot', '--cmap-percentiles', '2', '98'] + files
+        args = parse_args()
+        serial = color_limits([r[-1] for r in ingest_files(ingest_static_file, args)], args)
+        sys.argv = ['mapplot', '--cmap-percentiles', '2', '98', '--workers', '2'] + files
+        args = parse_args()
+        parallel = color_limits([r[-1] for r in ingest_files(ingest_static_file, args)], args)
+        assert serial == parallel
+
+    def test_unset_keeps_min_max(self, tmp_path):
+        sys.argv = ['mapplot'] + self._files(tmp_path)
+        args = parse_args()
+        ingested = ingest_files(ingest_static_file, args)
+        assert all(result[-1] is None for result in ingested)
+        assert color_limits([result[-1] for result in ingested], args) is None
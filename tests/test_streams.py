@@ -0,0 +1,77 @@
+"""Tests for transparent decompression of inputs."""
+
+import bz2
+import gzip
+import lzma
+import os
+
+import numpy as np
+import pytest
+
+from mapplot.data_io import read_data
+from mapplot.observatories import load_observatory_dates
+from mapplot.streams import ZSTD_AVAILABLE, detect_compression, open_text
+from mapplot.timeindex import index_path
+
+TEXT = "# MJD RA Dec\n60000.0 120.0 30.0\n60001.0 121.0 31.0\n60002.0 122.0 32.0\n"
+
+OPENERS = {'gzip': (gzip.open, '.gz'), 'bz2': (bz2.open, '.bz2'), 'xz': (lzma.open, '.xz')}
+
+
+def _compress(tmp_path, compression, name='data.txt', text=TEXT):
+    opener, ext = OPENERS[compression]
+    path = str(tmp_path / (name + ext))
+    with opener(path, 'wt') as f:
+        f.write(text)
+    return path
+
+
+class TestDetectCompression:
+    @pytest.mark.parametrize('compression', sorted(OPENERS))
+    def test_by_magic_without_extension(self, tmp_path, compression):
+        path = _compress(tmp_path, compression)
+        renamed = str(tmp_path / 'noext')
+        os.rename(path, renamed)
+        assert detect_compression(renamed) == compression
+
+    def test_plain_text(self, tmp_mjd_data_file):
+        assert detect_compression(tmp_mjd_data_file) is None
+
+    @pytest.mark.skipif(ZSTD_AVAILABLE, reason='zstandard is installed')
+    def test_zstd_needs_zstandard(self, tmp_path):
+        path = tmp_path / 'data.txt.zst'
+        path.write_bytes(b'\x28\xb5\x2f\xfd' + b'\x00' * 16)
+        assert detect_compression(str(path)) == 'zstd'
+        with pytest.raises(ValueError):
+            open_text(str(path))
+
+
+class TestCompressedInput:
+    @pytest.mark.parametrize('compression', sorted(OPENERS))
+    def test_read_data_matches_plain(self, tmp_path, tmp_mjd_data_file, compression):
+        path = _compress(tmp_path, compression)
+        expected = read_data(tmp_mjd_data_file, read_mjd=True)
+        result = read_data(path, read_mjd=True)
+        for a, b in zip(expected[:3], result[:3]):
+            np.testing.assert_array_equal(a, b)
+
+    def test_labels_from_compressed(self, tmp_path):
+        path = _compress(tmp_path, 'gzip', text="10.0 20.0 Alpha\n30.0 40.0 Beta\n")
+        _, coord1, _, _, _, labels = read_data(path, labels_from_file=True)
+        np.testing.assert_array_equal(coord1, [10.0, 30.0])
+        assert labels == ['Alpha', 'Beta']
+
+    def test_compressed_csv(self, tmp_path):
+        path = _compress(tmp_path, 'xz', name='objs.csv', text="ra,dec\n1.5,2.5\n3.5,4.5\n")
+        _, coord1, coord2, _, _, _ = read_data(path)
+        np.testing.assert_array_equal(coord2, [2.5, 4.5])
+
+    def test_time_window_without_index(self, tmp_path):
+        path = _compress(tmp_path, 'gzip')
+        mjd, _, _, _, _, _ = read_data(path, read_mjd=True, time_window=(60001.0, None))
+        np.testing.assert_array_equal(mjd, [60001.0, 60002.0])
+        assert not os.path.exists(index_path(path))
+
+    def test_observatory_dates(self, tmp_path):
+        path = _compress(tmp_path, 'bz2', name='dates.txt', text="G96 50000 -1\n")
+        assert 'G96' in load_observatory_dates(path)
@@ -0,0 +1,93 @@
+"""Tests for synthetic data generation (mapplot synth)."""
+
+import sys
+
+import numpy as np
+import pytest
+
+from mapplot import synth
+from mapplot.cli import parse_synth_args
+from mapplot.coordinates import get_sun_position_fast, transform_coordinates_matrix
+from mapplot.core import main
+from mapplot.data_io import load_data
+from mapplot.observatories import load_observatory_dates
+from mapplot.synth import synthesize
+
+
+class TestSynthesize:
+    def test_reproducible(self, tmp_path):
+        paths = [str(tmp_path / name) for name in ('a.txt', 'b.txt', 'c.txt')]
+        synthesize('tracks', 500, paths[0], seed=3)
+        synthesize('tracks', 500, paths[1], seed=3)
+        synthesize('tracks', 500, paths[2], seed=4)
+        text = [open(path).read() for path in paths]
+        assert text[0] == text[1]
+        assert text[0] != text[2]
+
+    def test_tracks_near_opposition_and_ecliptic(self, tmp_path):
+        path = str(tmp_path / 'tracks.txt')
+        synthesize('tracks', 20000, path, days=100)
+        mjd, ra, dec, sizes, colors, labels = load_data(path, read_mjd=True)
+
+        assert len(mjd) == 20000 and sizes is None
+        assert np.all(np.diff(mjd) >= 0)
+        assert 60000 <= mjd[0] and mjd[-1] <= 60100
+        lon, lat = transform_coordinates_matrix(ra, dec, 'equatorial', 'ecliptic')
+        elongation = (lon - get_sun_position_fast(mjd)[0]) % 360
+        assert np.mean(np.abs(lat) < 25) > 0.9
+        assert np.mean(np.abs(elongation - 180) < 70) > 0.9
+
+    @pytest.mark.parametrize('name', ['t.mapc', 't.fits', 't.txt.gz'])
+    def test_formats_agree(self, tmp_path, name):
+        reference = str(tmp_path / 't.txt')
+        synthesize('tracks', 1000, reference, extra=True)
+        path = str(tmp_path / name)
+        synthesize('tracks', 1000, path, extra=True)
+
+        expected = load_data(reference, read_mjd=True)
+        for ref, values in zip(expected[:5], load_data(path, read_mjd=True)[:5]):
+            np.testing.assert_allclose(values, ref, atol=1e-5)
+
+    def test_labeled_ids_unique_across_blocks(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(synth, 'BLOCK_ROWS', 10)
+        path = str(tmp_path / 'labeled.txt')
+        synthesize('labeled', 95, path, per_object=3)
+        _, ra, dec, _, _, labels = load_data(path, labels_from_file=True)
+
+        counts = {label: labels.count(label) for label in set(labels)}
+        # 10 blocks of ceil(10 / 3) = 4 objects, the last ones with fewer detections
+        assert len(counts) == 9 * 4 + 2
+        assert max(counts.values()) == 3
+
+    def test_earth(self, tmp_path):
+        path = str(tmp_path / 'earth.mapc')
+        synthesize('earth', 5000, path, extra=True)
+        _, lon, lat, sizes, colors, _ = load_data(path)
+        assert np.all((lon >= -180) & (lon < 180)) and np.all(np.abs(lat) <= 90)
+        assert np.all((sizes >= 1) & (sizes <= 50))
+        # Colder toward the poles
+        assert colors[np.abs(lat) > 60].mean() < colors[np.abs(lat) < 20].mean()
+
+    def test_obsdates(self, tmp_path):
+        path = str(tmp_path / 'dates.txt')
+        synthesize('obsdates', 20, path)
+        dates = load_observatory_dates(path)
+        assert len(dates) == 20
+        with pytest.raises(ValueError, match='only be written as text'):
+            synthesize('obsdates', 20, str(tmp_path / 'dates.mapc'))
+
+
+class TestSynthCli:
+    def test_row_count(self):
+        assert parse_synth_args(['sky', '-n', '1e3', '-o', 'x.txt']).rows == 1000
+        with pytest.raises(SystemExit):
+            parse_synth_args(['sky', '-n', '1.5', '-o', 'x.txt'])
+
+    def test_main(self, tmp_path, monkeypatch, capsys):
+        path = str(tmp_path / 'sky.txt')
+        monkeypatch.setattr(sys, 'argv', ['mapplot', 'synth', 'sky', '-n', '250', '--extra',
+                                          '--seed', '2', '-o', path])
+        main()
+        _, ra, dec, sizes, colors, _ = load_data(path)
+        assert len(ra) == len(sizes) == 250
+        assert 'Wrote 250 sky rows' in capsys.readouterr().err
@@ -0,0 +1,77 @@
+"""Tests for the sidecar MJD time index."""
+
+import os
+
+import numpy as np
+import pytest
+
+from mapplot.data_io import read_data
+from mapplot.timeindex import (build_time_index, load_time_index, read_time_window,
+                               index_path)
+
+
+@pytest.fixture
+def sorted_mjd_file(tmp_path):
+    """A time-sorted MJD RA Dec file with comments and blank lines."""
+    mjd = 60000.0 + np.arange(10000) * 0.5
+    lines = ['# MJD RA Dec', '']
+    for i, m in enumerate(mjd):
+        lines.append(f'{m:.1f} {i % 360:.1f} {(i % 120) - 60:.1f}')
+        if i == 5000:
+            lines.append('# mid-file comment')
+            lines.append('   ')
+    f = tmp_path / 'sorted.txt'
+    f.write_text('\n'.join(lines) + '\n')
+    return str(f)
+
+
+class TestTimeIndex:
+    def test_build_blocks(self, sorted_mjd_file):
+        index = build_time_index(sorted_mjd_file, block_rows=1000)
+        assert index['n_rows'] == 10000
+        np.testing.assert_array_equal(index['mjd'], 60000.0 + np.arange(10) * 500.0)
+
+        # Offsets point at the first row of each block
+        with open(sorted_mjd_file, 'rb') as f:
+            for mjd, offset in zip(index['mjd'], index['offsets']):
+                f.seek(offset)
+                assert float(f.readline().split()[0]) == mjd
+
+    def test_sidecar_saved_and_reused(self, sorted_mjd_file):
+        load_time_index(sorted_mjd_file)
+        assert os.path.exists(index_path(sorted_mjd_file))
+        mtime = os.path.getmtime(index_path(sorted_mjd_file))
+        load_time_index(sorted_mjd_file)
+        assert os.path.getmtime(index_path(sorted_mjd_file)) == mtime
+
+    def test_stale_index_rebuilt(self, sorted_mjd_file):
+        load_time_index(sorted_mjd_file)
+        with open(sorted_mjd_file, 'a') as f:
+            f.write('70000.0 1.0 2.0\n')
+        index = load_time_index(sorted_mjd_file)
+        assert index['n_rows'] == 10001
+
+    def test_unsorted_file_not_indexed(self, tmp_path):
+        f = tmp_path / 'unsorted.txt'
+        f.write_text('60002.0 1.0 1.0\n60001.0 2.0 2.0\n')
+        assert read_time_window(str(f), 60001.0, 60002.0) is None
+
+    def test_window_reads_subset(self, sorted_mjd_file):
+        lines = read_time_window(sorted_mjd_file, 61000.0, 61010.0)
+        assert len(lines) < 10000
+
+    def test_read_data_window_matches_full_read(self, sorted_mjd_file):
+        full = read_data(sorted_mjd_file, read_mjd=True)
+        windowed = read_data(sorted_mjd_file, read_mjd=True, time_window=(62000.0, 62100.0))
+
+        in_window = (full[0] >= 62000.0) & (full[0] <= 62100.0)
+        np.testing.assert_array_equal(windowed[0], full[0][in_window])
+        np.testing.assert_array_equal(windowed[1], full[1][in_window])
+        np.testing.assert_array_equal(windowed[2], full[2][in_window])
+
+    def test_open_ended_and_empty_windows(self, sorted_mjd_file):
+        mjd = read_data(sorted_mjd_file, read_mjd=True, time_window=(None, 60010.0))[0]
+        np.testing.assert_array_equal(mjd, 60000.0 + np.arange(21) * 0.5)
+
+        mjd = read_data(sorted_mjd_file, read_mjd=True, time_window=(80000.0, None))[0]
+        assert len(mjd) == 0